@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Compare encode time per track for the two-pass and single-pass SponsorBlock paths.
+
+Two-pass mirrors the legacy download_youtube_audio: FFmpegExtractAudio encodes
+the whole container to MP3, then the kept container is decoded and encoded a
+second time with the segments cut out. Single-pass does the trim and the encode
+in one ffmpeg run. The last row is the copy transcode profile on a track with
+nothing to cut, which remuxes the container without encoding at all.
+
+Usage: python benchmarks/bench_encode.py [track_seconds] [runs]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from toolchain import load_script
+
+youtube_downloader = load_script("youtube_downloader")
+
+# A typical intro + mid-roll sponsor + outro layout
+SEGMENTS = [(0.0, 8.0), (60.0, 75.0), (-20.0, None)]
+
+
+def make_container(path, seconds):
+    subprocess.run([
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+        "-c:a", "aac", "-b:a", "128k", path
+    ], check=True)
+
+
+def segments_for(seconds):
+    segments = []
+    for start, end in SEGMENTS:
+        if end is None:
+            start, end = seconds + start, seconds
+        segments.append((start, end))
+    return segments
+
+
+def two_pass(container, workdir, segments):
+    youtube_downloader.ffmpeg_encode(container, os.path.join(workdir, "first.mp3"))
+    youtube_downloader.ffmpeg_remove_segments_from_container(container, os.path.join(workdir, "trimmed.mp3"), segments)
+
+
+def single_pass(container, workdir, segments):
+    youtube_downloader.transcode_audio(container, os.path.join(workdir, "out.mp3"), segments)
+
+
+def remux(container, workdir, segments):
+    youtube_downloader.transcode_audio(container, os.path.join(workdir, "out.mp3"), [], profile="copy")
+
+
+def time_runs(fn, source, runs, segments):
+    samples = []
+    for _ in range(runs):
+        workdir = tempfile.mkdtemp()
+        try:
+            container = os.path.join(workdir, "input.m4a")
+            shutil.copyfile(source, container)
+            start = time.perf_counter()
+            fn(container, workdir, segments)
+            samples.append(time.perf_counter() - start)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return sum(samples) / len(samples)
+
+
+def main(argv):
+    if not shutil.which("ffmpeg"):
+        print("ffmpeg not found on PATH; cannot run the encode benchmark")
+        return 1
+
+    seconds = float(argv[0]) if argv else 210.0
+    runs = int(argv[1]) if len(argv) > 1 else 3
+
+    sourcedir = tempfile.mkdtemp()
+    try:
+        source = os.path.join(sourcedir, "source.m4a")
+        make_container(source, seconds)
+        segments = segments_for(seconds)
+
+        before = time_runs(two_pass, source, runs, segments)
+        after = time_runs(single_pass, source, runs, segments)
+        copied = time_runs(remux, source, runs, segments)
+    finally:
+        shutil.rmtree(sourcedir, ignore_errors=True)
+
+    print(f"Track length: {seconds:.0f}s, {runs} runs each")
+    print(f"two-pass     {before:.2f}s encode per track")
+    print(f"single-pass  {after:.2f}s encode per track")
+    print(f"saving       {(1 - after / before) * 100:.0f}%")
+    print(f"copy remux   {copied:.2f}s per track (no segments)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
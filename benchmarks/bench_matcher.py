@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Offline accuracy and latency benchmark for YouTube match selection.
+
+Each fixture case holds a Spotify track, the flat ytsearch results for it (the
+same entry shape yt-dlp returns with extract_flat) and the ids that count as a
+correct match. The benchmark compares taking the first result, which is what
+ytsearch1 did, with the scoring matcher, and times how long ranking the whole
+fixture batch takes.
+
+Usage:
+    python benchmarks/bench_matcher.py [fixtures.json] [runs]
+    python benchmarks/bench_matcher.py --record [fixtures.json]
+
+The bundled fixtures are hand-written, not recorded, so their accuracy
+figures only show that the scoring rules behave as intended. --record re-runs
+every fixture search against live YouTube, replaces the candidates and marks
+the file as recorded, keeping the expected ids; review the labels afterwards
+before quoting accuracy.
+"""
+import os
+import sys
+import json
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "spotify"))
+
+from youtube_matcher import rank_candidates, search_candidates, candidate_count
+
+DEFAULT_FIXTURES = os.path.join(ROOT_DIR, "benchmarks", "fixtures", "youtube_search.json")
+
+
+def load_fixtures(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record(path):
+    import yt_dlp
+    from fetch_youtube_url import YDL_SEARCH_OPTS
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    with yt_dlp.YoutubeDL(YDL_SEARCH_OPTS) as ydl:
+        for case in data["cases"]:
+            track = case["track"]
+            case["candidates"] = search_candidates(ydl, track["title"], track["artist"], candidate_count())
+            print(f"recorded {len(case['candidates'])} results for {track['title']} - {track['artist']}")
+    data["format"] = "yt-dlp flat ytsearch entries"
+    data["recorded"] = time.strftime("%Y-%m-%d")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
+    return 0
+
+
+def main(argv):
+    if argv and argv[0] == "--record":
+        return record(argv[1] if len(argv) > 1 else DEFAULT_FIXTURES)
+
+    path = argv[0] if argv else DEFAULT_FIXTURES
+    runs = int(argv[1]) if len(argv) > 1 else 200
+    fixtures = load_fixtures(path)
+    cases = fixtures["cases"]
+
+    queries = [case["track"] for case in cases]
+    candidate_lists = [case["candidates"] for case in cases]
+
+    first_correct = sum(
+        1 for case in cases if case["candidates"] and case["candidates"][0]["id"] in case["expected"]
+    )
+
+    matches = rank_candidates(queries, candidate_lists)
+    scored_correct = 0
+    misses = []
+    for case, match in zip(cases, matches):
+        if match and match["id"] in case["expected"]:
+            scored_correct += 1
+        else:
+            misses.append(f"{case['track']['title']} -> {match['id'] if match else None}")
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        rank_candidates(queries, candidate_lists)
+    elapsed = (time.perf_counter() - start) / runs
+    rows = sum(len(candidates) for candidates in candidate_lists)
+
+    total = len(cases)
+    source = f"recorded {fixtures['recorded']}" if fixtures.get("recorded") else "hand-written, not real-world accuracy"
+    print(f"{total} tracks, {rows} candidates ({source})")
+    print(f"first result  {first_correct}/{total} correct ({first_correct / total:.0%})")
+    print(f"scored        {scored_correct}/{total} correct ({scored_correct / total:.0%})")
+    print(f"ranking       {elapsed * 1000:.3f} ms per batch, {elapsed / total * 1e6:.1f} us per track")
+    for miss in misses:
+        print(f"  miss: {miss}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Compare memory and throughput of playlist track normalization.
+
+The legacy path is the dict-building code spotify_playlist.py used before the
+Track model: repeated .get() calls, and available_markets carried along on
+every track. The Track path builds slotted records with interned market tuples
+and projects them to the default columns; markets are only collected (and
+interned) when the projection asks for them. Retained memory is what the
+normalized list holds on top of the parsed response; throughput and JSON size
+cover normalizing and serializing every track, as the script does.
+
+Usage: python benchmarks/bench_track_record.py [tracks] [runs]
+"""
+import os
+import sys
+import json
+import time
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "spotify"))
+
+from track_record import FIELDS, iter_tracks
+
+MARKETS = [chr(a) + chr(b) for a in range(65, 91) for b in range(65, 91)][:185]
+
+
+def synthetic_playlist(count, seed=1):
+    """Build a playlist "tracks" value shaped like the Spotify API response"""
+    rng = random.Random(seed)
+    # A few distinct market sets, as produced by a handful of label territories
+    market_sets = [MARKETS[:185 - i * 7] for i in range(6)]
+    items = []
+    for i in range(count):
+        items.append({
+            'added_at': '2024-01-01T00:00:00Z',
+            'added_by': {'display_name': 'someone'},
+            'track': {
+                'id': f'{i:022d}',
+                'name': f'Track {i}',
+                'artists': [{'name': f'Artist {rng.randrange(500)}'}, {'name': f'Feature {rng.randrange(500)}'}],
+                'album': {'name': f'Album {rng.randrange(2000)}'},
+                'duration_ms': rng.randrange(120000, 360000),
+                'track_number': rng.randrange(1, 15),
+                'disc_number': 1,
+                'explicit': rng.random() < 0.2,
+                'preview_url': f'https://p.scdn.co/mp3-preview/{i}',
+                'external_urls': {'spotify': f'https://open.spotify.com/track/{i}'},
+                # json.loads gives every track its own list object
+                'available_markets': list(rng.choice(market_sets)),
+                'external_ids': {'isrc': f'USRC1{i:07d}'},
+            }
+        })
+    return {'items': items}
+
+
+def legacy_normalize(playlist_tracks):
+    tracks = []
+    for item in playlist_tracks['items']:
+        track_data = item.get('track', {})
+        if track_data and track_data.get('id'):
+            tracks.append({
+                'id': track_data.get('id', ''),
+                'title': track_data.get('name', 'Unknown Title'),
+                'artist': ', '.join([artist['name'] for artist in track_data.get('artists', [])]) if track_data.get('artists') else 'Unknown Artist',
+                'album': track_data.get('album', {}).get('name', 'Unknown Album'),
+                'duration_ms': track_data.get('duration_ms', 0),
+                'duration_s': track_data.get('duration_ms', 0) / 1000 if track_data.get('duration_ms') else 0,
+                'track_number': track_data.get('track_number', 0),
+                'disc_number': track_data.get('disc_number', 1),
+                'explicit': track_data.get('explicit', False),
+                'preview_url': track_data.get('preview_url', ''),
+                'external_urls': track_data.get('external_urls', {}),
+                'available_markets': track_data.get('available_markets', []),
+                'isrc': track_data.get('external_ids', {}).get('isrc', ''),
+                'added_at': item.get('added_at', ''),
+                'added_by': item.get('added_by', {}).get('display_name', '') if item.get('added_by') else ''
+            })
+    return tracks
+
+
+def track_records(playlist_tracks):
+    return list(iter_tracks(playlist_tracks))
+
+
+def track_records_all_fields(playlist_tracks):
+    return list(iter_tracks(playlist_tracks, FIELDS))
+
+
+# (label, normalize, project one normalized track to what gets serialized)
+PATHS = (
+    ('legacy dicts', legacy_normalize, lambda track: track),
+    ('Track (default)', track_records, lambda track: track.to_dict()),
+    ('Track (all fields)', track_records_all_fields, lambda track: track.to_dict(FIELDS)),
+)
+
+
+def end_to_end(normalize, project, playlist_tracks):
+    # What spotify_playlist.py does: normalize, then serialize every track
+    return sum(len(json.dumps(project(track))) for track in normalize(playlist_tracks))
+
+
+def measure(normalize, project, playlist_tracks, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        encoded = end_to_end(normalize, project, playlist_tracks)
+        samples.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    retained = normalize(playlist_tracks)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+    return min(samples), size, encoded
+
+
+def main(argv):
+    count = int(argv[0]) if argv else 10000
+    runs = int(argv[1]) if len(argv) > 1 else 5
+    playlist_tracks = synthetic_playlist(count)
+
+    print(f"{count} tracks, best of {runs} runs")
+    print(f"{'path':<22}{'tracks/s':>12}{'retained MiB':>15}{'JSON MiB':>11}")
+    for name, normalize, project in PATHS:
+        seconds, size, encoded = measure(normalize, project, playlist_tracks, runs)
+        print(f"{name:<22}{count / seconds:>12,.0f}{size / 2 ** 20:>15.2f}{encoded / 2 ** 20:>11.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
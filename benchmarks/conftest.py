@@ -0,0 +1,221 @@
+"""
+Offline benchmark suite for the Python toolchain.
+
+Every benchmark runs without network access: Spotify pages come from recorded
+spotify_scraper responses, YouTube searches from recorded ytsearch results,
+downloads from a local HTTP server and trim/encode from audio generated with
+ffmpeg. Each benchmark reports median latency, throughput, peak RSS and the
+per-stage breakdown collected by common/timings.py.
+
+Usage:
+    python -m pytest benchmarks [--bench-rounds N] [--bench-json results.json]
+        [--bench-baseline baseline.json] [--bench-tolerance 0.25]
+
+--bench-json writes the results; passing an earlier results file as
+--bench-baseline fails every benchmark whose median got slower than the
+baseline by more than the tolerance (a fraction of the baseline median).
+"""
+import os
+import sys
+import json
+import time
+import statistics
+import threading
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT_DIR, "benchmarks", "fixtures")
+for name in ("spotify", "youtube", "tests"):
+    sys.path.insert(0, os.path.join(ROOT_DIR, name))
+sys.path.insert(0, ROOT_DIR)
+
+# Puts common/ on sys.path, as it does for the scripts
+import toolchain  # noqa: F401
+import timings
+
+DEFAULT_ROUNDS = 3
+DEFAULT_TOLERANCE = 0.25
+# How often the RSS sampler wakes up, in seconds
+SAMPLE_INTERVAL = 0.005
+
+_results = []
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("bench", "offline benchmarks")
+    group.addoption("--bench-rounds", type=int, default=DEFAULT_ROUNDS,
+                    help="timed rounds per benchmark, after one warmup round")
+    group.addoption("--bench-json", default=None, help="write benchmark results to this file")
+    group.addoption("--bench-baseline", default=None, help="results file to compare medians against")
+    group.addoption("--bench-tolerance", type=float, default=DEFAULT_TOLERANCE,
+                    help="allowed slowdown against the baseline, as a fraction")
+
+
+def rss_bytes():
+    """Resident set size of this process, or None where /proc isn't available"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def max_rss_bytes():
+    """High-water RSS of the process so far, for platforms without /proc"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RssSampler:
+    """
+    Samples the process RSS on a background thread while a benchmark runs
+
+    The kernel's own high-water mark (ru_maxrss) can't be reset between
+    benchmarks, so on Linux the peak is taken from samples instead. Memory of
+    child processes (ffmpeg) is not included.
+    """
+
+    def __init__(self):
+        self.peak = rss_bytes()
+        self.stop = threading.Event()
+        self.thread = None
+
+    def __enter__(self):
+        if self.peak is not None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stop.wait(SAMPLE_INTERVAL):
+            self.peak = max(self.peak, rss_bytes() or 0)
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        if self.thread:
+            self.thread.join()
+            self.peak = max(self.peak, rss_bytes() or 0)
+        else:
+            self.peak = max_rss_bytes()
+        return False
+
+
+class Bench:
+    """
+    Times a callable over a warmup round and a number of measured rounds
+
+    Calling the fixture runs the benchmark, records its result for the
+    session report and returns it.
+    """
+
+    def __init__(self, name, config):
+        self.name = name
+        self.rounds = config.getoption("--bench-rounds", DEFAULT_ROUNDS)
+        self.tolerance = config.getoption("--bench-tolerance", DEFAULT_TOLERANCE)
+        self.baseline = load_baseline(config.getoption("--bench-baseline", None))
+
+    def __call__(self, fn, items=1, unit="items", setup=None):
+        """
+        Args:
+            fn (callable): The code under test; receives setup's return values
+            items (int): Units of work one call of fn handles, for throughput
+            unit (str): Name of those units in the report
+            setup (callable): Runs before every round outside the timing and
+                returns a tuple of arguments for fn
+
+        Returns:
+            dict: name, median_ms, min_ms, throughput, peak_rss_mb and stages
+        """
+        def run_round():
+            args = setup() if setup else ()
+            with timings.recording() as recorder:
+                start = time.perf_counter()
+                fn(*args)
+                elapsed = time.perf_counter() - start
+            return elapsed, recorder.report()["stages"]
+
+        # Imports, caches and connection setup are paid once per process
+        run_round()
+
+        samples = []
+        stages = {}
+        with RssSampler() as sampler:
+            for _ in range(self.rounds):
+                elapsed, report = run_round()
+                samples.append(elapsed)
+                for stage, entry in report.items():
+                    stages.setdefault(stage, []).append(entry["ms"])
+
+        median = statistics.median(samples)
+        result = {
+            "name": self.name,
+            "rounds": self.rounds,
+            "median_ms": round(median * 1000, 3),
+            "min_ms": round(min(samples) * 1000, 3),
+            "items": items,
+            "unit": unit,
+            "throughput": round(items / median, 1) if median else None,
+            "peak_rss_mb": round(sampler.peak / 2 ** 20, 1) if sampler.peak else None,
+            # Median milliseconds per round spent in each timings stage
+            "stages": {stage: round(statistics.median(ms), 3) for stage, ms in stages.items()},
+        }
+        _results.append(result)
+        self.check_regression(result)
+        return result
+
+    def check_regression(self, result):
+        base = self.baseline.get(self.name)
+        if not base:
+            return
+        limit = base["median_ms"] * (1 + self.tolerance)
+        if result["median_ms"] > limit:
+            pytest.fail(f"{self.name} regressed: median {result['median_ms']:.1f} ms, "
+                        f"baseline {base['median_ms']:.1f} ms (+{self.tolerance:.0%} allowed)")
+
+
+_baselines = {}
+
+
+def load_baseline(path):
+    if not path:
+        return {}
+    if path not in _baselines:
+        with open(path, "r", encoding="utf-8") as f:
+            _baselines[path] = {entry["name"]: entry for entry in json.load(f)["results"]}
+    return _baselines[path]
+
+
+@pytest.fixture
+def bench(request):
+    return Bench(request.node.nodeid.split("::", 1)[-1], request.config)
+
+
+@pytest.fixture(scope="session")
+def fixtures_dir():
+    return FIXTURES_DIR
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(f"{'name':<52} {'median ms':>10} {'throughput':>18} {'peak RSS':>9}  stages (ms)")
+    for result in _results:
+        throughput = f"{result['throughput']:,.1f} {result['unit']}/s" if result["throughput"] else "-"
+        rss = f"{result['peak_rss_mb']} MB" if result["peak_rss_mb"] else "-"
+        stages = ", ".join(f"{stage} {ms:.1f}" for stage, ms in result["stages"].items())
+        terminalreporter.write_line(f"{result['name']:<52} {result['median_ms']:>10.1f} {throughput:>18} {rss:>9}  {stages}")
+
+
+def pytest_sessionfinish(session):
+    path = session.config.getoption("--bench-json", None)
+    if not path or not _results:
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"python": sys.version.split()[0], "platform": sys.platform, "results": _results}, f, indent=1)
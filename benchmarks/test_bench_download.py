@@ -0,0 +1,63 @@
+"""
+Container downloads from a local HTTP server serving generated audio.
+
+The ranged engine is measured directly and through the download stage,
+against yt-dlp's own single-stream download of the same URL. The server is
+on loopback, so these numbers track per-request and copy overhead rather
+than real network throughput.
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+import ranged_download
+from range_server import RangeServer
+from youtube_downloader import download_audio_container, transfer_options
+
+# Roughly a four minute track at 128 kbit/s
+AUDIO_BYTES = 4 * 2 ** 20
+
+
+@pytest.fixture(scope="module")
+def server():
+    stub = RangeServer(os.urandom(AUDIO_BYTES))
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def workdir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def fresh(workdir, name):
+    def setup():
+        path = os.path.join(workdir, name)
+        for leftover in (path, path + ".m4a"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        return (path,)
+    return setup
+
+
+@pytest.mark.parametrize("connections", [1, 4])
+def test_ranged_download(bench, server, workdir, connections):
+    result = bench(lambda dest: ranged_download.download(server.url, dest, connections=connections),
+                   items=AUDIO_BYTES / 2 ** 20, unit="MB", setup=fresh(workdir, "track.m4a"))
+
+    assert result["median_ms"] > 0
+
+
+@pytest.mark.parametrize("engine", ["ytdlp", "parallel"])
+def test_download_stage(bench, server, workdir, engine):
+    def download(path):
+        ok, info = download_audio_container(server.url, path, transfer=transfer_options(engine, 4))
+        assert ok, info
+
+    result = bench(download, items=AUDIO_BYTES / 2 ** 20, unit="MB", setup=fresh(workdir, "song"))
+
+    assert "download" in result["stages"]
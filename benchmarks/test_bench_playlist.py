@@ -0,0 +1,100 @@
+"""
+extract_playlist_metadata at 100, 1k and 10k tracks from a recorded playlist page.
+
+fixtures/spotify_playlist.json is one get_playlist_info response; larger
+playlists are built by cloning its tracks under fresh ids, so the benchmark
+measures normalization and output rather than the scraper.
+
+Refresh the recording with:
+    python benchmarks/test_bench_playlist.py --record <playlist_url>
+"""
+import os
+import sys
+import copy
+import json
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "spotify"))
+
+from spotify_playlist import NdjsonWriter, extract_playlist_metadata
+
+FIXTURE = os.path.join(ROOT_DIR, "benchmarks", "fixtures", "spotify_playlist.json")
+PLAYLIST_URL = "https://open.spotify.com/playlist/37i9dQZF1DXcBWIGoYBM5M"
+SIZES = (100, 1000, 10000)
+
+
+def scaled_playlist(page, size):
+    """The recorded page with its tracks repeated under unique ids up to size tracks"""
+    items = page["tracks"]["items"]
+    scaled = []
+    for i in range(size):
+        item = copy.deepcopy(items[i % len(items)])
+        item["track"]["id"] = f"{item['track']['id'][:14]}{i:08d}"
+        item["track"]["external_ids"]["isrc"] = f"BENCH{i:07d}"
+        scaled.append(item)
+    return {**page, "track_count": size, "tracks": {"items": scaled, "total": size}}
+
+
+class RecordedClient:
+    """Answers get_playlist_info with a recorded page, like a warm SpotifyClient"""
+
+    def __init__(self, page):
+        self.page = page
+
+    def get_playlist_info(self, url):
+        return self.page
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(scope="module")
+def recorded():
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_extract_playlist(bench, recorded, size):
+    client = RecordedClient(scaled_playlist(recorded, size))
+
+    result = bench(lambda: extract_playlist_metadata(PLAYLIST_URL, client=client), items=size, unit="tracks")
+
+    assert "normalize" in result["stages"]
+    assert len(extract_playlist_metadata(PLAYLIST_URL, client=client)["playlist"]["tracks"]) == size
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_stream_playlist(bench, recorded, size):
+    client = RecordedClient(scaled_playlist(recorded, size))
+
+    def stream():
+        with open(os.devnull, "w") as out:
+            writer = NdjsonWriter(out)
+            extract_playlist_metadata(PLAYLIST_URL, client=client, writer=writer)
+        assert writer.count == size
+
+    bench(stream, items=size, unit="tracks")
+
+
+def record(url, path=FIXTURE):
+    from spotify_scraper import SpotifyClient
+
+    client = SpotifyClient()
+    try:
+        page = client.get_playlist_info(url)
+    finally:
+        client.close()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(page, f, indent=1, ensure_ascii=False)
+    print(f"recorded {len(page.get('tracks', {}).get('items', []))} tracks from {url}")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "--record":
+        print(__doc__)
+        sys.exit(1)
+    sys.exit(record(sys.argv[2]))
@@ -0,0 +1,86 @@
+"""
+Batch YouTube resolution against recorded ytsearch results.
+
+yt_dlp.YoutubeDL is replaced by a stub that answers every search from
+fixtures/youtube_search.json (the bench_matcher fixtures), so the numbers
+cover the match cache, thread fan-out and ranking without the network.
+"""
+import json
+
+import pytest
+
+import fetch_youtube_url
+from match_cache import MatchCache
+from youtube_matcher import rank_candidates
+
+BATCH = 200
+
+
+class RecordedYDL:
+    """Stands in for yt_dlp.YoutubeDL(YDL_SEARCH_OPTS), answering searches by query text"""
+
+    results = {}
+
+    def __init__(self, params=None):
+        pass
+
+    def extract_info(self, query, download=False):
+        _, text = query.split(":", 1)
+        return {"_type": "playlist", "entries": self.results.get(text, [])}
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@pytest.fixture(scope="module")
+def cases(fixtures_dir):
+    with open(f"{fixtures_dir}/youtube_search.json", "r", encoding="utf-8") as f:
+        return json.load(f)["cases"]
+
+
+@pytest.fixture
+def tracks(cases, monkeypatch):
+    # Distinct titles per batch entry so the in-batch de-duplication doesn't collapse them
+    tracks = []
+    results = {}
+    for i in range(BATCH):
+        case = cases[i % len(cases)]
+        title = f"{case['track']['title']} {i}"
+        tracks.append({**case["track"], "title": title, "id": f"bench{i}"})
+        results[f"{title} {case['track']['artist']}"] = case["candidates"]
+    monkeypatch.setattr(RecordedYDL, "results", results)
+    monkeypatch.setattr(fetch_youtube_url.yt_dlp, "YoutubeDL", RecordedYDL)
+    return tracks
+
+
+def test_resolve_batch_uncached(bench, tracks):
+    result = bench(lambda: fetch_youtube_url.search_youtube_for_tracks(tracks, max_workers=4),
+                   items=len(tracks), unit="tracks")
+
+    assert {"youtube_search", "rank"} <= set(result["stages"])
+
+
+def test_resolve_batch_cached(bench, tracks, tmp_path):
+    cache = MatchCache(path=str(tmp_path / "matches.db"))
+    try:
+        fetch_youtube_url.search_youtube_for_tracks(tracks, cache=cache)
+
+        result = bench(lambda: fetch_youtube_url.search_youtube_for_tracks(tracks, cache=cache),
+                       items=len(tracks), unit="tracks")
+    finally:
+        cache.close()
+
+    assert "youtube_search" not in result["stages"]
+
+
+def test_rank_candidates(bench, cases):
+    queries = [case["track"] for case in cases] * 10
+    candidate_lists = [case["candidates"] for case in cases] * 10
+
+    bench(lambda: rank_candidates(queries, candidate_lists), items=len(queries), unit="tracks")
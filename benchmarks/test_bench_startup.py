@@ -0,0 +1,64 @@
+"""
+Interpreter startup of the entry points, as spawned by the Node services.
+
+Every HTTP request that isn't served by a warm worker pays for a fresh
+interpreter, so invocations that never reach yt-dlp or spotify_scraper
+(usage errors, library lookups, transcodes) must not import them. Each case
+runs `python toolchain <script> ...` under -X importtime and checks that:
+
+- none of HEAVY_MODULES is imported
+- the import time the toolchain adds on top of a bare interpreter stays
+  within STARTUP_IMPORT_BUDGET_MS (default 40 ms)
+
+The wall time of the whole run is benchmarked as well.
+"""
+import os
+import re
+import sys
+import subprocess
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLCHAIN = os.path.join(ROOT_DIR, "toolchain")
+
+HEAVY_MODULES = ("yt_dlp", "spotify_scraper", "asyncio", "http.client")
+BUDGET_MS = float(os.environ.get("STARTUP_IMPORT_BUDGET_MS") or 40)
+
+CASES = {
+    "metadata-usage": ["spotify_metadata"],
+    "playlist-usage": ["spotify_playlist", "https://example.com/not-spotify"],
+    "search-usage": ["fetch_youtube_url"],
+    "download-usage": ["youtube_downloader"],
+    "download-lookup": ["youtube_downloader", "--no-library", "--stage", "lookup", "out/song.mp3"],
+}
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)")
+
+
+def imported(command):
+    """Run an interpreter with -X importtime; returns {module: self time in us}"""
+    run = subprocess.run([sys.executable, "-X", "importtime", *command], cwd=ROOT_DIR,
+                         capture_output=True, text=True)
+    return {match.group(2): int(match.group(1))
+            for match in map(IMPORT_LINE.match, run.stderr.splitlines()) if match}
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return imported(["-c", "pass"])
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_startup(bench, baseline, case):
+    command = [TOOLCHAIN, *CASES[case]]
+    modules = imported(command)
+
+    heavy = [name for name in HEAVY_MODULES if name in modules]
+    assert not heavy, f"{case} imports {', '.join(heavy)}"
+    added_ms = sum(us for name, us in modules.items() if name not in baseline) / 1000
+    assert added_ms <= BUDGET_MS, f"{case} spends {added_ms:.1f} ms importing (budget {BUDGET_MS:.0f} ms)"
+
+    result = bench(lambda: subprocess.run([sys.executable, *command], cwd=ROOT_DIR, capture_output=True),
+                   unit="runs")
+    result["stages"]["imports"] = round(added_ms, 3)
@@ -0,0 +1,55 @@
+"""
+Trim and encode of a generated track through transcode_audio.
+
+The source is a sine tone encoded to AAC by ffmpeg at the length of a typical
+song; each round works on a fresh copy because transcoding consumes the
+container. See bench_encode.py for the two-pass comparison.
+"""
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import youtube_downloader
+
+pytestmark = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not on PATH")
+
+TRACK_SECONDS = 210
+# Intro, mid-roll sponsor and outro
+SEGMENTS = [(0.0, 8.0), (60.0, 75.0), (190.0, 210.0)]
+
+
+@pytest.fixture(scope="module")
+def source(tmp_path_factory):
+    path = tmp_path_factory.mktemp("source") / "song.m4a"
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i",
+                    f"sine=frequency=440:sample_rate=48000:duration={TRACK_SECONDS}",
+                    "-c:a", "aac", "-b:a", "128k", str(path)], check=True)
+    return path
+
+
+@pytest.mark.parametrize("profile,segments", [
+    ("mp3-128", []),
+    ("mp3-128", SEGMENTS),
+    ("opus-128", SEGMENTS),
+    ("copy", []),
+], ids=["mp3", "mp3-trimmed", "opus-trimmed", "copy"])
+def test_transcode(bench, source, tmp_path, profile, segments):
+    container = str(tmp_path / "input.m4a")
+
+    def setup():
+        shutil.copyfile(source, container)
+        return ()
+
+    def transcode():
+        ok, output = youtube_downloader.transcode_audio(container, str(tmp_path / "out.mp3"), segments,
+                                                        duration=TRACK_SECONDS, profile=profile)
+        assert ok, output
+        if output != container:
+            os.remove(output)
+
+    # One track per round; throughput is seconds of audio encoded per second
+    result = bench(transcode, items=TRACK_SECONDS, unit="audio-s", setup=setup)
+
+    assert "ffmpeg" in result["stages"]
@@ -0,0 +1,59 @@
+// Compares cold per-request interpreter spawns with warm worker pool dispatch.
+//
+// Usage: node benchmarks/workerPool.js [script] [iterations] [...args]
+// By default it runs fetch_youtube_url with no arguments, which exercises the
+// interpreter startup and heavy imports but returns straight after the usage check.
+const path = require('path');
+const { spawnPythonScript } = require('../src/utils/pythonExecutor');
+const { PythonWorkerPool } = require('../src/utils/pythonWorkerPool');
+
+const SCRIPT_DIRS = {
+  spotify_metadata: 'spotify',
+  spotify_playlist: 'spotify',
+  fetch_youtube_url: 'spotify',
+  youtube_downloader: 'youtube'
+};
+
+const [script = 'fetch_youtube_url', iterationsArg = '20', ...scriptArgs] = process.argv.slice(2);
+const iterations = parseInt(iterationsArg) || 20;
+const scriptPath = path.join(__dirname, '..', SCRIPT_DIRS[script], `${script}.py`);
+
+// Usage errors still reject, but they pay the same startup cost we want to measure
+const settle = (promise) => promise.then(() => true, () => false);
+
+const summarize = (label, samples) => {
+  const sorted = [...samples].sort((a, b) => a - b);
+  const mean = samples.reduce((sum, value) => sum + value, 0) / samples.length;
+  const p95 = sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * 0.95))];
+  console.log(`${label.padEnd(14)} mean ${mean.toFixed(1)}ms  p50 ${sorted[Math.floor(sorted.length / 2)].toFixed(1)}ms  p95 ${p95.toFixed(1)}ms`);
+  return mean;
+};
+
+async function benchmark() {
+  console.log(`Benchmarking ${script} x${iterations}`);
+
+  const cold = [];
+  for (let i = 0; i < iterations; i++) {
+    const start = process.hrtime.bigint();
+    await settle(spawnPythonScript(scriptPath, scriptArgs, { timeout: 60000 }));
+    cold.push(Number(process.hrtime.bigint() - start) / 1e6);
+  }
+
+  const pool = new PythonWorkerPool({ poolSize: 1 });
+  // Warm-up request so interpreter startup is not counted against dispatch
+  await settle(pool.run(script, scriptArgs, { timeout: 60000 }));
+
+  const warm = [];
+  for (let i = 0; i < iterations; i++) {
+    const start = process.hrtime.bigint();
+    await settle(pool.run(script, scriptArgs, { timeout: 60000 }));
+    warm.push(Number(process.hrtime.bigint() - start) / 1e6);
+  }
+  pool.stop();
+
+  const coldMean = summarize('cold spawn', cold);
+  const warmMean = summarize('warm dispatch', warm);
+  console.log(`speedup        ${(coldMean / warmMean).toFixed(1)}x`);
+}
+
+benchmark();
@@ -0,0 +1,48 @@
+import sys
+import importlib
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access
+
+    Every script run is a fresh interpreter, so importing yt_dlp or
+    spotify_scraper at load time costs every invocation, including the ones
+    that only print a usage error or answer from a cache. Attribute reads and
+    writes (monkeypatching in tests) go straight to the real module once it
+    is loaded.
+    """
+
+    __slots__ = ('_name',)
+
+    def __init__(self, name):
+        object.__setattr__(self, '_name', name)
+
+    def _load(self):
+        # import_module returns the cached module after the first call
+        return importlib.import_module(self._name)
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self._load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}>"
+
+
+def lazy_module(name):
+    """
+    Import a module on first use
+
+    Args:
+        name (str): Dotted module name
+
+    Returns:
+        module: The module itself if it was already imported, else a LazyModule
+    """
+    return sys.modules.get(name) or LazyModule(name)
@@ -0,0 +1,175 @@
+import os
+import sys
+import time
+import threading
+import functools
+from contextlib import contextmanager
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PROFILE_DIR = os.path.join(ROOT_DIR, 'cache', 'profiles')
+
+# Argument that turns on cProfile for a single run; stripped before main() sees it
+PROFILE_FLAG = '--profile'
+
+_lock = threading.Lock()
+_current = None
+
+
+class Recorder:
+    """
+    Per-run accumulator of stage timings and byte counts
+
+    A stage entered several times (one YouTube search per track of a batch)
+    accumulates its time, call count and bytes. Stages that run concurrently
+    in threads overlap, so their sum can exceed the total.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.stages = {}
+
+    def record(self, name, seconds, nbytes=0):
+        with _lock:
+            entry = self.stages.get(name)
+            if entry is None:
+                entry = self.stages[name] = {'ms': 0.0, 'calls': 0, 'bytes': 0}
+            entry['ms'] += seconds * 1000
+            entry['calls'] += 1
+            entry['bytes'] += nbytes
+
+    def add_bytes(self, name, nbytes):
+        with _lock:
+            entry = self.stages.setdefault(name, {'ms': 0.0, 'calls': 0, 'bytes': 0})
+            entry['bytes'] += nbytes
+
+    def report(self):
+        """
+        Returns:
+            dict: {'started_at': epoch ms, 'total_ms': float, 'stages': {name: {ms, calls, bytes}}}
+        """
+        with _lock:
+            stages = {
+                name: {'ms': round(entry['ms'], 3), 'calls': entry['calls'], 'bytes': entry['bytes']}
+                for name, entry in self.stages.items()
+            }
+        return {
+            'started_at': round(self.started_at * 1000, 3),
+            'total_ms': round((time.perf_counter() - self.start) * 1000, 3),
+            'stages': stages
+        }
+
+
+def current():
+    """The recorder of the run in progress, or None outside an instrumented main()"""
+    return _current
+
+
+@contextmanager
+def recording():
+    """
+    Make a fresh Recorder the current one for the duration of a block
+
+    instrument() uses this around main(); benchmarks use it to collect the
+    stage breakdown of a library call that doesn't go through a script.
+
+    Yields:
+        Recorder: The active recorder
+    """
+    global _current
+    recorder = Recorder()
+    previous, _current = _current, recorder
+    try:
+        yield recorder
+    finally:
+        _current = previous
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a block as one call of a stage
+
+    Worker threads record into the same run: a worker process serves one
+    request at a time, so the active recorder is process-wide rather than
+    thread-local. Outside an instrumented run this does nothing.
+
+    Args:
+        name (str): Stage name, e.g. 'youtube_search' or 'ffmpeg'
+    """
+    recorder = _current
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.record(name, time.perf_counter() - start)
+
+
+def add_bytes(name, nbytes):
+    """Count bytes moved by a stage (downloaded, encoded, ...)"""
+    recorder = _current
+    if recorder is not None and nbytes:
+        recorder.add_bytes(name, nbytes)
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return 0
+
+
+def profile_path(script):
+    profile_dir = os.environ.get('PROFILE_DIR') or DEFAULT_PROFILE_DIR
+    os.makedirs(profile_dir, exist_ok=True)
+    return os.path.join(profile_dir, f"{script}-{int(time.time() * 1000)}-{os.getpid()}.prof")
+
+
+def instrument(main):
+    """
+    Wrap a script's main(argv, **ctx) so its result carries stage timings
+
+    The returned dict gains a 'timings' entry (see Recorder.report). With
+    --profile in argv the run is executed under cProfile, the stats are dumped
+    to PROFILE_DIR (default <root>/cache/profiles) and the dump path is
+    reported as timings['profile']. Scripts that stream their output and
+    return None can attach current().report() to their final record instead.
+
+    Args:
+        main (callable): The script's main function
+
+    Returns:
+        callable: main with the same signature
+    """
+    script = os.path.splitext(os.path.basename(main.__code__.co_filename))[0]
+
+    @functools.wraps(main)
+    def run(argv, **context):
+        profile = PROFILE_FLAG in argv
+        if profile:
+            argv = [arg for arg in argv if arg != PROFILE_FLAG]
+
+        dump = None
+        with recording() as recorder:
+            if profile:
+                import cProfile
+                profiler = cProfile.Profile()
+                result, exit_code = profiler.runcall(main, argv, **context)
+                dump = profile_path(script)
+                profiler.dump_stats(dump)
+            else:
+                result, exit_code = main(argv, **context)
+
+        if isinstance(result, dict):
+            report = recorder.report()
+            if dump:
+                report['profile'] = dump
+            result['timings'] = report
+        elif dump:
+            print(f"Profile written to {dump}", file=sys.stderr)
+        return result, exit_code
+
+    return run
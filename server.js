@@ -5,6 +5,8 @@ const logger = require('./src/utils/logger');
 const spotifyRoutes = require('./src/routes/spotifyRoutes');
 const youtubeRoutes = require('./src/routes/youtubeRoutes');
 const { errorHandler, notFoundHandler } = require('./src/middleware/errorHandler');
+const { requestMetrics, metricsHandler } = require('./src/middleware/metrics');
+const jobQueue = require('./src/services/jobQueue');
 
 const app = express();
 
@@ -12,6 +14,7 @@ const app = express();
 app.use(express.json({ limit: '10mb' }));
 app.use(express.urlencoded({ extended: true }));
 app.use(cors());
+app.use(requestMetrics);
 
 // Logging middleware
 app.use((req, res, next) => {
@@ -36,6 +39,11 @@ app.get('/health', (req, res) => {
   });
 });
 
+// Prometheus metrics: request latency and per-stage Python timings
+if (config.metrics.enabled) {
+  app.get('/metrics', metricsHandler);
+}
+
 // Error handling middleware
 app.use(notFoundHandler);
 app.use(errorHandler);
@@ -44,6 +52,11 @@ const PORT = config.port || 3000;
 app.listen(PORT, () => {
   logger.info(`Spotify Downloader Server running on port ${PORT}`);
   console.log(`Spotify Downloader Server running on port ${PORT}`);
+
+  // Pick up playlist jobs that were interrupted by the last shutdown
+  jobQueue.start().catch((error) => {
+    logger.error(`Failed to start job queue: ${error.message}`);
+  });
 });
 
 module.exports = app;
\ No newline at end of file
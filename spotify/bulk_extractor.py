@@ -0,0 +1,158 @@
+from metadata_service import FETCHERS, parse_spotify_url, spotify_url
+from track_record import iter_tracks
+
+# Spotify pages that expand into a list of tracks
+COLLECTION_KINDS = ('playlist', 'album', 'artist')
+
+class Page:
+    """
+    One fetched page of tracks: a playlist, an album, or an artist's top tracks
+    """
+
+    __slots__ = ('url', 'tracks', 'album_name', 'error')
+
+    def __init__(self, url, tracks=None, album_name=None, error=None):
+        self.url = url
+        self.tracks = tracks
+        self.album_name = album_name
+        self.error = error
+
+
+def collection_kind(url):
+    """The collection kind of a Spotify URL, or None if it is not a playlist, album or artist"""
+    kind, _ = parse_spotify_url(url)
+    return kind if kind in COLLECTION_KINDS else None
+
+
+def collection_header(kind, data, url):
+    """
+    Summarize a playlist, album or artist page in the playlist header shape
+
+    Returns:
+        dict: name, owner, description, track_count, ... plus the kind of page
+    """
+    header = {
+        'kind': kind,
+        'name': data.get('name', f'Unknown {kind.title()}'),
+        'owner': data.get('owner', {}).get('display_name', 'Unknown Owner'),
+        'description': data.get('description', ''),
+        'track_count': data.get('track_count', 0),
+        'id': data.get('id', ''),
+        'url': url,
+        'external_urls': data.get('external_urls', {}),
+        'followers': (data.get('followers') or {}).get('total', 0),
+        'images': data.get('images', []),
+        'public': data.get('public', None),
+        'collaborative': data.get('collaborative', False),
+        'snapshot_id': data.get('snapshot_id', ''),
+    }
+    if kind == 'album':
+        artists = data.get('artists') or []
+        header['owner'] = ', '.join(artist.get('name', '') for artist in artists) or 'Unknown Artist'
+        header['track_count'] = data.get('total_tracks') or data.get('track_count', 0)
+        header['release_date'] = data.get('release_date', '')
+    elif kind == 'artist':
+        header['owner'] = header['name']
+        header['track_count'] = len(data.get('top_tracks') or [])
+    return header
+
+
+def release_urls(artist):
+    """
+    Album URLs of the releases an artist page lists, in listing order, without duplicates
+
+    SpotifyClient.get_artist_info returns them as popular_releases, each with a
+    spotify:album URI (see tests/fixtures/spotify_artist.json).
+
+    Args:
+        artist (dict): Artist page as returned by SpotifyClient.get_artist_info
+
+    Returns:
+        list: Spotify album URLs
+    """
+    urls = []
+    seen = set()
+    for release in artist.get('popular_releases') or []:
+        kind, album_id = parse_spotify_url(release.get('uri') if isinstance(release, dict) else None)
+        if kind != 'album' or album_id in seen:
+            continue
+        seen.add(album_id)
+        urls.append(spotify_url('album', album_id))
+    return urls
+
+
+def fetch_sequential(client, kind, urls):
+    """
+    Fetch pages one after another with a single client, for callers without a MetadataService
+
+    Yields:
+        tuple: (url, data or None, error or None) in input order
+    """
+    for url in urls:
+        try:
+            yield url, getattr(client, FETCHERS[kind])(url), None
+        except Exception as e:
+            yield url, None, e
+
+
+def iter_pages(kind, data, url, fetch_many=None, discography=False):
+    """
+    Yield the track pages behind a collection
+
+    A playlist or album is its own single page, and an artist yields its top
+    tracks. With discography=True an artist instead yields the releases its
+    page lists, fetched concurrently through fetch_many so they cost one
+    request per album rather than one per track.
+
+    Args:
+        kind (str): One of COLLECTION_KINDS
+        data (dict): The already fetched collection page
+        url (str): URL of the collection page
+        fetch_many (callable): (kind, urls) -> iterator of (url, data, error),
+            e.g. MetadataService.iter_many; needed for discographies
+        discography (bool): Expand an artist into its releases
+
+    Yields:
+        Page: Pages in listing order; a release that failed to load carries its error
+
+    Raises:
+        ValueError: If a discography is asked for and the artist page lists no releases
+    """
+    if kind == 'playlist':
+        yield Page(url, data.get('tracks', {}))
+    elif kind == 'album':
+        yield Page(url, data.get('tracks', {}), data.get('name'))
+    elif kind == 'artist' and not discography:
+        yield Page(url, data.get('top_tracks') or [])
+    elif kind == 'artist':
+        urls = release_urls(data)
+        if not urls:
+            # Rather than an empty listing that looks like a successful one
+            raise ValueError(f"Artist page lists no releases (no popular_releases in {url})")
+        for album_url, album, error in fetch_many('album', urls):
+            if isinstance(album, dict):
+                yield Page(album_url, album.get('tracks', {}), album.get('name'))
+            else:
+                yield Page(album_url, error=str(error or f'Unexpected response type: {type(album)}'))
+
+
+def page_tracks(page, fields=None, seen=None):
+    """
+    Yield the normalized tracks of a page, skipping ones already seen
+
+    The same recording often appears on a single and again on its album, so
+    with a seen set tracks are de-duplicated by id and by ISRC across pages.
+
+    Args:
+        page (Page): Page from iter_pages
+        fields (tuple): Track columns that will be emitted
+        seen (set): Ids and ISRCs yielded so far; updated in place
+    """
+    for track in iter_tracks(page.tracks, fields, page.album_name):
+        if seen is not None:
+            if track.id in seen or (track.isrc and track.isrc in seen):
+                continue
+            seen.add(track.id)
+            if track.isrc:
+                seen.add(track.isrc)
+        yield track
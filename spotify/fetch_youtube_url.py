@@ -1,38 +1,63 @@
+import os
 import sys
 import json
-import yt_dlp
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from match_cache import MatchCache, cache_key
+from youtube_matcher import search_candidates, rank_candidates, best_match
 
-def search_youtube_for_track(track_title, artist_name):
+if __name__ == "__main__":
+    # Run by hand: the toolchain puts common/ on sys.path and runs this file as a module
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from toolchain.cli import run
+    sys.exit(run("fetch_youtube_url", sys.argv[1:]))
+
+import timings
+from lazy_import import lazy_module
+
+# Imported on first use, so runs that never reach yt-dlp don't pay for loading it
+yt_dlp = lazy_module("yt_dlp")
+
+YDL_SEARCH_OPTS = {
+    'quiet': True,  # Reduce output
+    'extract_flat': True,  # Only extract metadata without download
+    'no_warnings': True,  # Suppress warnings
+}
+
+def youtube_watch_url(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def search_youtube_for_track(track_title, artist_name, ydl=None, duration_ms=None):
     """
     Search YouTube for a track using yt-dlp and return the best match URL
+
+    The top few results are fetched in one search and ranked by length,
+    title/artist similarity and channel (see youtube_matcher), instead of
+    taking the first hit.
     
     Args:
         track_title (str): The title of the track
         artist_name (str): The name of the artist
+        ydl (YoutubeDL): Optional warm search instance to reuse
+        duration_ms (int): Spotify track length, used to reject wrong versions
         
     Returns:
         str: YouTube URL of the best match, or None if not found
     """
     try:
-        # Construct search query
-        search_query = f"ytsearch1:{track_title} {artist_name}"
-       
         # Use yt-dlp to search for the track
-        ydl_opts = {
-            'quiet': True,  # Reduce output
-            'extract_flat': True,  # Only extract metadata without download
-            'no_warnings': True,  # Suppress warnings
-        }
-       
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            result = ydl.extract_info(search_query, download=False)
-           
-            if result and 'entries' in result and result['entries']:
-                # Get the first (best) match
-                entry = result['entries'][0]
-                video_id = entry.get('id')
-                if video_id:
-                    return f"https://www.youtube.com/watch?v={video_id}"
+        with timings.stage('youtube_search'):
+            if ydl is None:
+                with yt_dlp.YoutubeDL(YDL_SEARCH_OPTS) as ydl:
+                    candidates = search_candidates(ydl, track_title, artist_name)
+            else:
+                candidates = search_candidates(ydl, track_title, artist_name)
+
+        with timings.stage('rank'):
+            match = best_match({'title': track_title, 'artist': artist_name, 'duration_ms': duration_ms}, candidates)
+        if match:
+            return youtube_watch_url(match['id'])
    
     except Exception as e:
         # Log the error but don't break the main functionality
@@ -42,25 +67,206 @@ def search_youtube_for_track(track_title, artist_name):
     return None
 
 
+def load_batch_tracks(source):
+    """
+    Read a track list for batch resolution
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
+    Args:
+        source (str): Path to a JSON file, or '-' for stdin. The JSON may be a list
+            of tracks or the output of extract_playlist_metadata.
+
+    Returns:
+        list: Track dicts with at least title and artist
+    """
+    if source == '-':
+        data = json.load(sys.stdin)
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+    if isinstance(data, dict):
+        data = data.get('playlist', data).get('tracks', [])
+    return data
+
+
+def search_youtube_for_tracks(tracks, max_workers=4, cache=None):
+    """
+    Resolve YouTube URLs for a whole track list concurrently
+
+    Tracks already in the match cache are answered without searching, and
+    tracks sharing a cache key inside the batch are searched only once.
+
+    Args:
+        tracks (list): Track dicts with title, artist and optionally isrc/id/duration_ms
+        max_workers (int): Number of concurrent searches
+        cache (MatchCache): Optional match cache to read from and write to
+
+    Returns:
+        list: One result dict per input track, in input order
+    """
+    keys = [cache_key(t.get('title', ''), t.get('artist', ''), t.get('isrc')) for t in tracks]
+
+    urls = {}
+    pending = {}
+    with timings.stage('match_cache'):
+        for key, track in zip(keys, tracks):
+            if key in urls or key in pending:
+                continue
+            cached = cache.get(key) if cache else None
+            if cached:
+                urls[key] = cached
+            else:
+                pending[key] = track
+
+    # YoutubeDL instances are not thread-safe, so every search thread gets its own
+    local = threading.local()
+
+    def search(track):
+        if not hasattr(local, 'ydl'):
+            local.ydl = yt_dlp.YoutubeDL(YDL_SEARCH_OPTS)
+        try:
+            with timings.stage('youtube_search'):
+                return search_candidates(local.ydl, track.get('title', ''), track.get('artist', ''))
+        except Exception as e:
+            print(f"Error searching YouTube: {str(e)}", file=sys.stderr)
+            return []
+
+    cached_keys = set(urls)
+    if pending:
+        # Searches run concurrently; ranking then scores the whole batch in one pass
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            candidate_lists = list(executor.map(search, pending.values()))
+        with timings.stage('rank'):
+            matches = rank_candidates(list(pending.values()), candidate_lists)
+        for key, match in zip(pending, matches):
+            youtube_url = youtube_watch_url(match['id']) if match else None
+            urls[key] = youtube_url
+            if youtube_url and cache:
+                cache.set(key, youtube_url)
+
+    results = []
+    for key, track in zip(keys, tracks):
+        results.append({
+            'id': track.get('id', ''),
+            'title': track.get('title', ''),
+            'artist': track.get('artist', ''),
+            'isrc': track.get('isrc', ''),
+            'youtube_url': urls.get(key),
+            'cached': key in cached_keys
+        })
+    return results
+
+
+def create_worker_context():
+    """
+    Build the long-lived objects a worker process keeps between requests
+
+    Returns:
+        dict: Keyword arguments passed to main() on every worker request
+    """
+    return {'ydl': yt_dlp.YoutubeDL(YDL_SEARCH_OPTS), 'cache': MatchCache()}
+
+
+@timings.instrument
+def main(argv, ydl=None, cache=None):
+    """
+    Run the script against an argument list
+
+    Usage:
+        fetch_youtube_url.py [--duration-ms N] <title> <artist> [isrc]
+        fetch_youtube_url.py --batch <tracks.json|-> [max_workers]
+
+    Any invocation accepts --profile (see timings.instrument).
+
+    Args:
+        argv (list): Command line arguments (without the script name)
+        ydl (YoutubeDL): Optional warm search instance to reuse
+        cache (MatchCache): Optional warm match cache to reuse
+
+    Returns:
+        tuple: (result dict, process exit code)
+    """
+    owns_cache = cache is None
+    if owns_cache:
+        cache = MatchCache()
+
+    try:
+        if argv and argv[0] == '--batch':
+            return run_batch(argv[1:], cache)
+        return run_single(argv, ydl, cache)
+    finally:
+        if owns_cache:
+            cache.close()
+
+
+def run_batch(argv, cache):
+    if len(argv) < 1:
+        result = {
+            'success': False,
+            'error': 'No track list provided'
+        }
+        return result, 1
+
+    try:
+        tracks = load_batch_tracks(argv[0])
+    except (OSError, ValueError) as e:
+        result = {
+            'success': False,
+            'error': f'Could not read track list: {str(e)}'
+        }
+        return result, 1
+
+    max_workers = int(argv[1]) if len(argv) > 1 else 4
+    results = search_youtube_for_tracks(tracks, max_workers=max_workers, cache=cache)
+
+    result = {
+        'success': True,
+        'results': results,
+        'cache_hits': sum(1 for r in results if r['cached']),
+        'resolved': sum(1 for r in results if r['youtube_url'])
+    }
+    return result, 0
+
+
+def run_single(argv, ydl, cache):
+    duration_ms = None
+    if '--duration-ms' in argv:
+        i = argv.index('--duration-ms')
+        try:
+            duration_ms = int(argv[i + 1])
+        except (IndexError, ValueError):
+            result = {
+                'success': False,
+                'error': '--duration-ms needs a number of milliseconds'
+            }
+            return result, 1
+        argv = argv[:i] + argv[i + 2:]
+
+    if len(argv) < 2:
         result = {
             'success': False,
             'error': 'No track title and artist provided'
         }
-        print(json.dumps(result))
-        sys.exit(1)
+        return result, 1
     
-    track_title = sys.argv[1]
-    artist_name = sys.argv[2]
-    
-    youtube_url = search_youtube_for_track(track_title, artist_name)
+    track_title = argv[0]
+    artist_name = argv[1]
+    isrc = argv[2] if len(argv) > 2 else None
+
+    key = cache_key(track_title, artist_name, isrc)
+    with timings.stage('match_cache'):
+        youtube_url = cache.get(key)
+    cached = youtube_url is not None
+    if not cached:
+        youtube_url = search_youtube_for_track(track_title, artist_name, ydl=ydl, duration_ms=duration_ms)
+        if youtube_url:
+            cache.set(key, youtube_url)
     
     result = {
         'success': True,
         'youtube_url': youtube_url,
-        'search_query': f"{track_title} {artist_name}"
+        'search_query': f"{track_title} {artist_name}",
+        'cached': cached
     }
     
-    print(json.dumps(result))
\ No newline at end of file
+    return result, 0
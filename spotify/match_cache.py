@@ -0,0 +1,93 @@
+import os
+import re
+import time
+import sqlite3
+import unicodedata
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_PATH = os.path.join(ROOT_DIR, "cache", "youtube_matches.sqlite3")
+DEFAULT_TTL = 7 * 24 * 60 * 60  # 7 days
+# Bump when youtube_matcher picks matches differently, so entries chosen by an
+# older matcher are searched again instead of being served until they expire
+MATCHER_VERSION = 2
+
+
+def normalize_text(value):
+    """
+    Normalize a title or artist string for cache keys
+
+    Lowercases, strips accents and punctuation, and collapses whitespace so
+    "Beyoncé - Halo" and "beyonce halo" map to the same key.
+    """
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    value = re.sub(r'[^\w\s]', ' ', value.lower())
+    return ' '.join(value.split())
+
+
+def cache_key(title, artist, isrc=None):
+    """
+    Build the cache key for a track
+
+    Args:
+        title (str): Track title
+        artist (str): Artist name(s)
+        isrc (str): ISRC code, preferred when available
+
+    Returns:
+        str: Cache key
+    """
+    if isrc:
+        return f"m{MATCHER_VERSION}:isrc:{isrc.strip().upper()}"
+    return f"m{MATCHER_VERSION}:q:{normalize_text(title)}|{normalize_text(artist)}"
+
+
+class MatchCache:
+    """
+    On-disk cache of YouTube matches with TTL eviction
+    """
+
+    def __init__(self, path=None, ttl=None):
+        self.path = path or os.environ.get("MATCH_CACHE_PATH") or DEFAULT_CACHE_PATH
+        self.ttl = ttl if ttl is not None else int(os.environ.get("MATCH_CACHE_TTL") or DEFAULT_TTL)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS matches ("
+            " key TEXT PRIMARY KEY,"
+            " youtube_url TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, key):
+        """Return the cached YouTube URL for a key, or None on a miss or expiry"""
+        row = self.conn.execute(
+            "SELECT youtube_url, created_at FROM matches WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return None
+        if time.time() - row[1] > self.ttl:
+            self.conn.execute("DELETE FROM matches WHERE key = ?", (key,))
+            self.conn.commit()
+            return None
+        return row[0]
+
+    def set(self, key, youtube_url):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO matches (key, youtube_url, created_at) VALUES (?, ?, ?)",
+            (key, youtube_url, time.time())
+        )
+        self.conn.commit()
+
+    def evict_expired(self):
+        """Delete every entry older than the TTL and return how many were removed"""
+        cursor = self.conn.execute(
+            "DELETE FROM matches WHERE created_at < ?", (time.time() - self.ttl,)
+        )
+        self.conn.commit()
+        return cursor.rowcount
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,277 @@
+import os
+import re
+import time
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_CACHE_SIZE = 512
+DEFAULT_CACHE_TTL = 10 * 60  # 10 minutes
+
+SPOTIFY_URL_PATTERN = re.compile(r'(?:open\.spotify\.com/(?:intl-[a-z-]+/)?|spotify:)(track|album|playlist|artist)[/:]([A-Za-z0-9]+)')
+
+# SpotifyClient method used for each kind of page
+FETCHERS = {
+    'track': 'get_track_info',
+    'album': 'get_album_info',
+    'playlist': 'get_playlist_info',
+    'artist': 'get_artist_info',
+}
+
+
+def parse_spotify_url(spotify_url):
+    """
+    Split a Spotify URL or URI into its kind and id
+
+    Query strings such as ?si=... are ignored so every share link of the same
+    track maps to the same cache entry.
+
+    Returns:
+        tuple: (kind, id), or (None, None) if the URL is not recognised
+    """
+    match = SPOTIFY_URL_PATTERN.search(spotify_url or '')
+    if not match:
+        return None, None
+    return match.group(1), match.group(2)
+
+
+def spotify_url(kind, spotify_id):
+    return f"https://open.spotify.com/{kind}/{spotify_id}"
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after a fixed time
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class ClientPool:
+    """
+    Fixed-size pool of SpotifyClient instances
+
+    Clients are created on demand up to the pool size and handed back after
+    each lookup, so their HTTP sessions and tokens are reused. A client that
+    raised is closed and replaced, since its session may be broken.
+    """
+
+    def __init__(self, factory=None, size=None):
+        if factory is None:
+            from spotify_scraper import SpotifyClient
+            factory = SpotifyClient
+        self.factory = factory
+        self.size = size or int(os.environ.get('SPOTIFY_CLIENT_POOL_SIZE') or DEFAULT_POOL_SIZE)
+        self.idle = queue.LifoQueue()
+        # One slot per client that may be in use at the same time
+        self.slots = threading.BoundedSemaphore(self.size)
+
+    def acquire(self):
+        self.slots.acquire()
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self.factory()
+        except Exception:
+            self.slots.release()
+            raise
+
+    def release(self, client, broken=False):
+        if broken:
+            close_quietly(client)
+        else:
+            self.idle.put(client)
+        self.slots.release()
+
+    def call(self, method, *args):
+        client = self.acquire()
+        try:
+            result = getattr(client, method)(*args)
+        except Exception:
+            self.release(client, broken=True)
+            raise
+        self.release(client)
+        return result
+
+    def close(self):
+        while True:
+            try:
+                client = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            close_quietly(client)
+
+
+def close_quietly(client):
+    try:
+        client.close()
+    except Exception:
+        pass
+
+
+class MetadataService:
+    """
+    Cached, coalesced access to Spotify pages through a shared client pool
+
+    Concurrent lookups of the same page share one fetch: the first caller does
+    the request and everyone else waits on its result. Successful results are
+    memoized in an LRU cache with a TTL.
+    """
+
+    def __init__(self, pool=None, cache=None, max_workers=None):
+        self.pool = pool or ClientPool()
+        self.cache = cache or TTLCache(
+            max_entries=int(os.environ.get('SPOTIFY_METADATA_CACHE_SIZE') or DEFAULT_CACHE_SIZE),
+            ttl=int(os.environ.get('SPOTIFY_METADATA_CACHE_TTL') or DEFAULT_CACHE_TTL)
+        )
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or self.pool.size,
+                                           thread_name_prefix='spotify-metadata')
+
+    def fetch(self, kind, url, fresh=False):
+        """
+        Fetch a Spotify page, answering from the cache or an in-flight request when possible
+
+        Args:
+            kind (str): One of track, album, playlist or artist
+            url (str): Spotify URL of the page
+            fresh (bool): Skip the cached copy (an in-flight request is still
+                shared); the page fetched replaces it
+
+        Returns:
+            dict: The page data as returned by SpotifyClient
+        """
+        page_kind, page_id = parse_spotify_url(url)
+        key = f"{kind}:{page_id}" if page_id and page_kind == kind else f"{kind}:{url}"
+
+        cached = None if fresh else self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self.lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.inflight[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = self.pool.call(FETCHERS[kind], url)
+            if isinstance(result, dict):
+                self.cache.set(key, result)
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                del self.inflight[key]
+        return future.result()
+
+    def track(self, url):
+        return self.fetch('track', url)
+
+    def album(self, url):
+        return self.fetch('album', url)
+
+    def playlist(self, url):
+        return self.fetch('playlist', url)
+
+    def artist(self, url):
+        return self.fetch('artist', url)
+
+    def iter_many(self, kind, urls):
+        """
+        Fetch several pages of one kind concurrently, handing each back as soon
+        as it and every page before it are in
+
+        Every request is submitted up front, so the pool stays busy while the
+        caller works through the pages already returned.
+
+        Returns:
+            iterator: (url, data or None, error or None) tuples in input order
+        """
+        def one(url):
+            try:
+                return url, self.fetch(kind, url), None
+            except Exception as e:
+                return url, None, e
+        return self.executor.map(one, urls)
+
+    def fetch_many(self, kind, urls):
+        """
+        Fetch several pages of one kind concurrently
+
+        Returns:
+            list: (url, data or None, error or None) tuples in input order
+        """
+        return list(self.iter_many(kind, urls))
+
+    def related_pages(self, tracks, albums=True, artists=True):
+        """
+        Fetch the album and artist pages referenced by a batch of tracks
+
+        Every album and artist is requested once per batch no matter how many of
+        the tracks share it.
+
+        Args:
+            tracks (list): Track dicts as returned by SpotifyClient.get_track_info
+
+        Returns:
+            dict: {'albums': {id: album}, 'artists': {id: artist}}
+        """
+        wanted = {'album': OrderedDict(), 'artist': OrderedDict()}
+        for track in tracks:
+            album_id = (track.get('album') or {}).get('id')
+            if albums and album_id:
+                wanted['album'][album_id] = None
+            if artists:
+                for artist in track.get('artists') or []:
+                    if artist.get('id'):
+                        wanted['artist'][artist['id']] = None
+
+        pages = {'albums': {}, 'artists': {}}
+        for kind, ids in wanted.items():
+            urls = [spotify_url(kind, page_id) for page_id in ids]
+            for page_id, (_, data, _) in zip(ids, self.fetch_many(kind, urls)):
+                if data is not None:
+                    pages[kind + 's'][page_id] = data
+        return pages
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.pool.close()
@@ -1,74 +1,186 @@
+import os
 import sys
 import json
-import re
-from urllib.parse import urlparse, parse_qs
-
-
-
-# Try to use spotify_scraper if available
 import logging
+
 # Suppress external package's logging to prevent stdout pollution
 logging.getLogger("spotify_scraper").setLevel(logging.CRITICAL)
 logging.getLogger().setLevel(logging.CRITICAL)  # Set root logger to critical
-from spotify_scraper import SpotifyClient
+from metadata_service import MetadataService
+
+if __name__ == "__main__":
+    # Run by hand: the toolchain puts common/ on sys.path and runs this file as a module
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from toolchain.cli import run
+    sys.exit(run("spotify_metadata", sys.argv[1:]))
+
+import timings
+
+def format_track(track, spotify_url, album=None, artist_pages=None):
+    """
+    Normalize a SpotifyClient track dict into the metadata shape returned to the API
 
-def extract_metadata(spotify_url):
-        # Initialize client
-        client = SpotifyClient()
+    Args:
+        track (dict): Track data from SpotifyClient.get_track_info
+        spotify_url (str): The URL the track was requested with
+        album (dict): Optional full album page, used for label and release date
+        artist_pages (dict): Optional artist id -> artist page, used for genres
+
+    Returns:
+        dict: Track metadata
+    """
+    album = album or {}
+    track_album = track.get('album', {})
+    metadata = {
+        'title': track.get('name', 'Unknown'),
+        'artist': ', '.join([artist['name'] for artist in track.get('artists', [])]) if track.get('artists') else 'Unknown',
+        'album': track_album.get('name', 'Unknown'),
+        'duration_ms': track.get('duration_ms', 0),
+        'duration_s': track.get('duration_ms', 0) / 1000 if track.get('duration_ms') else 0,
+        'release_date': track_album.get('release_date') or album.get('release_date', ''),
+        'track_id': track.get('id', ''),
+        'track_url': spotify_url,
+        'preview_url': track.get('preview_url', ''),
+        'external_urls': track.get('external_urls', {}),
+        'available_markets': track.get('available_markets', []),
+        'disc_number': track.get('disc_number', 1),
+        'track_number': track.get('track_number', 0),
+        'popularity': track.get('popularity', 0),
+        'explicit': track.get('explicit', False),
+        'isrc': track.get('external_ids', {}).get('isrc', ''),
+        'label': track.get('label') or album.get('label', ''),
+        'copyrights': track.get('copyrights') or album.get('copyrights', []),
+        'artists': track.get('artists', [])
+    }
+    if artist_pages is not None:
+        genres = []
+        for artist in track.get('artists', []):
+            for genre in (artist_pages.get(artist.get('id')) or {}).get('genres', []):
+                if genre not in genres:
+                    genres.append(genre)
+        metadata['genres'] = genres
+    return metadata
+
+
+def extract_metadata(spotify_url, client=None, service=None):
+        # Prefer the shared metadata service, then a warm client, then a fresh client
+        owns_client = client is None and service is None
+        if owns_client:
+            from spotify_scraper import SpotifyClient
+            client = SpotifyClient()
 
         try:
             # Get track data
-            track = client.get_track_info(spotify_url)
+            with timings.stage('spotify_fetch'):
+                track = service.track(spotify_url) if service else client.get_track_info(spotify_url)
 
             # Format and return the result
             result = {
                 'success': True,
-                'metadata': {
-                    'title': track.get('name', 'Unknown'),
-                    'artist': ', '.join([artist['name'] for artist in track.get('artists', [])]) if track.get('artists') else 'Unknown',
-                    'album': track.get('album', {}).get('name', 'Unknown'),
-                    'duration_ms': track.get('duration_ms', 0),
-                    'duration_s': track.get('duration_ms', 0) / 1000 if track.get('duration_ms') else 0,
-                    'release_date': track.get('album', {}).get('release_date', ''),
-                    'track_id': track.get('id', ''),
-                    'track_url': spotify_url,
-                    'preview_url': track.get('preview_url', ''),
-                    'external_urls': track.get('external_urls', {}),
-                    'available_markets': track.get('available_markets', []),
-                    'disc_number': track.get('disc_number', 1),
-                    'track_number': track.get('track_number', 0),
-                    'popularity': track.get('popularity', 0),
-                    'explicit': track.get('explicit', False),
-                    'isrc': track.get('external_ids', {}).get('isrc', ''),
-                    'label': track.get('label', ''),
-                    'copyrights': track.get('copyrights', []),
-                    'artists': track.get('artists', [])
-                }
+                'metadata': format_track(track, spotify_url)
             }
             
-            print(json.dumps(result))
             return result
         except Exception as e:
             result = {
                 'success': False,
                 'error': f'Error extracting track info: {str(e)}'
             }
-            print(json.dumps(result))
-            sys.exit(1)
+            return result
         finally:
             # Close the client
-            client.close()
-            
+            if owns_client:
+                client.close()
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
+def extract_metadata_batch(spotify_urls, service):
+    """
+    Extract metadata for many tracks at once
+
+    Tracks are fetched concurrently through the service, and the album and
+    artist pages they share are fetched once for the whole batch to fill in
+    label, release date and genres.
+
+    Args:
+        spotify_urls (list): Spotify track URLs
+        service (MetadataService): Service used for every lookup
+
+    Returns:
+        dict: {'success': True, 'tracks': [...]} with one entry per URL, in order
+    """
+    with timings.stage('spotify_fetch'):
+        fetched = service.fetch_many('track', spotify_urls)
+    tracks = [track for _, track, _ in fetched if isinstance(track, dict)]
+    with timings.stage('spotify_related'):
+        pages = service.related_pages(tracks)
+
+    results = []
+    for url, track, error in fetched:
+        if error is not None or not isinstance(track, dict):
+            results.append({'success': False, 'track_url': url, 'error': f'Error extracting track info: {str(error)}'})
+            continue
+        album = pages['albums'].get((track.get('album') or {}).get('id'))
+        results.append({'success': True, 'metadata': format_track(track, url, album, pages['artists'])})
+    return {'success': True, 'tracks': results}
+
+
+def load_batch_urls(source):
+    """Read track URLs from a JSON list or one URL per line"""
+    text = source.read().strip()
+    if text.startswith('['):
+        return json.loads(text)
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def create_worker_context():
+    """
+    Build the long-lived objects a worker process keeps between requests
+
+    Returns:
+        dict: Keyword arguments passed to main() on every worker request
+    """
+    return {'service': MetadataService()}
+
+
+@timings.instrument
+def main(argv, service=None):
+    """
+    Run the script against an argument list
+
+    Usage:
+        spotify_metadata.py <track_url>
+        spotify_metadata.py --batch <track_url> [<track_url> ...]
+        spotify_metadata.py --batch -     (URLs as a JSON list or lines on stdin)
+
+    Any invocation accepts --profile (see timings.instrument).
+
+    Args:
+        argv (list): Command line arguments (without the script name)
+        service (MetadataService): Optional warm metadata service to reuse
+
+    Returns:
+        tuple: (result dict, process exit code)
+    """
+    batch = '--batch' in argv
+    argv = [arg for arg in argv if arg != '--batch']
+
+    if len(argv) < 1:
         result = {
             'success': False,
             'error': 'No Spotify URL provided'
         }
-        print(json.dumps(result))
-        sys.exit(1)
-    
-    spotify_url = sys.argv[1]
-    extract_metadata(spotify_url)
+        return result, 1
+
+    owns_service = service is None
+    if owns_service:
+        service = MetadataService()
+    try:
+        if batch:
+            urls = load_batch_urls(sys.stdin) if argv == ['-'] else argv
+            return extract_metadata_batch(urls, service), 0
+        spotify_url = argv[0]
+        result = extract_metadata(spotify_url, service=service)
+        return result, 0 if result['success'] else 1
+    finally:
+        if owns_service:
+            service.close()
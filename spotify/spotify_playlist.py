@@ -1,134 +1,134 @@
+import os
 import sys
 import json
 import logging
-from urllib.parse import urlparse
 
 # Suppress external package's logging to prevent stdout pollution
 logging.getLogger("spotify_scraper").setLevel(logging.CRITICAL)
 logging.getLogger().setLevel(logging.CRITICAL)
 
-from spotify_scraper import SpotifyClient
+from metadata_service import FETCHERS, MetadataService
+from track_record import parse_fields
+from bulk_extractor import collection_kind, collection_header, iter_pages, page_tracks, fetch_sequential
 
+if __name__ == "__main__":
+    # Run by hand: the toolchain puts common/ on sys.path and runs this file as a module
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from toolchain.cli import run
+    sys.exit(run("spotify_playlist", sys.argv[1:]))
+
+import timings
+
+
+class NdjsonWriter:
+    """
+    Writes one JSON record per line and flushes it, so readers can act on each
+    record as soon as it is produced
+    """
+
+    def __init__(self, out=None):
+        self.out = out
+        self.count = 0
+
+    def write(self, record_type, payload):
+        out = self.out or sys.stdout
+        line = json.dumps({'type': record_type, **payload}) + '\n'
+        out.write(line)
+        timings.add_bytes('normalize', len(line))
+        out.flush()
+        if record_type == 'track':
+            self.count += 1
 
-def extract_playlist_metadata(spotify_url):
+
+def extract_playlist_metadata(spotify_url, client=None, writer=None, service=None, fields=None,
+                              discography=False, fresh=False):
     """
-    Extract metadata from a Spotify playlist URL
+    Extract metadata from a Spotify playlist, album or artist URL
     
     Args:
-        spotify_url (str): The Spotify playlist URL
+        spotify_url (str): The Spotify playlist, album or artist URL
+        client (SpotifyClient): Optional warm client to reuse instead of creating one
+        service (MetadataService): Optional shared metadata service, preferred over client
+        fields (tuple): Track columns to return; defaults to track_record.DEFAULT_FIELDS
+        writer (NdjsonWriter): When given, the playlist header and every track are
+            streamed to it as they are normalized instead of being collected
+        discography (bool): For an artist URL, list the releases on the artist
+            page instead of the top tracks; the album pages are fetched concurrently
+        fresh (bool): Fetch the playlist, album or artist page even when the
+            service has it cached, so the track list is current
     
     Returns:
         dict: Playlist metadata including name, owner, description, and tracks
+            (tracks is left empty when streaming). Albums and artists use the same
+            shape, with "kind" telling them apart.
     """
-    client = SpotifyClient()
+    kind = collection_kind(spotify_url) or 'playlist'
+    owns_service = service is None and client is None and kind == 'artist' and discography
+    owns_client = client is None and service is None and not owns_service
+    if owns_service:
+        service = MetadataService()
+    elif owns_client:
+        from spotify_scraper import SpotifyClient
+        client = SpotifyClient()
     
     try:
-        # Get playlist data
-        playlist = client.get_playlist_info(spotify_url)
+        # Get the playlist, album or artist page
+        with timings.stage('spotify_fetch'):
+            if service:
+                playlist = service.fetch(kind, spotify_url, fresh=fresh)
+            else:
+                playlist = getattr(client, FETCHERS[kind])(spotify_url)
         
         if isinstance(playlist, list):
             result = {
                 'success': False,
                 'error': f'Unexpected response type: list instead of dict. First few items: {playlist[:2] if len(playlist) > 0 else []}'
             }
-            print(json.dumps(result))
+            return result
 
         elif not isinstance(playlist, dict):
             result = {
                 'success': False,
                 'error': f'Unexpected response type: {type(playlist)}. Expected dict.'
             }
-            print(json.dumps(result))
+            return result
         
         result = {
             'success': True,
-            'playlist': {
-                'name': playlist.get('name', 'Unknown Playlist'),
-                'owner': playlist.get('owner', {}).get('display_name', 'Unknown Owner'),
-                'description': playlist.get('description', ''),
-                'track_count': playlist.get('track_count', 0),
-                'id': playlist.get('id', ''),
-                'url': spotify_url,
-                'external_urls': playlist.get('external_urls', {}),
-                'followers': playlist.get('followers', {}).get('total', 0),
-                'images': playlist.get('images', []),
-                'public': playlist.get('public', None),
-                'collaborative': playlist.get('collaborative', False),
-                'tracks': []
-            }
+            'playlist': {**collection_header(kind, playlist, spotify_url), 'tracks': []}
         }
-        
-        # Process each track in the playlist
-        playlist_tracks = playlist.get('tracks', {})
-        if isinstance(playlist_tracks, dict) and 'items' in playlist_tracks:
-            for item in playlist_tracks['items']:
-                track_data = item.get('track', {})
-                if track_data and track_data.get('id'):  # Only add tracks that have valid data
-                    track_info = {
-                        'id': track_data.get('id', ''),
-                        'title': track_data.get('name', 'Unknown Title'),
-                        'artist': ', '.join([artist['name'] for artist in track_data.get('artists', [])]) if track_data.get('artists') else 'Unknown Artist',
-                        'album': track_data.get('album', {}).get('name', 'Unknown Album'),
-                        'duration_ms': track_data.get('duration_ms', 0),
-                        'duration_s': track_data.get('duration_ms', 0) / 1000 if track_data.get('duration_ms') else 0,
-                        'track_number': track_data.get('track_number', 0),
-                        'disc_number': track_data.get('disc_number', 1),
-                        'explicit': track_data.get('explicit', False),
-                        'preview_url': track_data.get('preview_url', ''),
-                        'external_urls': track_data.get('external_urls', {}),
-                        'available_markets': track_data.get('available_markets', []),
-                        'isrc': track_data.get('external_ids', {}).get('isrc', ''),
-                        'added_at': item.get('added_at', ''),  # When the track was added to the playlist
-                        'added_by': item.get('added_by', {}).get('display_name', '') if item.get('added_by') else ''
-                    }
-                    result['playlist']['tracks'].append(track_info)
-        elif isinstance(playlist_tracks, list):
-            # Handle the case where tracks is a list directly
-            for item in playlist_tracks:
-                # When tracks is a list, each item might be the track itself rather than a wrapper
-                if isinstance(item, dict):
-                    if 'id' in item:  # This item is a track directly
-                        track_info = {
-                            'id': item.get('id', ''),
-                            'title': item.get('name', 'Unknown Title'),
-                            'artist': ', '.join([artist['name'] for artist in item.get('artists', [])]) if item.get('artists') else 'Unknown Artist',
-                            'album': item.get('album', {}).get('name', 'Unknown Album'),
-                            'duration_ms': item.get('duration_ms', 0),
-                            'duration_s': item.get('duration_ms', 0) / 1000 if item.get('duration_ms') else 0,
-                            'track_number': item.get('track_number', 0),
-                            'disc_number': item.get('disc_number', 1),
-                            'explicit': item.get('explicit', False),
-                            'preview_url': item.get('preview_url', ''),
-                            'external_urls': item.get('external_urls', {}),
-                            'available_markets': item.get('available_markets', []),
-                            'isrc': item.get('external_ids', {}).get('isrc', ''),
-                            'added_at': '',  # No added_at when tracks is a list
-                            'added_by': ''
-                        }
+
+        if writer:
+            header = {k: v for k, v in result['playlist'].items() if k != 'tracks'}
+            writer.write('playlist', {'playlist': header})
+
+        if service:
+            fetch_many = service.iter_many
+        else:
+            fetch_many = lambda page_kind, urls: fetch_sequential(client, page_kind, urls)
+        pages = iter_pages(kind, playlist, spotify_url, fetch_many, discography)
+        # Releases of one artist share recordings, so only a discography needs de-duplicating
+        seen = set() if kind == 'artist' else None
+        failed = []
+        while True:
+            with timings.stage('spotify_related'):
+                page = next(pages, None)
+            if page is None:
+                break
+            if page.error:
+                failed.append({'url': page.url, 'error': page.error})
+                continue
+            # Normalize every track in one pass, whichever shape the tracks came in
+            with timings.stage('normalize'):
+                for track in page_tracks(page, fields, seen):
+                    track_info = track.to_dict(fields)
+                    if writer:
+                        writer.write('track', {'track': track_info})
+                    else:
                         result['playlist']['tracks'].append(track_info)
-                    else:  # Item is a wrapper containing a track
-                        track_data = item.get('track', {})
-                        if track_data and track_data.get('id'):
-                            track_info = {
-                                'id': track_data.get('id', ''),
-                                'title': track_data.get('name', 'Unknown Title'),
-                                'artist': ', '.join([artist['name'] for artist in track_data.get('artists', [])]) if track_data.get('artists') else 'Unknown Artist',
-                                'album': track_data.get('album', {}).get('name', 'Unknown Album'),
-                                'duration_ms': track_data.get('duration_ms', 0),
-                                'duration_s': track_data.get('duration_ms', 0) / 1000 if track_data.get('duration_ms') else 0,
-                                'track_number': track_data.get('track_number', 0),
-                                'disc_number': track_data.get('disc_number', 1),
-                                'explicit': track_data.get('explicit', False),
-                                'preview_url': track_data.get('preview_url', ''),
-                                'external_urls': track_data.get('external_urls', {}),
-                                'available_markets': track_data.get('available_markets', []),
-                                'isrc': track_data.get('external_ids', {}).get('isrc', ''),
-                                'added_at': item.get('added_at', ''),
-                                'added_by': item.get('added_by', {}).get('display_name', '') if item.get('added_by') else ''
-                            }
-                            result['playlist']['tracks'].append(track_info)
-        
-        print(json.dumps(result))
+
+        if failed:
+            result['failed_pages'] = failed
         return result
         
     except Exception as e:
@@ -145,34 +145,108 @@ def extract_playlist_metadata(spotify_url):
                 'success': False,
                 'error': f'Error extracting playlist info: {error_msg}'
             }
-        print(json.dumps(result))
+        return result
 
     finally:
         # Close the client
-        try:
-            client.close()
-        except:
-            # If closing fails, just continue
-            pass
+        if owns_service:
+            service.close()
+        if owns_client:
+            try:
+                client.close()
+            except:
+                # If closing fails, just continue
+                pass
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
+def create_worker_context():
+    """
+    Build the long-lived objects a worker process keeps between requests
+
+    Returns:
+        dict: Keyword arguments passed to main() on every worker request
+    """
+    return {'service': MetadataService()}
+
+
+@timings.instrument
+def main(argv, service=None):
+    """
+    Run the script against an argument list
+
+    Usage:
+        spotify_playlist.py <playlist_url>
+        spotify_playlist.py --ndjson <playlist_url>
+        spotify_playlist.py [--ndjson] --fields id,title,artist <playlist_url>
+        spotify_playlist.py [--ndjson] <album_url | artist_url>
+        spotify_playlist.py [--ndjson] --discography <artist_url>
+        spotify_playlist.py [--ndjson] --fresh <playlist_url>
+
+    With --ndjson the output is one JSON record per line: a "playlist" header,
+    one "track" record per track as soon as it is normalized, and a final "end"
+    or "error" record. Nothing is returned for printing in that mode; the
+    stage timings travel on the "end" record instead.
+    --fields limits each track to the listed columns (see track_record.FIELDS).
+    Album URLs list the album's tracks and artist URLs the artist's top tracks;
+    --discography lists the tracks of every release on the artist page
+    instead, fetching the album pages concurrently.
+    --fresh skips the warm service's cached copy of the page, for callers
+    such as playlist sync that need the current track list.
+    --profile runs the request under cProfile (see timings.instrument).
+
+    Args:
+        argv (list): Command line arguments (without the script name)
+        service (MetadataService): Optional warm metadata service to reuse
+
+    Returns:
+        tuple: (result dict, process exit code)
+    """
+    streaming = '--ndjson' in argv
+    discography = '--discography' in argv
+    fresh = '--fresh' in argv
+    argv = [arg for arg in argv if arg not in ('--ndjson', '--discography', '--fresh')]
+
+    fields = None
+    if '--fields' in argv:
+        i = argv.index('--fields')
+        try:
+            fields = parse_fields(argv[i + 1] if i + 1 < len(argv) else '')
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}, 1
+        argv = argv[:i] + argv[i + 2:]
+
+    if len(argv) < 1:
         result = {
             'success': False,
-            'error': 'No Spotify playlist URL provided'
+            'error': 'No Spotify playlist, album or artist URL provided'
         }
-        print(json.dumps(result))
+        return result, 1
     
-    spotify_url = sys.argv[1]
+    spotify_url = argv[0]
     
-    # Basic validation to ensure it's a playlist URL
-    if 'playlist' not in spotify_url.lower():
+    # Basic validation to ensure it's a URL that expands into tracks
+    if not collection_kind(spotify_url):
         result = {
             'success': False,
-            'error': 'URL does not appear to be a Spotify playlist'
+            'error': 'URL does not appear to be a Spotify playlist, album or artist'
         }
-        print(json.dumps(result))
+        if streaming:
+            NdjsonWriter().write('error', result)
+            return None, 0
+        return result, 0
 
-    
-    extract_playlist_metadata(spotify_url)
\ No newline at end of file
+    if not streaming:
+        return extract_playlist_metadata(spotify_url, service=service, fields=fields,
+                                         discography=discography, fresh=fresh), 0
+
+    writer = NdjsonWriter()
+    result = extract_playlist_metadata(spotify_url, service=service, writer=writer, fields=fields,
+                                       discography=discography, fresh=fresh)
+    if result['success']:
+        end = {'success': True, 'count': writer.count, 'timings': timings.current().report()}
+        if result.get('failed_pages'):
+            end['failed_pages'] = result['failed_pages']
+        writer.write('end', end)
+    else:
+        writer.write('error', {'success': False, 'error': result['error']})
+    return None, 0
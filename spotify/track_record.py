@@ -0,0 +1,150 @@
+import sys
+
+# Columns of a normalized track, in output order
+FIELDS = (
+    'id', 'title', 'artist', 'album', 'duration_ms', 'duration_s', 'track_number',
+    'disc_number', 'explicit', 'preview_url', 'external_urls', 'available_markets',
+    'isrc', 'added_at', 'added_by',
+)
+
+# available_markets holds a couple of hundred country codes per track and no
+# downstream stage reads it, so it is only emitted when asked for explicitly
+DEFAULT_FIELDS = tuple(field for field in FIELDS if field != 'available_markets')
+
+_market_lists = {}
+
+
+def intern_markets(markets):
+    """
+    Share one tuple between every track with the same market list
+
+    Tracks from the same release almost always have identical lists, so a
+    playlist keeps a handful of tuples instead of one list per track.
+    """
+    if not markets:
+        return ()
+    key = tuple(markets)
+    shared = _market_lists.get(key)
+    if shared is None:
+        shared = _market_lists[key] = tuple(sys.intern(code) for code in key)
+    return shared
+
+
+def parse_fields(value):
+    """
+    Parse a comma-separated field list such as "id,title,artist"
+
+    Raises:
+        ValueError: If a field name is unknown
+    """
+    fields = tuple(field.strip() for field in value.split(',') if field.strip())
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown track field(s): {', '.join(unknown)}")
+    return fields
+
+
+class Track:
+    """
+    Normalized playlist track
+
+    Built in a single pass over the Spotify track dict, with __slots__ so a
+    large playlist doesn't pay for a dict per track.
+    """
+
+    __slots__ = (
+        'id', 'title', 'artist', 'album', 'duration_ms', 'track_number', 'disc_number',
+        'explicit', 'preview_url', 'external_urls', 'available_markets', 'isrc',
+        'added_at', 'added_by',
+    )
+
+    @classmethod
+    def from_item(cls, item, markets=True, album_name=None):
+        """
+        Build a Track from a playlist item
+
+        Args:
+            item (dict): Either a playlist item wrapping the track under "track"
+                (with added_at / added_by) or a bare track dict
+            markets (bool): Keep available_markets; interning the list is most of
+                the per-track cost, so skip it when the column isn't wanted
+            album_name (str): Album for tracks that don't carry one (album pages
+                list their tracks without it)
+
+        Returns:
+            Track: The normalized track, or None if the item has no track id
+        """
+        if not isinstance(item, dict):
+            return None
+        # A dict with its own id is the track itself; anything else wraps one
+        data = item if 'id' in item else item.get('track')
+        if not isinstance(data, dict):
+            return None
+        track_id = data.get('id')
+        if not track_id:
+            return None
+
+        get = data.get
+        artists = get('artists')
+        album = get('album')
+        external_ids = get('external_ids')
+        added_by = item.get('added_by') if data is not item else None
+
+        track = cls()
+        track.id = track_id
+        track.title = get('name', 'Unknown Title')
+        track.artist = ', '.join([artist['name'] for artist in artists]) if artists else 'Unknown Artist'
+        track.album = album.get('name', 'Unknown Album') if album else album_name or 'Unknown Album'
+        track.duration_ms = get('duration_ms', 0)
+        track.track_number = get('track_number', 0)
+        track.disc_number = get('disc_number', 1)
+        track.explicit = get('explicit', False)
+        track.preview_url = get('preview_url', '')
+        track.external_urls = get('external_urls', {})
+        track.available_markets = intern_markets(get('available_markets')) if markets else ()
+        track.isrc = external_ids.get('isrc', '') if external_ids else ''
+        track.added_at = item.get('added_at', '') if data is not item else ''
+        track.added_by = added_by.get('display_name', '') if added_by else ''
+        return track
+
+    @property
+    def duration_s(self):
+        return self.duration_ms / 1000 if self.duration_ms else 0
+
+    def to_dict(self, fields=None):
+        """
+        Project the track onto a dict
+
+        Args:
+            fields (tuple): Columns to include; defaults to DEFAULT_FIELDS
+
+        Returns:
+            dict: The requested columns, in the order they were requested
+        """
+        if fields is None:
+            fields = DEFAULT_FIELDS
+        result = {field: getattr(self, field) for field in fields}
+        if 'available_markets' in result:
+            result['available_markets'] = list(result['available_markets'])
+        return result
+
+
+def iter_tracks(playlist_tracks, fields=None, album_name=None):
+    """
+    Yield a Track for every valid entry of a playlist's "tracks" value
+
+    Accepts both the paged {"items": [...]} shape and a bare list of items or tracks.
+    available_markets is only collected when fields asks for it. album_name
+    fills in the album of tracks listed on an album page.
+    """
+    if isinstance(playlist_tracks, dict):
+        items = playlist_tracks.get('items') or []
+    elif isinstance(playlist_tracks, list):
+        items = playlist_tracks
+    else:
+        return
+    markets = fields is not None and 'available_markets' in fields
+    for item in items:
+        track = Track.from_item(item, markets=markets, album_name=album_name)
+        if track is not None:
+            yield track
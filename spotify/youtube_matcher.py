@@ -0,0 +1,161 @@
+import os
+import re
+from match_cache import normalize_text
+
+DEFAULT_CANDIDATES = 5
+
+# Feature weights; a perfect Topic-channel upload of the right length scores ~1.0
+WEIGHTS = {
+    'duration': 0.40,
+    'title': 0.25,
+    'artist': 0.15,
+    'channel': 0.10,
+    'rank': 0.10,
+}
+
+# Seconds of length difference that still count as the same recording
+DURATION_TOLERANCE = 4.0
+# Length difference at which the duration score reaches zero
+DURATION_CUTOFF = 45.0
+
+# Version markers that point at a different recording unless the Spotify title has them too
+VERSION_MARKERS = (
+    'live', 'cover', 'karaoke', 'instrumental', 'remix', 'acoustic', 'sped up',
+    'slowed', 'reverb', 'nightcore', '8d', 'loop', '1 hour', '10 hours', 'hour version',
+    'extended', 'reaction', 'tutorial', 'lesson',
+)
+VERSION_PENALTY = 0.25
+# Music videos often carry a spoken intro or skit around the song
+VIDEO_MARKERS = ('official video', 'music video', 'official music video')
+VIDEO_PENALTY = 0.05
+VIDEO_MARKER_SET = frozenset(VIDEO_MARKERS)
+
+# Longest markers first so "official music video" wins over "music video"
+_marker_pattern = re.compile(
+    r'\b(' + '|'.join(re.escape(m) for m in sorted(VERSION_MARKERS + VIDEO_MARKERS, key=len, reverse=True)) + r')\b'
+)
+
+
+def candidate_count():
+    return int(os.environ.get('YOUTUBE_SEARCH_CANDIDATES') or DEFAULT_CANDIDATES)
+
+
+def search_candidates(ydl, track_title, artist_name, count=None):
+    """
+    Fetch the top flat search results for a track in one request
+
+    Args:
+        ydl (YoutubeDL): A YoutubeDL instance configured with extract_flat
+        track_title (str): Spotify track title
+        artist_name (str): Spotify artist name(s)
+        count (int): Number of results to fetch
+
+    Returns:
+        list: Flat result dicts (id, title, duration, channel, ...)
+    """
+    count = count or candidate_count()
+    result = ydl.extract_info(f"ytsearch{count}:{track_title} {artist_name}", download=False)
+    if not result:
+        return []
+    return [entry for entry in (result.get('entries') or []) if entry and entry.get('id')]
+
+
+def _tokens(text):
+    return set(normalize_text(text).split())
+
+
+def _markers(text):
+    return set(_marker_pattern.findall(text))
+
+
+def rank_candidates(queries, candidate_lists):
+    """
+    Score every candidate of a whole batch against its Spotify track in one pass
+
+    The batch is flattened into feature columns (one row per candidate) and the
+    weighted score is computed over the columns together, so a playlist is
+    ranked at once instead of track by track.
+
+    Args:
+        queries (list): Dicts with title, artist and optionally duration_ms
+        candidate_lists (list): One list of flat search results per query
+
+    Returns:
+        list: One dict per query with the best candidate's 'id', 'score' and
+            'index' (position in the search results), or None when there were
+            no candidates
+    """
+    # Per-query features are computed once and broadcast to the query's rows
+    query_title_tokens = [_tokens(q.get('title', '')) for q in queries]
+    query_artist_tokens = [_tokens(q.get('artist', '')) for q in queries]
+    query_markers = [_markers(normalize_text(q.get('title', ''))) for q in queries]
+    query_seconds = [(q.get('duration_ms') or 0) / 1000 for q in queries]
+
+    owner, position, durations, titles, channels = [], [], [], [], []
+    for qi, candidates in enumerate(candidate_lists):
+        for ci, entry in enumerate(candidates):
+            owner.append(qi)
+            position.append(ci)
+            durations.append(entry.get('duration') or 0)
+            titles.append(entry.get('title') or '')
+            channels.append(entry.get('channel') or entry.get('uploader') or '')
+
+    title_text = [normalize_text(t) for t in titles]
+    title_tok = [set(t.split()) for t in title_text]
+    channel_text = [normalize_text(c) for c in channels]
+    channel_tok = [set(c.split()) for c in channel_text]
+
+    # Duration: full marks inside the tolerance, falling linearly to zero at the cutoff.
+    # Unknown lengths on either side score neutral.
+    span = DURATION_CUTOFF - DURATION_TOLERANCE
+    duration_score = [
+        0.5 if not d or not query_seconds[q]
+        else max(0.0, min(1.0, 1 - (abs(d - query_seconds[q]) - DURATION_TOLERANCE) / span))
+        for q, d in zip(owner, durations)
+    ]
+    title_score = [
+        len(query_title_tokens[q] & tok) / len(query_title_tokens[q]) if query_title_tokens[q] else 0.0
+        for q, tok in zip(owner, title_tok)
+    ]
+    artist_score = [
+        len(query_artist_tokens[q] & (tok | ctok)) / len(query_artist_tokens[q]) if query_artist_tokens[q] else 0.0
+        for q, tok, ctok in zip(owner, title_tok, channel_tok)
+    ]
+    # Auto-generated "Artist - Topic" channels carry the studio recording
+    channel_score = [
+        1.0 if c.endswith(' topic') or 'vevo' in ctok
+        else 0.7 if 'official' in ctok or (query_artist_tokens[q] and query_artist_tokens[q] <= ctok)
+        else 0.0
+        for q, c, ctok in zip(owner, channel_text, channel_tok)
+    ]
+    rank_score = [1.0 / (1 + p) for p in position]
+    penalty = [
+        VERSION_PENALTY * len(found - query_markers[q] - VIDEO_MARKER_SET)
+        + VIDEO_PENALTY * len(found & VIDEO_MARKER_SET)
+        for q, found in zip(owner, (_markers(t) for t in title_text))
+    ]
+
+    scores = [
+        WEIGHTS['duration'] * d + WEIGHTS['title'] * t + WEIGHTS['artist'] * a
+        + WEIGHTS['channel'] * c + WEIGHTS['rank'] * r - p
+        for d, t, a, c, r, p in zip(duration_score, title_score, artist_score, channel_score, rank_score, penalty)
+    ]
+
+    best_row = [None] * len(queries)
+    for row, (q, score) in enumerate(zip(owner, scores)):
+        if best_row[q] is None or score > scores[best_row[q]]:
+            best_row[q] = row
+
+    return [
+        None if row is None else {
+            'id': candidate_lists[q][position[row]]['id'],
+            'score': round(scores[row], 4),
+            'index': position[row]
+        }
+        for q, row in enumerate(best_row)
+    ]
+
+
+def best_match(query, candidates):
+    """Rank one track's candidates; see rank_candidates"""
+    return rank_candidates([query], [candidates])[0]
@@ -1,5 +1,14 @@
 // Configuration file
 require('dotenv').config();
+const os = require('os');
+const path = require('path');
+
+// Integer setting where 0 is a real value (no retries, no delay), so only an
+// unset or unparsable variable falls back to the default
+function intSetting(name, fallback) {
+  const value = parseInt(process.env[name]);
+  return Number.isNaN(value) ? fallback : value;
+}
 
 const config = {
   port: process.env.PORT || 3000,
@@ -7,7 +16,64 @@ const config = {
   logLevel: process.env.LOG_LEVEL || 'info',
   timeout: {
     pythonScript: parseInt(process.env.PYTHON_SCRIPT_TIMEOUT) || 30000, // 30 seconds default
-    request: parseInt(process.env.REQUEST_TIMEOUT) || 60000 // 60 seconds default
+    request: parseInt(process.env.REQUEST_TIMEOUT) || 60000, // 60 seconds default
+    discography: parseInt(process.env.DISCOGRAPHY_TIMEOUT) || 300000 // 5 minutes default
+  },
+  pythonWorkers: {
+    enabled: process.env.PYTHON_WORKERS === 'true',
+    poolSize: parseInt(process.env.PYTHON_WORKER_POOL_SIZE) || 2,
+    maxRequestsPerWorker: parseInt(process.env.PYTHON_WORKER_MAX_REQUESTS) || 200,
+    healthCheckInterval: parseInt(process.env.PYTHON_WORKER_HEALTH_INTERVAL) || 15000, // 15 seconds default
+    healthCheckTimeout: parseInt(process.env.PYTHON_WORKER_HEALTH_TIMEOUT) || 5000, // 5 seconds default
+    respawnDelay: 1000
+  },
+  pipeline: {
+    resolveConcurrency: parseInt(process.env.PIPELINE_RESOLVE_CONCURRENCY) || 4,
+    downloadConcurrency: parseInt(process.env.PIPELINE_DOWNLOAD_CONCURRENCY) || 3,
+    sponsorblockConcurrency: parseInt(process.env.PIPELINE_SPONSORBLOCK_CONCURRENCY) || 4,
+    transcodeConcurrency: parseInt(process.env.PIPELINE_TRANSCODE_CONCURRENCY) || os.cpus().length,
+    bufferSize: parseInt(process.env.PIPELINE_BUFFER_SIZE) || 8,
+    retries: intSetting('PIPELINE_RETRIES', 2),
+    retryDelay: intSetting('PIPELINE_RETRY_DELAY', 1000)
+  },
+  jobs: {
+    dir: process.env.JOB_STORE_DIR || path.join(__dirname, '../../data/jobs'),
+    concurrency: parseInt(process.env.JOB_CONCURRENCY) || 1
+  },
+  responseCache: {
+    enabled: process.env.RESPONSE_CACHE !== 'off',
+    maxEntries: parseInt(process.env.RESPONSE_CACHE_MAX_ENTRIES) || 1000,
+    maxBytes: parseInt(process.env.RESPONSE_CACHE_MAX_BYTES) || 64 * 1024 * 1024, // 64 MiB default
+    // Track metadata barely changes; playlists do
+    metadataTtl: intSetting('RESPONSE_CACHE_METADATA_TTL', 86400000), // 1 day default
+    playlistTtl: intSetting('RESPONSE_CACHE_PLAYLIST_TTL', 300000), // 5 minutes default
+    // How long past its TTL an entry is still served while it is refreshed
+    staleTtl: intSetting('RESPONSE_CACHE_STALE_TTL', 86400000), // 1 day default
+    // On-disk tier that survives restarts; off unless a directory is set
+    dir: process.env.RESPONSE_CACHE_DIR || null
+  },
+  sync: {
+    // Last-synced track set of every mirrored playlist, one file per playlist id
+    dir: process.env.SYNC_STATE_DIR || path.join(__dirname, '../../data/sync')
+  },
+  download: {
+    // "ytdlp" (one connection per file) or "parallel" (ranged multi-connection fetching)
+    engine: process.env.DOWNLOAD_ENGINE || 'ytdlp',
+    maxConnections: parseInt(process.env.DOWNLOAD_MAX_CONNECTIONS) || 8,
+    connectionsPerFile: parseInt(process.env.DOWNLOAD_CONNECTIONS_PER_FILE) || 4,
+    maxBandwidth: intSetting('DOWNLOAD_MAX_BANDWIDTH', 0), // bytes per second, 0 = unlimited
+    interactiveReserve: intSetting('DOWNLOAD_INTERACTIVE_RESERVE', 1)
+  },
+  encode: {
+    // Output format: mp3-128, mp3-320, aac-192, opus-128, or copy (keep YouTube's AAC/Opus stream)
+    profile: process.env.TRANSCODE_PROFILE || 'mp3-128',
+    // ffmpeg encodes running at once across the whole server
+    concurrency: parseInt(process.env.ENCODE_CONCURRENCY) || os.cpus().length
+  },
+  metrics: {
+    enabled: process.env.METRICS !== 'off',
+    // Lets a request ask for a cProfile dump of its Python runs with ?profile=1 or X-Profile: 1
+    profiling: process.env.METRICS_PROFILING === 'true'
   },
   allowedOrigins: process.env.ALLOWED_ORIGINS ? process.env.ALLOWED_ORIGINS.split(',') : ['*']
 };
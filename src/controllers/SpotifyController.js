@@ -1,6 +1,13 @@
 const spotifyService = require('../services/spotifyService');
+const jobQueue = require('../services/jobQueue');
 const logger = require('../utils/logger');
-const { validateSpotifyUrl } = require('../utils/validation');
+const config = require('../config/config');
+const { ResponseCache, spotifyCacheKey, canonicalSpotifyUrl, sendCached } = require('../utils/responseCache');
+const { validateSpotifyUrl, validateTranscodeProfile, validateSyncUrl } = require('../utils/validation');
+
+// Responses of the lookup endpoints, keyed on the Spotify id rather than the raw URL
+const metadataCache = new ResponseCache({ name: 'metadata', ttl: config.responseCache.metadataTtl });
+const playlistCache = new ResponseCache({ name: 'playlist', ttl: config.responseCache.playlistTtl });
 
 // Controller for Spotify metadata extraction
 const getSpotifyMetadata = async (req, res) => {
@@ -22,13 +29,13 @@ const getSpotifyMetadata = async (req, res) => {
       });
     }
 
-    // Extract metadata using the service
-    const metadata = await spotifyService.extractMetadata(url);
-    
-    res.status(200).json({
+    // Extract metadata using the service, unless a cached response can answer
+    const cached = await metadataCache.fetch(spotifyCacheKey(url), async () => ({
       success: true,
-      data: metadata
-    });
+      data: await spotifyService.extractMetadata(canonicalSpotifyUrl(url))
+    }));
+
+    sendCached(req, res, cached);
   } catch (error) {
     logger.error(`Error in getSpotifyMetadata controller: ${error.message}`, {
       error: error.message,
@@ -62,14 +69,18 @@ const getSpotifyPlaylist = async (req, res) => {
       });
     }
 
-    // Get playlist tracks using the service
-    const tracks = await spotifyService.getPlaylistTracks(url);
-    
-    res.status(200).json({
-      success: true,
-      data: tracks,
-      count: tracks.length
+    // Get playlist, album, or artist tracks using the service, unless a cached response can answer
+    const discography = req.query.discography === 'true';
+    const cached = await playlistCache.fetch(spotifyCacheKey(url, discography && 'discography'), async () => {
+      const tracks = await spotifyService.getPlaylistTracks(canonicalSpotifyUrl(url), { discography });
+      return {
+        success: true,
+        data: tracks,
+        count: tracks.length
+      };
     });
+
+    sendCached(req, res, cached);
   } catch (error) {
     logger.error(`Error in getSpotifyPlaylist controller: ${error.message}`, {
       error: error.message,
@@ -86,7 +97,7 @@ const getSpotifyPlaylist = async (req, res) => {
 // Controller for downloading a single Spotify track
 const downloadSpotifyTrack = async (req, res) => {
   try {
-    const { url, outputPath } = req.body;
+    const { url, outputPath, profile } = req.body;
 
     // Validate request body
     if (!url) {
@@ -109,8 +120,17 @@ const downloadSpotifyTrack = async (req, res) => {
       });
     }
 
+    if (profile !== undefined) {
+      const profileValidation = validateTranscodeProfile(profile);
+      if (!profileValidation.isValid) {
+        return res.status(400).json({ 
+          error: profileValidation.error 
+        });
+      }
+    }
+
     // Download the track using the service
-    const result = await spotifyService.downloadTrack(url, outputPath);
+    const result = await spotifyService.downloadTrack(url, outputPath, { profile });
     
     res.status(200).json({
       success: true,
@@ -133,7 +153,7 @@ const downloadSpotifyTrack = async (req, res) => {
 // Controller for downloading a Spotify playlist
 const downloadSpotifyPlaylist = async (req, res) => {
   try {
-    const { url, outputPath } = req.body;
+    const { url, outputPath, discography, profile, sync, prune } = req.body;
 
     // Validate request body
     if (!url) {
@@ -156,27 +176,124 @@ const downloadSpotifyPlaylist = async (req, res) => {
       });
     }
 
-    // Start the playlist download using the service
-    // This may take some time, so we'll send an initial response and then process
+    if (profile !== undefined) {
+      const profileValidation = validateTranscodeProfile(profile);
+      if (!profileValidation.isValid) {
+        return res.status(400).json({ 
+          error: profileValidation.error 
+        });
+      }
+    }
+
+    if (sync === true) {
+      const syncValidation = validateSyncUrl(url);
+      if (!syncValidation.isValid) {
+        return res.status(400).json({ 
+          error: syncValidation.error 
+        });
+      }
+    }
+
+    // Queue the playlist download; the job survives restarts and can be polled
+    const job = await jobQueue.enqueuePlaylist(url, outputPath, {
+      discography: discography === true,
+      profile,
+      sync: sync === true,
+      prune: prune === true
+    });
+
+    res.status(202).json({
+      success: true,
+      message: job.type === 'sync' ? 'Playlist sync queued' : 'Playlist download queued',
+      playlistUrl: url,
+      jobId: job.id,
+      statusUrl: `${req.baseUrl}/jobs/${job.id}`,
+      data: job
+    });
+  } catch (error) {
+    logger.error(`Error in downloadSpotifyPlaylist controller: ${error.message}`, {
+      error: error.message,
+      stack: error.stack
+    });
+
+    res.status(500).json({
+      success: false,
+      error: error.message || 'Internal server error'
+    });
+  }
+};
+
+// Controller for polling a download job
+const getDownloadJob = async (req, res) => {
+  try {
+    const includeTracks = req.query.tracks === 'true';
+    const job = await jobQueue.getJob(req.params.id, includeTracks);
+
+    if (!job) {
+      return res.status(404).json({
+        success: false,
+        error: `Job not found: ${req.params.id}`
+      });
+    }
+
     res.status(200).json({
       success: true,
-      message: 'Playlist download started',
-      playlistUrl: url
-    });
-
-    // Process the download in the background
-    try {
-      const result = await spotifyService.downloadPlaylist(url, outputPath);
-      
-      logger.info(`Playlist download completed: ${result.successfulDownloads} successful, ${result.failedDownloads} failed`);
-    } catch (error) {
-      logger.error(`Error in background playlist download: ${error.message}`, {
-        error: error.message,
-        stack: error.stack
+      data: job
+    });
+  } catch (error) {
+    logger.error(`Error in getDownloadJob controller: ${error.message}`, {
+      error: error.message,
+      stack: error.stack
+    });
+
+    res.status(500).json({
+      success: false,
+      error: error.message || 'Internal server error'
+    });
+  }
+};
+
+// Controller for listing download jobs
+const listDownloadJobs = async (req, res) => {
+  try {
+    const jobs = await jobQueue.listJobs();
+
+    res.status(200).json({
+      success: true,
+      data: jobs,
+      count: jobs.length
+    });
+  } catch (error) {
+    logger.error(`Error in listDownloadJobs controller: ${error.message}`, {
+      error: error.message,
+      stack: error.stack
+    });
+
+    res.status(500).json({
+      success: false,
+      error: error.message || 'Internal server error'
+    });
+  }
+};
+
+// Controller for retrying the failed tracks of a finished job
+const retryDownloadJob = async (req, res) => {
+  try {
+    const job = await jobQueue.retryJob(req.params.id);
+
+    if (!job) {
+      return res.status(404).json({
+        success: false,
+        error: `Job not found: ${req.params.id}`
       });
     }
+
+    res.status(202).json({
+      success: true,
+      data: job
+    });
   } catch (error) {
-    logger.error(`Error in downloadSpotifyPlaylist controller: ${error.message}`, {
+    logger.error(`Error in retryDownloadJob controller: ${error.message}`, {
       error: error.message,
       stack: error.stack
     });
@@ -192,5 +309,8 @@ module.exports = {
   getSpotifyMetadata,
   getSpotifyPlaylist,
   downloadSpotifyTrack,
-  downloadSpotifyPlaylist
+  downloadSpotifyPlaylist,
+  getDownloadJob,
+  listDownloadJobs,
+  retryDownloadJob
 };
\ No newline at end of file
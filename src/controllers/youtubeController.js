@@ -1,6 +1,6 @@
 const youtubeService = require('../services/youtubeService');
 const logger = require('../utils/logger');
-const { validateSearchQuery, validateYouTubeUrl, validatePath } = require('../utils/validation');
+const { validateSearchQuery, validateYouTubeUrl, validatePath, validateTranscodeProfile } = require('../utils/validation');
 
 // Controller for fetching YouTube URL
 const getYouTubeUrl = async (req, res) => {
@@ -82,10 +82,50 @@ const searchYouTubeVideos = async (req, res) => {
   }
 };
 
+// Controller for resolving YouTube URLs for a batch of tracks
+const resolveYouTubeUrls = async (req, res) => {
+  try {
+    const { tracks } = req.body;
+
+    // Validate request body
+    if (!Array.isArray(tracks) || tracks.length === 0) {
+      return res.status(400).json({ 
+        error: 'A non-empty tracks array is required in the request body' 
+      });
+    }
+
+    const invalidTrack = tracks.find(track => !track || !track.title || !track.artist);
+    if (invalidTrack !== undefined) {
+      return res.status(400).json({ 
+        error: 'Every track needs a title and an artist' 
+      });
+    }
+
+    // Resolve the whole batch using the service
+    const results = await youtubeService.resolveTrackUrls(tracks);
+    
+    res.status(200).json({
+      success: true,
+      data: results,
+      count: results.length
+    });
+  } catch (error) {
+    logger.error(`Error in resolveYouTubeUrls controller: ${error.message}`, {
+      error: error.message,
+      stack: error.stack
+    });
+
+    res.status(500).json({
+      success: false,
+      error: error.message || 'Internal server error'
+    });
+  }
+};
+
 // Controller for downloading audio from YouTube
 const downloadAudio = async (req, res) => {
   try {
-    const { youtubeUrl, outputPath } = req.body;
+    const { youtubeUrl, outputPath, profile } = req.body;
 
     // Validate request body
     if (!youtubeUrl || !outputPath) {
@@ -109,8 +149,17 @@ const downloadAudio = async (req, res) => {
       });
     }
 
+    if (profile !== undefined) {
+      const profileValidation = validateTranscodeProfile(profile);
+      if (!profileValidation.isValid) {
+        return res.status(400).json({ 
+          error: profileValidation.error 
+        });
+      }
+    }
+
     // Download audio using the service
-    const result = await youtubeService.downloadAudio(youtubeUrl, outputPath);
+    const result = await youtubeService.downloadAudio(youtubeUrl, outputPath, { profile });
     
     res.status(200).json({
       success: true,
@@ -133,5 +182,6 @@ const downloadAudio = async (req, res) => {
 module.exports = {
   getYouTubeUrl,
   searchYouTubeVideos,
+  resolveYouTubeUrls,
   downloadAudio
 };
\ No newline at end of file
@@ -0,0 +1,28 @@
+const config = require('../config/config');
+const { registry, observeHttpRequest } = require('../utils/metrics');
+const { requestContext } = require('../utils/requestContext');
+
+// Records request latency and, when profiling is allowed, opens a request context
+// so "?profile=1" or "X-Profile: 1" turns on cProfile for this request's Python runs
+const requestMetrics = (req, res, next) => {
+  const start = process.hrtime.bigint();
+  res.on('finish', () => {
+    const route = req.route ? req.baseUrl + req.route.path : 'unmatched';
+    observeHttpRequest(req.method, route, res.statusCode, Number(process.hrtime.bigint() - start) / 1e9);
+  });
+
+  const profile = config.metrics.profiling &&
+    (req.query.profile === '1' || req.get('X-Profile') === '1');
+  requestContext.run({ profile }, next);
+};
+
+// Prometheus scrape endpoint
+const metricsHandler = (req, res) => {
+  res.set('Content-Type', 'text/plain; version=0.0.4; charset=utf-8');
+  res.send(registry.render());
+};
+
+module.exports = {
+  requestMetrics,
+  metricsHandler
+};
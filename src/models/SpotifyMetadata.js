@@ -6,9 +6,9 @@ class SpotifyMetadata {
   static  extractMetadata(spotifyUrl) {
     return new Promise((resolve, reject) => {
       // Execute the Python script to extract metadata
-      const pythonScript = path.join(__dirname, '..', '..', 'spotify', 'spotify_metadata.py');
+      const toolchain = path.join(__dirname, '..', '..', 'toolchain');
       
-      const child = exec(`${config.pythonPath} "${pythonScript}" "${spotifyUrl}"`, (error, stdout, stderr) => {
+      const child = exec(`${config.pythonPath} "${toolchain}" spotify_metadata "${spotifyUrl}"`, (error, stdout, stderr) => {
         console.log('Python script stdout:', stdout);  
         console.log('Python script stderr:', stderr);  
 
@@ -75,9 +75,9 @@ class SpotifyMetadata {
   static extractPlaylistMetadata(spotifyUrl) {
     return new Promise((resolve, reject) => {
       // Execute the Python script to extract playlist metadata
-      const pythonScript = path.join(__dirname, '..', '..', 'spotify', 'spotify_playlist.py');
+      const toolchain = path.join(__dirname, '..', '..', 'toolchain');
       
-      const child = exec(`${config.pythonPath} \"${pythonScript}\" \"${spotifyUrl}\"`, (error, stdout, stderr) => {
+      const child = exec(`${config.pythonPath} \"${toolchain}\" spotify_playlist \"${spotifyUrl}\"`, (error, stdout, stderr) => {
         console.log('Python playlist script stdout:', stdout);  
         console.log('Python playlist script stderr:', stderr);  
 
@@ -169,9 +169,9 @@ class SpotifyMetadata {
 
   static fetchYoutubeUrl(TrackName, ArtistName) {
     return new Promise((resolve, reject) => {
-      const pythonScript = path.join(__dirname, '..', '..', 'spotify', 'fetch_youtube_url.py');
+      const toolchain = path.join(__dirname, '..', '..', 'toolchain');
       
-      const child = exec(`${config.pythonPath} "${pythonScript}" "${TrackName}" "${ArtistName}"`, (error, stdout, stderr) => {
+      const child = exec(`${config.pythonPath} "${toolchain}" fetch_youtube_url "${TrackName}" "${ArtistName}"`, (error, stdout, stderr) => {
         if (error) {
           console.error(`Error executing Python script: ${error.message}`);
           reject(new Error('Failed to fetch YouTube URL'));
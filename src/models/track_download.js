@@ -4,8 +4,8 @@ const config = require('../utils/config');
 class trackDownload {
     static downloadTrack(youtubeUrl, outputPath) {
         return new Promise((resolve, reject) => {
-            const pythonScript = path.join(__dirname, '..', '..', 'youtube', 'youtube_downloader.py');
-            const command = `${config.pythonPath} "${pythonScript}" "${youtubeUrl}" "${outputPath}"`;
+            const toolchain = path.join(__dirname, '..', '..', 'toolchain');
+            const command = `${config.pythonPath} "${toolchain}" youtube_downloader "${youtubeUrl}" "${outputPath}"`;
             exec(command, (error, stdout, stderr) => {
                 if (error) {
                     console.error(`Error executing Python script: ${error.message}`);
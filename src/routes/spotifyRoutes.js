@@ -1,7 +1,8 @@
 const express = require('express');
 const router = express.Router();
-const { getSpotifyMetadata, getSpotifyPlaylist } = require('../controllers/spotifyController');
-const { downloadSpotifyTrack, downloadSpotifyPlaylist } = require('../controllers/spotifyController');
+const { getSpotifyMetadata, getSpotifyPlaylist } = require('../controllers/SpotifyController');
+const { downloadSpotifyTrack, downloadSpotifyPlaylist } = require('../controllers/SpotifyController');
+const { getDownloadJob, listDownloadJobs, retryDownloadJob } = require('../controllers/SpotifyController');
 
 // Endpoint to extract metadata from a Spotify URL
 router.get('/metadata', getSpotifyMetadata);
@@ -15,4 +16,9 @@ router.post('/download-track', downloadSpotifyTrack);
 // Endpoint to download all tracks from a Spotify playlist
 router.post('/download-playlist', downloadSpotifyPlaylist);
 
+// Endpoints to poll and retry queued playlist downloads
+router.get('/jobs', listDownloadJobs);
+router.get('/jobs/:id', getDownloadJob);
+router.post('/jobs/:id/retry', retryDownloadJob);
+
 module.exports = router;
\ No newline at end of file
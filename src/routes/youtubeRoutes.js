@@ -1,6 +1,6 @@
 const express = require('express');
 const router = express.Router();
-const { getYouTubeUrl, searchYouTubeVideos, downloadAudio } = require('../controllers/youtubeController');
+const { getYouTubeUrl, searchYouTubeVideos, resolveYouTubeUrls, downloadAudio } = require('../controllers/youtubeController');
 
 // Endpoint to fetch YouTube URL for a given query
 router.get('/url', getYouTubeUrl);
@@ -8,6 +8,9 @@ router.get('/url', getYouTubeUrl);
 // Endpoint to search for YouTube videos
 router.get('/search', searchYouTubeVideos);
 
+// Endpoint to resolve YouTube URLs for a batch of tracks
+router.post('/resolve', resolveYouTubeUrls);
+
 // Endpoint to download audio from YouTube
 router.post('/download', downloadAudio);
 
@@ -0,0 +1,162 @@
+const config = require('../config/config');
+const logger = require('../utils/logger');
+
+// Single-track requests are admitted before any playlist (bulk) download
+const PRIORITIES = ['interactive', 'bulk'];
+
+/**
+ * Process-wide admission control for YouTube downloads.
+ *
+ * Every download asks for a grant before its Python run starts. A grant holds
+ * some of the shared connection budget (maxConnections) and a bandwidth cap
+ * proportional to those connections, so the downloads running at any time
+ * never exceed the configured totals together. When more downloads are
+ * waiting, each new grant gets fewer connections, which spreads the budget
+ * across jobs instead of letting the first one take it all.
+ *
+ * Waiting interactive downloads always go first, and interactiveReserve
+ * connections are kept free of bulk work so a single track can start even
+ * while playlists saturate the link. Bulk downloads are admitted round-robin
+ * by owner (playlist job), so one large playlist doesn't starve another.
+ */
+class DownloadScheduler {
+  constructor(options = {}) {
+    this.options = { ...config.download, ...options };
+    // Bulk work must always be able to use at least one connection
+    this.options.interactiveReserve = Math.min(this.options.interactiveReserve, this.options.maxConnections - 1);
+    this.inUse = 0;
+    this.active = new Set();
+    this.interactive = [];
+    // owner -> FIFO of waiting bulk requests; Map order is the round-robin order
+    this.bulk = new Map();
+  }
+
+  get waiting() {
+    let count = this.interactive.length;
+    for (const queue of this.bulk.values()) {
+      count += queue.length;
+    }
+    return count;
+  }
+
+  /**
+   * Waits for a share of the connection and bandwidth budget
+   * @param {Object} request - { priority: 'interactive'|'bulk', owner } (owner groups bulk work, e.g. a job id)
+   * @returns {Promise<Object>} - Grant { connections, rateLimit, engine }; pass it to release()
+   */
+  acquire({ priority = 'bulk', owner = 'default' } = {}) {
+    if (!PRIORITIES.includes(priority)) {
+      return Promise.reject(new Error(`Unknown download priority: ${priority}`));
+    }
+    return new Promise((resolve) => {
+      const request = { priority, owner, resolve, queuedAt: Date.now() };
+      if (priority === 'interactive') {
+        this.interactive.push(request);
+      } else {
+        if (!this.bulk.has(owner)) {
+          this.bulk.set(owner, []);
+        }
+        this.bulk.get(owner).push(request);
+      }
+      this.pump();
+    });
+  }
+
+  /**
+   * Returns a grant's connections to the budget and admits waiting downloads
+   * @param {Object} grant - The grant from acquire()
+   */
+  release(grant) {
+    if (!this.active.delete(grant)) {
+      return;
+    }
+    this.inUse -= grant.connections;
+    this.pump();
+  }
+
+  /**
+   * Runs fn while holding a grant
+   * @param {Object} request - See acquire()
+   * @param {Function} fn - async (grant) => result
+   * @returns {Promise} - fn's result
+   */
+  async run(request, fn) {
+    const grant = await this.acquire(request);
+    try {
+      return await fn(grant);
+    } finally {
+      this.release(grant);
+    }
+  }
+
+  nextRequest() {
+    const free = this.options.maxConnections - this.inUse;
+    if (this.interactive.length > 0) {
+      return free > 0 ? this.interactive.shift() : null;
+    }
+    if (free <= this.options.interactiveReserve) {
+      return null;
+    }
+    for (const [owner, queue] of this.bulk) {
+      const request = queue.shift();
+      // Move the owner to the back of the rotation (or drop it once drained)
+      this.bulk.delete(owner);
+      if (queue.length > 0) {
+        this.bulk.set(owner, queue);
+      }
+      if (request) {
+        return request;
+      }
+    }
+    return null;
+  }
+
+  pump() {
+    let request;
+    while ((request = this.nextRequest())) {
+      const grant = this.grantFor(request);
+      this.inUse += grant.connections;
+      this.active.add(grant);
+      const waited = Date.now() - request.queuedAt;
+      if (waited > 1000) {
+        logger.debug(`Download slot for ${request.owner} (${request.priority}) granted after ${waited}ms`);
+      }
+      request.resolve(grant);
+    }
+  }
+
+  grantFor(request) {
+    const { maxConnections, connectionsPerFile, maxBandwidth, engine } = this.options;
+    let free = maxConnections - this.inUse;
+    if (request.priority === 'bulk') {
+      free -= this.options.interactiveReserve;
+    }
+    // Everyone running or waiting gets an equal slice of the total
+    const fairShare = Math.max(1, Math.floor(maxConnections / (this.active.size + this.waiting + 1)));
+    const connections = engine === 'parallel'
+      ? Math.max(1, Math.min(connectionsPerFile, fairShare, free))
+      : 1;
+    return {
+      owner: request.owner,
+      priority: request.priority,
+      engine,
+      connections,
+      rateLimit: maxBandwidth > 0 ? Math.floor(maxBandwidth * connections / maxConnections) : 0
+    };
+  }
+
+  /**
+   * @returns {Object} - Current budget usage, for diagnostics
+   */
+  stats() {
+    return {
+      connectionsInUse: this.inUse,
+      maxConnections: this.options.maxConnections,
+      activeDownloads: this.active.size,
+      waitingInteractive: this.interactive.length,
+      waitingBulk: this.waiting - this.interactive.length
+    };
+  }
+}
+
+module.exports = new DownloadScheduler();
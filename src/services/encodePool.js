@@ -0,0 +1,81 @@
+const config = require('../config/config');
+const { executePythonScript } = require('../utils/pythonExecutor');
+const { PythonWorkerPool } = require('../utils/pythonWorkerPool');
+
+/**
+ * Process-wide limit on concurrent ffmpeg encodes.
+ *
+ * Encoding is CPU-bound, so the transcode stages of all playlist pipelines
+ * in the process share one budget sized to the cores, rather than each
+ * pipeline running its own transcodeConcurrency encodes on top of the others.
+ * Downloads are admitted separately by the download scheduler. With warm
+ * workers enabled the encodes also get their own worker processes, so a long
+ * encode never holds a worker that metadata lookups or downloads are waiting
+ * for.
+ */
+class EncodePool {
+  constructor(options = {}) {
+    this.options = { ...config.encode, ...options };
+    this.running = 0;
+    this.waiting = [];
+    this.workers = null;
+  }
+
+  /**
+   * Runs a youtube_downloader.py invocation that encodes, once a slot is free
+   * @param {string} scriptPath - Path to the Python script
+   * @param {Array} args - Arguments to pass to the script
+   * @param {Object} options - executePythonScript options
+   * @returns {Promise} - The script result
+   */
+  async execute(scriptPath, args, options = {}) {
+    await this.acquire();
+    try {
+      return await executePythonScript(scriptPath, args, { ...options, workerPool: this.workerPool() });
+    } finally {
+      this.release();
+    }
+  }
+
+  acquire() {
+    if (this.running < this.options.concurrency) {
+      this.running++;
+      return Promise.resolve();
+    }
+    return new Promise((resolve) => this.waiting.push(resolve));
+  }
+
+  release() {
+    const next = this.waiting.shift();
+    if (next) {
+      // Hand the slot straight to the next encode
+      next();
+    } else {
+      this.running--;
+    }
+  }
+
+  workerPool() {
+    if (!config.pythonWorkers.enabled) {
+      return null;
+    }
+    if (!this.workers) {
+      this.workers = new PythonWorkerPool({ poolSize: this.options.concurrency });
+      process.on('exit', () => this.workers.stop());
+    }
+    return this.workers;
+  }
+
+  /**
+   * @returns {Object} - Current encode slot usage, for diagnostics
+   */
+  stats() {
+    return {
+      running: this.running,
+      waiting: this.waiting.length,
+      concurrency: this.options.concurrency
+    };
+  }
+}
+
+module.exports = new EncodePool();
@@ -0,0 +1,418 @@
+const fs = require('fs');
+const logger = require('../utils/logger');
+const config = require('../config/config');
+const { JobStore } = require('../utils/jobStore');
+const { SyncStore, playlistIdFromUrl, unchangedEntry, nextState } = require('../utils/syncStore');
+const { requestContext } = require('../utils/requestContext');
+const spotifyService = require('./spotifyService');
+
+// Per-track states, in the order a track moves through them
+const TRACK_STATES = ['pending', 'resolved', 'downloaded', 'trimmed', 'failed'];
+
+/**
+ * Durable queue of playlist download jobs.
+ *
+ * Jobs and per-track progress are persisted through JobStore, so a restart
+ * resumes each job from the last state every track reached. Tracks that were
+ * already trimmed are never pushed through the pipeline again; a track that
+ * was downloaded but not transcoded skips straight to the stages it is missing.
+ *
+ * Sync jobs mirror a playlist incrementally: tracks delivered by the previous
+ * sync of the same playlist (see SyncStore) are recorded as trimmed without
+ * entering the pipeline, so only new tracks are resolved and downloaded.
+ *
+ * The queue keeps the store's jobs in memory, so one process owns a
+ * JOB_STORE_DIR; instances that run side by side need a directory each.
+ */
+class JobQueue {
+  constructor(store, syncStore) {
+    this.store = store || new JobStore(config.jobs.dir);
+    this.syncStore = syncStore || new SyncStore(config.sync.dir);
+    this.running = new Map();
+    this.started = null;
+  }
+
+  /**
+   * Loads stored jobs, re-queues the ones interrupted by a previous run and
+   * starts working through the queue
+   * @returns {Promise} - Resolves once the store is loaded
+   */
+  start() {
+    if (!this.started) {
+      this.started = this.store.init().then(async (jobs) => {
+        for (const job of jobs) {
+          // This process owns the store, so a running job was cut off by a restart
+          if (job.status === 'running') {
+            logger.info(`Resuming interrupted job ${job.id}`);
+            this.store.update(job, { status: 'queued' });
+          }
+        }
+        this.schedule();
+      });
+    }
+    return this.started;
+  }
+
+  /**
+   * Queues a playlist download
+   * @param {string} playlistUrl - The Spotify playlist, album, or artist URL
+   * @param {string} outputPath - Base directory for the downloaded files
+   * @param {Object} options - { discography } downloads the releases on an artist page instead of its top tracks,
+   *   { profile } transcode profile (default: TRANSCODE_PROFILE),
+   *   { sync } only downloads tracks the previous sync of this playlist didn't deliver,
+   *   { prune } with sync, deletes the files of tracks removed from the playlist
+   * @returns {Promise<Object>} - The job summary
+   */
+  async enqueuePlaylist(playlistUrl, outputPath, options = {}) {
+    await this.start();
+    const playlistId = options.sync ? playlistIdFromUrl(playlistUrl) : null;
+    const prune = Boolean(playlistId && options.prune);
+    const profile = options.profile || config.encode.profile;
+    if (playlistId) {
+      // Two syncs of one playlist to the same target would download the same new tracks;
+      // join the pending one. A different directory, profile or prune setting is its own sync.
+      const pending = this.store.list().find(job => job.type === 'sync' && job.playlistId === playlistId &&
+        job.outputPath === outputPath && job.profile === profile && job.prune === prune &&
+        (job.status === 'queued' || job.status === 'running'));
+      if (pending) {
+        return this.summarize(pending);
+      }
+    }
+    const job = this.store.create({
+      type: playlistId ? 'sync' : 'playlist',
+      playlistUrl,
+      playlistId,
+      prune,
+      discography: Boolean(options.discography),
+      profile,
+      outputPath,
+      tracksListed: false
+    });
+    logger.info(`Queued ${job.type} job ${job.id} for ${playlistUrl}`);
+    this.schedule();
+    return this.summarize(job);
+  }
+
+  /**
+   * Re-queues a finished job so its failed tracks are attempted again
+   * @param {string} id - Job id
+   * @returns {Promise<Object|null>} - The job summary, or null if there is no such job
+   */
+  async retryJob(id) {
+    await this.start();
+    const job = this.store.get(id);
+    if (!job) {
+      return null;
+    }
+    if (job.status === 'completed' || job.status === 'failed') {
+      this.store.update(job, { status: 'queued', error: null });
+      this.schedule();
+    }
+    return this.summarize(job);
+  }
+
+  schedule() {
+    for (const job of this.store.list()) {
+      if (this.running.size >= config.jobs.concurrency) {
+        return;
+      }
+      if (job.status === 'queued') {
+        this.claim(job);
+      }
+    }
+  }
+
+  claim(job) {
+    this.running.set(job.id, job);
+    this.store.update(job, {
+      status: 'running',
+      startedAt: job.startedAt || Date.now()
+    });
+    // Jobs outlive the request that queued them; don't inherit its context (profiling)
+    requestContext.exit(() => this.runJob(job))
+      .catch((error) => {
+        logger.error(`Job ${job.id} failed: ${error.message}`);
+        this.store.update(job, { status: 'failed', error: error.message, finishedAt: Date.now() });
+      })
+      .then(() => {
+        this.store.compact(job);
+      })
+      .finally(() => {
+        this.running.delete(job.id);
+        this.schedule();
+      });
+  }
+
+  /**
+   * Builds a pipeline task from a stored track, carrying over whatever the
+   * track already has so finished stages are skipped
+   */
+  restoreTask(record) {
+    return {
+      trackIndex: record.index,
+      track: record.track,
+      trackName: record.trackName,
+      artist: record.artist,
+      outputPath: record.outputPath,
+      youtubeUrl: record.youtubeUrl,
+      containerPath: record.containerPath,
+      videoId: record.videoId,
+      duration: record.duration,
+      segments: record.segments
+    };
+  }
+
+  /**
+   * Persists the state a track reached after a pipeline stage
+   */
+  recordProgress(job, event) {
+    const task = event.item;
+    const record = job.tracks[task.trackIndex];
+    if (!record || record.state === 'trimmed') {
+      return;
+    }
+
+    if (event.status === 'failed') {
+      this.store.updateTrack(job, task.trackIndex, {
+        state: 'failed',
+        failedStage: event.stage,
+        error: event.error.message
+      });
+      return;
+    }
+    if (event.status !== 'done') {
+      return;
+    }
+
+    if (task.downloadResult) {
+      this.advance(job, record, 'trimmed', {
+        outputFile: task.downloadResult.output_file,
+        fromLibrary: Boolean(task.downloadResult.fromLibrary),
+        error: null,
+        failedStage: null
+      });
+    } else if (event.stage === 'resolve') {
+      this.advance(job, record, 'resolved', { youtubeUrl: task.youtubeUrl });
+    } else if (event.stage === 'download') {
+      this.advance(job, record, 'downloaded', {
+        containerPath: task.containerPath,
+        videoId: task.videoId,
+        duration: task.duration
+      });
+    } else if (event.stage === 'sponsorblock' && record.segments === undefined) {
+      this.store.updateTrack(job, task.trackIndex, { segments: task.segments });
+    }
+  }
+
+  /**
+   * Moves a track forward to a state; resumed tracks re-run skipped stages,
+   * which must not move them back
+   */
+  advance(job, record, state, changes) {
+    const rank = TRACK_STATES.indexOf(record.state);
+    if (record.state !== 'failed' && rank >= TRACK_STATES.indexOf(state)) {
+      return;
+    }
+    this.store.updateTrack(job, record.index, { state, ...changes });
+  }
+
+  async runJob(job) {
+    // Downloads of one job share a scheduler queue, so concurrent jobs take turns
+    const pipeline = spotifyService.createDownloadPipeline({ owner: job.id, profile: job.profile || undefined });
+    const previous = job.type === 'sync' ? await this.loadSyncState(job) : null;
+    pipeline.on('progress', (event) => this.recordProgress(job, event));
+
+    let pushing = Promise.resolve();
+    const push = (record) => {
+      pushing = pushing.then(() => pipeline.push(this.restoreTask(record)));
+    };
+
+    // Resume every stored track that hasn't finished yet
+    for (const record of job.tracks) {
+      if (!record || record.state === 'trimmed') {
+        continue;
+      }
+      if (record.containerPath && !fs.existsSync(record.containerPath)) {
+        // The container is gone (cleaned up or never fully written); download it again
+        record.containerPath = null;
+      }
+      push(record);
+    }
+
+    let streamError = null;
+    if (!job.tracksListed) {
+      let index = 0;
+      try {
+        const playlist = await spotifyService.streamPlaylistTracks(job.playlistUrl, (track) => {
+          const position = index++;
+          if (job.tracks[position]) {
+            // Listed before the restart and already pushed above
+            return;
+          }
+          const task = spotifyService.createTrackTask(track, position, job.outputPath);
+          const record = {
+            index: position,
+            track,
+            trackName: task.trackName,
+            artist: task.artist,
+            outputPath: task.outputPath,
+            state: 'pending'
+          };
+          const entry = unchangedEntry(previous, track);
+          if (entry) {
+            // Delivered by the previous sync and still on disk
+            Object.assign(record, { state: 'trimmed', outputFile: entry.outputFile, unchanged: true });
+          }
+          this.store.addTrack(job, record);
+          if (!entry) {
+            push(record);
+          }
+        }, { discography: job.discography, fresh: job.type === 'sync' });
+        this.store.update(job, { tracksListed: true, snapshotId: playlist.snapshot_id || null });
+      } catch (error) {
+        streamError = error;
+      }
+    }
+
+    await pushing;
+    pipeline.close();
+    await pipeline.drain();
+
+    if (streamError) {
+      throw streamError;
+    }
+    if (job.type === 'sync') {
+      await this.finishSync(job, previous);
+    }
+
+    const counts = this.countStates(job);
+    this.store.update(job, { status: 'completed', finishedAt: Date.now() });
+    logger.info(`Job ${job.id} complete. Trimmed: ${counts.trimmed}, Failed: ${counts.failed}`);
+  }
+
+  /**
+   * Loads the previous sync of a job's playlist, if it went to the same place
+   * @param {Object} job - Sync job
+   * @returns {Promise<Object|null>} - The state to diff against, or null to sync every track
+   */
+  async loadSyncState(job) {
+    const state = await this.syncStore.load(job.playlistId);
+    if (state && (state.outputPath !== job.outputPath || state.profile !== job.profile)) {
+      logger.info(`Playlist ${job.playlistId} was last synced to ${state.outputPath} (${state.profile}); syncing every track`);
+      return null;
+    }
+    return state;
+  }
+
+  /**
+   * Stores the playlist's new sync state and prunes the files of removed tracks
+   * @param {Object} job - The sync job, with every listed track settled
+   * @param {Object} previous - The state the job diffed against
+   */
+  async finishSync(job, previous) {
+    const { state, removed } = nextState(job, previous);
+
+    let pruned = 0;
+    if (job.prune) {
+      for (const { outputFile } of removed) {
+        if (!outputFile) {
+          continue;
+        }
+        try {
+          await fs.promises.unlink(outputFile);
+          pruned++;
+        } catch (error) {
+          if (error.code !== 'ENOENT') {
+            logger.warn(`Could not prune ${outputFile}: ${error.message}`);
+          }
+        }
+      }
+    }
+
+    this.syncStore.save(state);
+    const unchanged = job.tracks.filter(record => record && record.unchanged).length;
+    this.store.update(job, {
+      syncResult: {
+        unchanged,
+        added: Object.keys(state.tracks).length - unchanged,
+        removed: removed.length,
+        pruned
+      }
+    });
+    logger.info(`Synced playlist ${job.playlistId}: ${unchanged} unchanged, ${removed.length} removed, ${pruned} pruned`);
+  }
+
+  countStates(job) {
+    const counts = Object.fromEntries(TRACK_STATES.map(state => [state, 0]));
+    for (const record of job.tracks) {
+      if (record) {
+        counts[record.state]++;
+      }
+    }
+    return counts;
+  }
+
+  /**
+   * Status view of a job for the API
+   * @param {Object} job - Stored job
+   * @param {boolean} includeTracks - Include the per-track list
+   * @returns {Object}
+   */
+  summarize(job, includeTracks = false) {
+    const summary = {
+      id: job.id,
+      type: job.type,
+      status: job.status,
+      playlistUrl: job.playlistUrl,
+      discography: Boolean(job.discography),
+      profile: job.profile || config.encode.profile,
+      outputPath: job.outputPath,
+      createdAt: job.createdAt,
+      startedAt: job.startedAt || null,
+      finishedAt: job.finishedAt || null,
+      updatedAt: job.updatedAt,
+      error: job.error || null,
+      tracksListed: job.tracksListed,
+      totalTracks: job.tracks.filter(Boolean).length,
+      tracks: this.countStates(job)
+    };
+    if (job.type === 'sync') {
+      summary.sync = {
+        playlistId: job.playlistId,
+        prune: Boolean(job.prune),
+        snapshotId: job.snapshotId || null,
+        result: job.syncResult || null
+      };
+    }
+    if (includeTracks) {
+      summary.trackList = job.tracks.filter(Boolean).map(record => ({
+        index: record.index,
+        trackName: record.trackName,
+        artist: record.artist,
+        state: record.state,
+        outputFile: record.outputFile || null,
+        failedStage: record.failedStage || null,
+        error: record.error || null
+      }));
+    }
+    return summary;
+  }
+
+  /**
+   * @param {string} id - Job id
+   * @param {boolean} includeTracks - Include the per-track list
+   * @returns {Promise<Object|null>} - The job summary, or null if there is no such job
+   */
+  async getJob(id, includeTracks = false) {
+    await this.start();
+    const job = this.store.get(id);
+    return job ? this.summarize(job, includeTracks) : null;
+  }
+
+  async listJobs() {
+    await this.start();
+    return this.store.list().map(job => this.summarize(job));
+  }
+}
+
+module.exports = new JobQueue();
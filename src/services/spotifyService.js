@@ -1,10 +1,36 @@
-const { executePythonScript } = require('../utils/pythonExecutor');
+const { executePythonScript, streamPythonScript } = require('../utils/pythonExecutor');
 const logger = require('../utils/logger');
 const { validateSpotifyUrl } = require('../utils/validation');
 const youtubeService = require('./youtubeService'); // Import YouTube service
+const { Pipeline } = require('../utils/pipeline');
+const config = require('../config/config');
 const path = require('path');
+const fs = require('fs');
+const crypto = require('crypto');
 
 class SpotifyService {
+  constructor() {
+    // Promises of lookups currently running, keyed by operation and URL
+    this.inflight = new Map();
+  }
+
+  /**
+   * Shares one running lookup between every caller asking for the same thing
+   * @param {string} key - Identifies the lookup
+   * @param {Function} fn - Starts the lookup and returns a promise
+   * @returns {Promise} - The promise of the running lookup
+   */
+  coalesce(key, fn) {
+    if (this.inflight.has(key)) {
+      return this.inflight.get(key);
+    }
+    const promise = fn().finally(() => {
+      this.inflight.delete(key);
+    });
+    this.inflight.set(key, promise);
+    return promise;
+  }
+
   /**
    * Extracts metadata from a Spotify track/playlist/album
    * @param {string} spotifyUrl - The Spotify URL to extract metadata from
@@ -21,8 +47,11 @@ class SpotifyService {
       // Get the path to the Python script
       const scriptPath = path.join(__dirname, '../../spotify/spotify_metadata.py');
       
-      // Execute the Python script with the Spotify URL as an argument
-      const result = await executePythonScript(scriptPath, [spotifyUrl], { timeout: 45000 });
+      // Execute the Python script with the Spotify URL as an argument; concurrent
+      // requests for the same URL share one execution
+      const result = await this.coalesce(`metadata:${spotifyUrl}`, () =>
+        executePythonScript(scriptPath, [spotifyUrl], { timeout: 45000 })
+      );
       
       // Validate the output from the Python script
       if (!result) {
@@ -42,36 +71,44 @@ class SpotifyService {
   }
 
   /**
-   * Gets tracks from a Spotify playlist
-   * @param {string} playlistUrl - The Spotify playlist URL
+   * Gets tracks from a Spotify playlist, album, or artist
+   * @param {string} playlistUrl - The Spotify playlist, album, or artist URL
+   * @param {Object} options - { discography } lists the releases on an artist page instead of its top tracks
    * @returns {Promise} - Promise that resolves with playlist tracks
    */
-  async getPlaylistTracks(playlistUrl) {
+  async getPlaylistTracks(playlistUrl, options = {}) {
     // Validate input using utility function
     const validation = validateSpotifyUrl(playlistUrl);
     if (!validation.isValid) {
       throw new Error(validation.error);
     }
 
-    // Additional check to ensure this is a playlist URL
-    if (!this.isPlaylistOrAlbumUrl(playlistUrl)) {
-      throw new Error('URL must point to a Spotify playlist or album');
+    // Additional check to ensure this URL expands into a list of tracks
+    if (!this.isCollectionUrl(playlistUrl)) {
+      throw new Error('URL must point to a Spotify playlist, album, or artist');
     }
 
     try {
       // Get the path to the Python script
       const scriptPath = path.join(__dirname, '../../spotify/spotify_playlist.py');
+      const args = this.collectionArgs(playlistUrl, options);
       
       // Execute the Python script with the playlist URL as an argument
-      const result = await executePythonScript(scriptPath, [playlistUrl], { timeout: 60000 });
+      const result = await this.coalesce(`playlist:${args.join(' ')}`, () =>
+        executePythonScript(scriptPath, args, { timeout: this.collectionTimeout(options) })
+      );
       
       // Validate the output from the Python script
-      if (!result || !Array.isArray(result)) {
+      if (result && result.success === false) {
+        throw new Error(result.error || 'Playlist metadata extraction failed');
+      }
+      const tracks = result && result.playlist ? result.playlist.tracks : result;
+      if (!tracks || !Array.isArray(tracks)) {
         throw new Error('Invalid playlist data received from Python script');
       }
 
-      logger.info(`Successfully extracted ${result.length} tracks from Spotify playlist: ${playlistUrl}`);
-      return result;
+      logger.info(`Successfully extracted ${tracks.length} tracks from Spotify playlist: ${playlistUrl}`);
+      return tracks;
     } catch (error) {
       logger.error(`Error extracting Spotify playlist tracks: ${error.message}`, {
         playlistUrl,
@@ -82,13 +119,77 @@ class SpotifyService {
     }
   }
 
+  /**
+   * Streams tracks from a Spotify playlist, album, or artist as the Python script
+   * normalizes them, so callers can start work on the first track before the last one is parsed
+   * @param {string} playlistUrl - The Spotify playlist, album, or artist URL
+   * @param {Function} onTrack - Called with each track object as soon as it arrives
+   * @param {Object} options - { discography } lists the releases on an artist page instead of its top tracks;
+   *   { fresh } skips the warm worker's cached copy of the page
+   * @returns {Promise} - Promise that resolves with the playlist header once every track was streamed
+   */
+  async streamPlaylistTracks(playlistUrl, onTrack, options = {}) {
+    // Validate input using utility function
+    const validation = validateSpotifyUrl(playlistUrl);
+    if (!validation.isValid) {
+      throw new Error(validation.error);
+    }
+
+    if (!this.isCollectionUrl(playlistUrl)) {
+      throw new Error('URL must point to a Spotify playlist, album, or artist');
+    }
+
+    try {
+      const scriptPath = path.join(__dirname, '../../spotify/spotify_playlist.py');
+
+      let playlist = null;
+      let streamError = null;
+      let failedPages = [];
+      let trackCount = 0;
+
+      await streamPythonScript(scriptPath, ['--ndjson', ...this.collectionArgs(playlistUrl, options)], {
+        timeout: this.collectionTimeout(options),
+        onRecord: (record) => {
+          if (record.type === 'playlist') {
+            playlist = record.playlist;
+          } else if (record.type === 'track') {
+            trackCount++;
+            onTrack(record.track);
+          } else if (record.type === 'end') {
+            failedPages = record.failed_pages || [];
+          } else if (record.type === 'error') {
+            streamError = record.error;
+          }
+        }
+      });
+
+      if (streamError) {
+        throw new Error(streamError);
+      }
+      if (failedPages.length > 0) {
+        logger.warn(`${failedPages.length} release page(s) of ${playlistUrl} could not be loaded`, { failedPages });
+      }
+
+      logger.info(`Successfully streamed ${trackCount} tracks from Spotify playlist: ${playlistUrl}`);
+      return { ...playlist, streamedTracks: trackCount };
+    } catch (error) {
+      logger.error(`Error streaming Spotify playlist tracks: ${error.message}`, {
+        playlistUrl,
+        error: error.stderr || error.message
+      });
+
+      throw error;
+    }
+  }
+
   /**
    * Downloads a single track from a Spotify URL
    * @param {string} spotifyUrl - The Spotify URL for the track
    * @param {string} outputPath - Where to save the downloaded file
+   * @param {Object} options - { profile } transcode profile (default: TRANSCODE_PROFILE)
    * @returns {Promise} - Promise that resolves when download is complete
    */
-  async downloadTrack(spotifyUrl, outputPath) {
+  async downloadTrack(spotifyUrl, outputPath, options = {}) {
     try {
       // Validate inputs
       const validation = validateSpotifyUrl(spotifyUrl);
@@ -110,7 +211,7 @@ class SpotifyService {
       logger.info(`Fetched YouTube URL: ${youtubeUrl}`);
       
       // Download the audio using YouTube service
-      const downloadResult = await youtubeService.downloadAudio(youtubeUrl, outputPath);
+      const downloadResult = await youtubeService.downloadAudio(youtubeUrl, outputPath, { profile: options.profile });
       
       logger.info(`Successfully downloaded track to: ${outputPath}`);
       
@@ -133,11 +234,17 @@ class SpotifyService {
 
   /**
    * Downloads all tracks from a Spotify playlist
+   *
+   * Tracks flow through a staged pipeline (resolve -> download -> sponsorblock -> transcode)
+   * where every stage has its own concurrency limit, so network-bound downloads overlap
+   * with CPU-bound ffmpeg work instead of running one track at a time.
    * @param {string} playlistUrl - The Spotify playlist URL
    * @param {string} baseOutputPath - Base directory to save the downloaded files
+   * @param {Object} options - { onProgress } callback receiving per-stage progress events,
+   *   { discography } to download the releases on an artist page
    * @returns {Promise} - Promise that resolves when all downloads are complete
    */
-  async downloadPlaylist(playlistUrl, baseOutputPath) {
+  async downloadPlaylist(playlistUrl, baseOutputPath, options = {}) {
     try {
       // Validate inputs
       const validation = validateSpotifyUrl(playlistUrl);
@@ -145,61 +252,58 @@ class SpotifyService {
         throw new Error(validation.error);
       }
 
-      // Get playlist tracks
-      const tracks = await this.getPlaylistTracks(playlistUrl);
-      
-      logger.info(`Starting download of ${tracks.length} tracks from playlist`);
-      
-      const results = [];
-      const errors = [];
-      
-      // Process each track in the playlist
-      for (let i = 0; i < tracks.length; i++) {
-        const track = tracks[i];
-        try {
-          // Format track info for search
-          const searchQuery = `${track.trackName || track.name || ''} ${track.artist || track.artists?.join(' ') || ''}`;
-          
-          // Fetch YouTube URL for this track
-          const youtubeUrl = await youtubeService.fetchYouTubeUrl(searchQuery);
-          
-          // Create specific output path for this track
-          // Sanitize filename to avoid issues with special characters
-          const sanitizedTrackName = (track.trackName || track.name || `track_${i+1}`)
-            .replace(/[<>:"/\\|?*]/g, '_');
-          const trackOutputPath = `${baseOutputPath}/${sanitizedTrackName}.mp3`;
-          
-          // Download the audio
-          const downloadResult = await youtubeService.downloadAudio(youtubeUrl, trackOutputPath);
-          
-          results.push({
-            trackIndex: i,
-            trackName: track.trackName || track.name || `Track ${i+1}`,
-            artist: track.artist || track.artists?.join(', ') || 'Unknown Artist',
-            youtubeUrl,
-            outputPath: trackOutputPath,
-            downloadResult
-          });
-          
-          logger.info(`Downloaded track ${i+1}/${tracks.length}: ${track.trackName || track.name}`);
-        } catch (trackError) {
-          logger.error(`Failed to download track ${i+1}/${tracks.length}: ${trackError.message}`, {
-            track: track.trackName || track.name || `Track ${i+1}`,
-            error: trackError.message
-          });
-          
-          errors.push({
-            trackIndex: i,
-            track: track.trackName || track.name || `Track ${i+1}`,
-            error: trackError.message
-          });
-        }
+      const pipeline = this.createDownloadPipeline(options);
+
+      // Feed tracks into the pipeline as they stream in, so resolution starts
+      // on the first track instead of after the whole playlist is parsed
+      let totalTracks = 0;
+      let pushing = Promise.resolve();
+      let streamError = null;
+
+      logger.info(`Starting streamed download of playlist: ${playlistUrl}`);
+
+      try {
+        await this.streamPlaylistTracks(playlistUrl, (track) => {
+          const task = this.createTrackTask(track, totalTracks++, baseOutputPath);
+          pushing = pushing.then(() => pipeline.push(task));
+        }, { discography: options.discography });
+      } catch (error) {
+        streamError = error;
       }
+
+      await pushing;
+      pipeline.close();
+
+      const { completed, failed } = await pipeline.drain();
+
+      if (streamError) {
+        throw streamError;
+      }
+
+      const results = completed
+        .sort((a, b) => a.trackIndex - b.trackIndex)
+        .map(task => ({
+          trackIndex: task.trackIndex,
+          trackName: task.trackName,
+          artist: task.artist,
+          youtubeUrl: task.youtubeUrl,
+          outputPath: task.outputPath,
+          downloadResult: task.downloadResult
+        }));
+
+      const errors = failed
+        .sort((a, b) => a.item.trackIndex - b.item.trackIndex)
+        .map(({ item, stage, error }) => ({
+          trackIndex: item.trackIndex,
+          track: item.trackName,
+          stage,
+          error: error.message
+        }));
       
       logger.info(`Playlist download complete. Success: ${results.length}, Errors: ${errors.length}`);
       
       return {
-        totalTracks: tracks.length,
+        totalTracks,
         successfulDownloads: results.length,
         failedDownloads: errors.length,
         results,
@@ -216,6 +320,138 @@ class SpotifyService {
     }
   }
 
+  /**
+   * Builds the per-track state object that travels through the download pipeline
+   * @param {Object} track - Track metadata from the playlist script
+   * @param {number} index - Position of the track in the playlist
+   * @param {string} baseOutputPath - Base directory for downloaded files
+   * @returns {Object} - Pipeline task
+   */
+  createTrackTask(track, index, baseOutputPath) {
+    const trackName = track.title || track.trackName || track.name || `Track ${index + 1}`;
+    const artist = track.artist || track.artists?.join(', ') || 'Unknown Artist';
+
+    // Sanitize filename to avoid issues with special characters
+    const sanitizedTrackName = (track.title || track.trackName || track.name || `track_${index + 1}`)
+      .replace(/[<>:"/\\|?*]/g, '_');
+    // Tracks run concurrently, so two with the same title ("Intro") must not share a file:
+    // the position keeps them apart within a job (a playlist may list a track twice), the
+    // Spotify id across syncs of a reordered playlist
+    const trackNumber = String(index + 1).padStart(2, '0');
+    const fileName = track.id ? `${trackNumber} - ${sanitizedTrackName} [${track.id}]` : `${trackNumber} - ${sanitizedTrackName}`;
+
+    return {
+      trackIndex: index,
+      track,
+      trackName,
+      artist,
+      outputPath: `${baseOutputPath}/${fileName}.mp3`
+    };
+  }
+
+  /**
+   * Creates the staged download pipeline used for playlists
+   * @param {Object} options - { onProgress, owner, profile } progress callback, the id the
+   *   download scheduler groups this pipeline's downloads under (default: a fresh id),
+   *   and the transcode profile (default: TRANSCODE_PROFILE)
+   * @returns {Pipeline} - Pipeline ready to accept track tasks
+   */
+  createDownloadPipeline(options = {}) {
+    const settings = config.pipeline;
+    const owner = options.owner || crypto.randomUUID();
+
+    const pipeline = new Pipeline([
+      {
+        name: 'resolve',
+        concurrency: settings.resolveConcurrency,
+        handler: async (task) => {
+          if (task.youtubeUrl) {
+            // Resumed job: this track was resolved before the restart
+            return;
+          }
+          // Tracks already in the audio library skip the network and ffmpeg stages
+          const stored = await youtubeService.lookupLibrary(task.outputPath, {
+            spotifyId: task.track.id,
+            isrc: task.track.isrc,
+            profile: options.profile
+          });
+          if (stored.hit) {
+            task.downloadResult = { success: true, output_file: stored.output_file, fromLibrary: true };
+            return;
+          }
+          task.youtubeUrl = await youtubeService.resolveTrackUrl(task.trackName, task.artist, task.track.isrc, task.track.duration_ms);
+        }
+      },
+      {
+        name: 'download',
+        concurrency: settings.downloadConcurrency,
+        handler: async (task) => {
+          if (task.downloadResult || (task.containerPath && fs.existsSync(task.containerPath))) {
+            return;
+          }
+          const download = await youtubeService.downloadContainer(task.youtubeUrl, task.outputPath, {
+            priority: 'bulk',
+            owner
+          });
+          task.containerPath = download.container;
+          task.videoId = download.video_id;
+          task.duration = download.duration;
+        }
+      },
+      {
+        name: 'sponsorblock',
+        concurrency: settings.sponsorblockConcurrency,
+        handler: async (task) => {
+          if (task.downloadResult || Array.isArray(task.segments)) {
+            return;
+          }
+          task.segments = await youtubeService.fetchSponsorSegments(task.videoId);
+        }
+      },
+      {
+        name: 'transcode',
+        concurrency: settings.transcodeConcurrency,
+        handler: async (task) => {
+          if (task.downloadResult) {
+            return;
+          }
+          task.downloadResult = await youtubeService.transcodeAudio(task.containerPath, task.outputPath, task.segments, {
+            videoId: task.videoId,
+            duration: task.duration,
+            spotifyId: task.track.id,
+            isrc: task.track.isrc,
+            profile: options.profile
+          });
+        }
+      }
+    ], {
+      bufferSize: settings.bufferSize,
+      retries: settings.retries,
+      retryDelay: settings.retryDelay
+    });
+
+    pipeline.on('progress', (event) => {
+      if (event.status === 'retrying' || event.status === 'failed') {
+        logger.warn(`Track ${event.item.trackIndex + 1} ${event.stage} attempt ${event.attempt} ${event.status}: ${event.error.message}`);
+      }
+      if (options.onProgress) {
+        options.onProgress({
+          stage: event.stage,
+          status: event.status,
+          trackIndex: event.item.trackIndex,
+          trackName: event.item.trackName,
+          stages: pipeline.progress()
+        });
+      }
+    });
+
+    pipeline.on('completed', (task) => {
+      logger.info(`Downloaded track ${task.trackIndex + 1}: ${task.trackName}`);
+    });
+
+    return pipeline;
+  }
+
   /**
    * Checks if a URL is a playlist or album URL
    * @param {string} url - The URL to check
@@ -224,6 +460,25 @@ class SpotifyService {
   isPlaylistOrAlbumUrl(url) {
     return url.includes('/playlist/') || url.includes('/album/');
   }
+
+  /**
+   * Checks if a URL expands into a list of tracks (playlist, album, or artist)
+   * @param {string} url - The URL to check
+   * @returns {boolean} - True if spotify_playlist.py can list the URL's tracks
+   */
+  isCollectionUrl(url) {
+    return this.isPlaylistOrAlbumUrl(url) || url.includes('/artist/');
+  }
+
+  collectionArgs(url, options = {}) {
+    const args = options.discography && url.includes('/artist/') ? ['--discography', url] : [url];
+    return options.fresh ? ['--fresh', ...args] : args;
+  }
+
+  collectionTimeout(options = {}) {
+    // A discography fetches one page per release
+    return options.discography ? config.timeout.discography : 60000;
+  }
 }
 
 module.exports = new SpotifyService();
\ No newline at end of file
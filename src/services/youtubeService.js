@@ -1,8 +1,49 @@
 const { executePythonScript } = require('../utils/pythonExecutor');
 const logger = require('../utils/logger');
+const config = require('../config/config');
+const downloadScheduler = require('./downloadScheduler');
+const encodePool = require('./encodePool');
 const { validateYouTubeUrl, validateSearchQuery, validatePath } = require('../utils/validation');
 const path = require('path');
 
+/**
+ * Builds the track identity flags the downloader uses to index the audio library
+ * @param {Object} ids - { spotifyId, isrc }
+ * @returns {Array} - Command line arguments
+ */
+function libraryArgs({ spotifyId, isrc } = {}) {
+  const args = [];
+  if (spotifyId) {
+    args.push('--spotify-id', spotifyId);
+  }
+  if (isrc) {
+    args.push('--isrc', isrc);
+  }
+  return args;
+}
+
+/**
+ * Builds the download engine flags for a scheduler grant
+ * @param {Object} grant - Grant from downloadScheduler.acquire()
+ * @returns {Array} - Command line arguments
+ */
+function transferArgs(grant) {
+  const args = ['--engine', grant.engine, '--connections', String(grant.connections)];
+  if (grant.rateLimit > 0) {
+    args.push('--rate-limit', String(grant.rateLimit));
+  }
+  return args;
+}
+
+/**
+ * Builds the output format flag
+ * @param {string} profile - Transcode profile name (default: TRANSCODE_PROFILE)
+ * @returns {Array} - Command line arguments
+ */
+function profileArgs(profile) {
+  return ['--transcode-profile', profile || config.encode.profile];
+}
+
 class YouTubeService {
   /**
    * Fetches the YouTube URL for a given search query or Spotify track
@@ -44,9 +85,10 @@ class YouTubeService {
    * Downloads audio from a YouTube URL
    * @param {string} youtubeUrl - The YouTube URL to download from
    * @param {string} outputPath - Where to save the downloaded file
+   * @param {Object} options - { profile } transcode profile (default: TRANSCODE_PROFILE)
    * @returns {Promise} - Promise that resolves when download is complete
    */
-  async downloadAudio(youtubeUrl, outputPath) {
+  async downloadAudio(youtubeUrl, outputPath, { profile } = {}) {
     // Validate inputs using utility functions
     const urlValidation = validateYouTubeUrl(youtubeUrl);
     if (!urlValidation.isValid) {
@@ -62,8 +104,10 @@ class YouTubeService {
       // Use the youtube_downloader.py script which is the actual script in the youtube directory
       const downloadScriptPath = path.join(__dirname, '../../youtube/youtube_downloader.py');
       
-      // Execute the Python script with the YouTube URL and output path as arguments
-      const result = await executePythonScript(downloadScriptPath, [youtubeUrl, outputPath], { timeout: 120000 });
+      // Single tracks are scheduled ahead of playlist downloads
+      const result = await downloadScheduler.run({ priority: 'interactive', owner: 'interactive' }, grant =>
+        executePythonScript(downloadScriptPath, [...transferArgs(grant), ...profileArgs(profile), youtubeUrl, outputPath], { timeout: 120000 })
+      );
       
       logger.info(`Successfully downloaded audio from YouTube URL: ${youtubeUrl} to ${outputPath}`);
       return result;
@@ -78,6 +122,161 @@ class YouTubeService {
     }
   }
 
+  /**
+   * Resolves the best matching YouTube URL for a track title and artist
+   * @param {string} title - Track title
+   * @param {string} artist - Artist name(s)
+   * @param {string} isrc - Optional ISRC, used as the match cache key when present
+   * @param {number} durationMs - Optional Spotify track length used to score candidates
+   * @returns {Promise} - Promise that resolves with the YouTube watch URL
+   */
+  async resolveTrackUrl(title, artist, isrc, durationMs) {
+    const validation = validateSearchQuery(`${title} ${artist}`);
+    if (!validation.isValid) {
+      throw new Error(validation.error);
+    }
+
+    const scriptPath = path.join(__dirname, '../../spotify/fetch_youtube_url.py');
+    const args = isrc ? [title, artist, isrc] : [title, artist];
+    if (durationMs) {
+      // Lets the matcher reject live versions, loops and long music video cuts
+      args.unshift('--duration-ms', String(durationMs));
+    }
+    const result = await executePythonScript(scriptPath, args, { timeout: 45000 });
+
+    if (!result || !result.youtube_url) {
+      throw new Error(`No YouTube match found for: ${title} ${artist}`);
+    }
+    return result.youtube_url;
+  }
+
+  /**
+   * Resolves YouTube URLs for a whole track list in one concurrent batch
+   * @param {Array} tracks - Track objects with title, artist and optionally isrc
+   * @returns {Promise} - Promise that resolves with one { youtube_url, cached, ... } per track
+   */
+  async resolveTrackUrls(tracks) {
+    if (!Array.isArray(tracks) || tracks.length === 0) {
+      throw new Error('Track list must be a non-empty array');
+    }
+
+    try {
+      const scriptPath = path.join(__dirname, '../../spotify/fetch_youtube_url.py');
+      const result = await executePythonScript(scriptPath, ['--batch', '-'], {
+        input: JSON.stringify(tracks),
+        // Scale the timeout with the batch; cache hits return almost instantly
+        timeout: Math.max(45000, tracks.length * 5000)
+      });
+
+      if (!result || !result.success) {
+        throw new Error((result && result.error) || 'Batch YouTube resolution failed');
+      }
+
+      logger.info(`Resolved ${result.resolved}/${tracks.length} tracks (${result.cache_hits} from cache)`);
+      return result.results;
+    } catch (error) {
+      logger.error(`Error resolving YouTube URLs: ${error.message}`, {
+        trackCount: tracks.length,
+        error: error.stderr || error.message
+      });
+
+      throw error;
+    }
+  }
+
+  /**
+   * Downloads the bestaudio container for a YouTube URL without transcoding it
+   * @param {string} youtubeUrl - The YouTube URL to download from
+   * @param {string} outputPath - Target path; the container keeps its own extension
+   * @param {Object} schedule - { priority, owner } for the download scheduler (default: bulk)
+   * @returns {Promise} - Promise that resolves with { container, video_id, duration }
+   */
+  async downloadContainer(youtubeUrl, outputPath, schedule = {}) {
+    const urlValidation = validateYouTubeUrl(youtubeUrl);
+    if (!urlValidation.isValid) {
+      throw new Error(urlValidation.error);
+    }
+
+    const pathValidation = validatePath(outputPath);
+    if (!pathValidation.isValid) {
+      throw new Error(pathValidation.error);
+    }
+
+    const downloadScriptPath = path.join(__dirname, '../../youtube/youtube_downloader.py');
+    const result = await downloadScheduler.run(schedule, grant =>
+      executePythonScript(downloadScriptPath, ['--stage', 'download', youtubeUrl, outputPath, ...transferArgs(grant)], { timeout: 120000 })
+    );
+
+    if (!result || !result.success) {
+      throw new Error((result && result.error) || 'Container download failed');
+    }
+    return result;
+  }
+
+  /**
+   * Fetches SponsorBlock segments to cut from a video
+   * @param {string} videoId - The YouTube video id
+   * @returns {Promise} - Promise that resolves with a list of [start, end] pairs
+   */
+  async fetchSponsorSegments(videoId) {
+    const downloadScriptPath = path.join(__dirname, '../../youtube/youtube_downloader.py');
+    const result = await executePythonScript(downloadScriptPath, ['--stage', 'segments', videoId], { timeout: 30000 });
+
+    if (!result || !result.success) {
+      throw new Error((result && result.error) || 'SponsorBlock lookup failed');
+    }
+    return result.segments;
+  }
+
+  /**
+   * Delivers a previously processed track from the audio library without downloading it
+   * @param {string} outputPath - Where the file should appear (its extension follows the profile)
+   * @param {Object} ids - { spotifyId, isrc } identifying the track, and the transcode profile it was made with
+   * @returns {Promise} - Promise that resolves with { hit, output_file }
+   */
+  async lookupLibrary(outputPath, { spotifyId, isrc, profile } = {}) {
+    const downloadScriptPath = path.join(__dirname, '../../youtube/youtube_downloader.py');
+    const result = await executePythonScript(
+      downloadScriptPath,
+      ['--stage', 'lookup', outputPath, ...libraryArgs({ spotifyId, isrc }), ...profileArgs(profile)],
+      { timeout: 30000 }
+    );
+
+    if (!result || !result.success) {
+      throw new Error((result && result.error) || 'Audio library lookup failed');
+    }
+    return result;
+  }
+
+  /**
+   * Trims segments from a downloaded container and encodes it in one ffmpeg run,
+   * or remuxes it without re-encoding under the copy profile when nothing is cut.
+   * Runs in the process-wide encode pool.
+   * @param {string} containerPath - Path of the downloaded container
+   * @param {string} outputPath - Where to write the output (its extension follows the profile)
+   * @param {Array} segments - [start, end] pairs to remove
+   * @param {Object} ids - { videoId, spotifyId, isrc } used to store the result in the audio library,
+   *   the source duration reported by the download stage, and the transcode profile
+   * @returns {Promise} - Promise that resolves with { output_file }
+   */
+  async transcodeAudio(containerPath, outputPath, segments = [], { videoId, spotifyId, isrc, duration, profile } = {}) {
+    const downloadScriptPath = path.join(__dirname, '../../youtube/youtube_downloader.py');
+    const args = ['--stage', 'transcode', containerPath, outputPath, JSON.stringify(segments), ...profileArgs(profile)];
+    if (duration) {
+      // Lets the trim skip a trailing range that a final segment already covers
+      args.push('--duration', String(duration));
+    }
+    if (videoId) {
+      args.push('--video-id', videoId, ...libraryArgs({ spotifyId, isrc }));
+    }
+    const result = await encodePool.execute(downloadScriptPath, args, { timeout: 120000 });
+
+    if (!result || !result.success) {
+      throw new Error((result && result.error) || 'Transcoding failed');
+    }
+    return result;
+  }
+
   /**
    * Searches for YouTube videos based on a query
    * @param {string} query - The search query
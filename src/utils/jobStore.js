@@ -0,0 +1,166 @@
+const fs = require('fs');
+const path = require('path');
+const crypto = require('crypto');
+
+/**
+ * Durable on-disk store for download jobs.
+ *
+ * Every job has a JSON snapshot (<id>.json) and an append-only journal
+ * (<id>.log) of the changes made since the snapshot. Track state changes only
+ * append one short line, so a 1,000-track playlist doesn't rewrite the whole
+ * job on every step. Loading replays the journal over the snapshot; a torn last
+ * line from a crash mid-write is ignored. compact() folds the journal back into
+ * the snapshot.
+ *
+ * Writes are synchronous on purpose: once a track is recorded as trimmed the
+ * entry is in the OS page cache before anything else runs, so a crash right
+ * after a transcode can't lose the record and cause the work to be redone.
+ */
+class JobStore {
+  /**
+   * @param {string} dir - Directory holding the job files
+   */
+  constructor(dir) {
+    this.dir = dir;
+    this.jobs = new Map();
+  }
+
+  /**
+   * Creates the directory and loads every stored job
+   * @returns {Promise<Array>} - The loaded jobs
+   */
+  async init() {
+    await fs.promises.mkdir(this.dir, { recursive: true });
+    const files = await fs.promises.readdir(this.dir);
+    for (const file of files.filter(name => name.endsWith('.json'))) {
+      const id = path.basename(file, '.json');
+      try {
+        this.jobs.set(id, await this.load(id));
+      } catch (error) {
+        // Leave unreadable jobs on disk for inspection but don't let them block startup
+        this.jobs.delete(id);
+      }
+    }
+    return this.list();
+  }
+
+  async load(id) {
+    const job = JSON.parse(await fs.promises.readFile(this.snapshotPath(id), 'utf8'));
+    let journal = '';
+    try {
+      journal = await fs.promises.readFile(this.journalPath(id), 'utf8');
+    } catch (error) {
+      if (error.code !== 'ENOENT') {
+        throw error;
+      }
+    }
+    if (journal && !journal.endsWith('\n')) {
+      // Terminate a torn last line so the next append starts on a fresh line
+      await fs.promises.appendFile(this.journalPath(id), '\n');
+    }
+    for (const line of journal.split('\n')) {
+      if (!line.trim()) {
+        continue;
+      }
+      try {
+        this.apply(job, JSON.parse(line));
+      } catch (error) {
+        // Torn write from a crash; the entry never took effect
+      }
+    }
+    return job;
+  }
+
+  apply(job, entry) {
+    if (entry.op === 'job') {
+      Object.assign(job, entry.changes);
+    } else if (entry.op === 'add') {
+      job.tracks[entry.track.index] = entry.track;
+    } else if (entry.op === 'track' && job.tracks[entry.index]) {
+      Object.assign(job.tracks[entry.index], entry.changes);
+    }
+  }
+
+  snapshotPath(id) {
+    return path.join(this.dir, `${id}.json`);
+  }
+
+  journalPath(id) {
+    return path.join(this.dir, `${id}.log`);
+  }
+
+  writeSnapshot(job) {
+    const target = this.snapshotPath(job.id);
+    const temp = `${target}.${process.pid}.tmp`;
+    fs.writeFileSync(temp, JSON.stringify(job));
+    // rename is atomic, so a crash leaves either the old or the new snapshot
+    fs.renameSync(temp, target);
+  }
+
+  journal(job, entry) {
+    this.apply(job, entry);
+    job.updatedAt = Date.now();
+    fs.appendFileSync(this.journalPath(job.id), JSON.stringify(entry) + '\n');
+  }
+
+  /**
+   * Creates and persists a new job
+   * @param {Object} fields - Initial job fields
+   * @returns {Object} - The stored job
+   */
+  create(fields) {
+    const now = Date.now();
+    const job = {
+      id: crypto.randomUUID(),
+      status: 'queued',
+      createdAt: now,
+      updatedAt: now,
+      tracks: [],
+      ...fields
+    };
+    this.jobs.set(job.id, job);
+    this.writeSnapshot(job);
+    return job;
+  }
+
+  get(id) {
+    return this.jobs.get(id) || null;
+  }
+
+  list() {
+    return [...this.jobs.values()].sort((a, b) => a.createdAt - b.createdAt);
+  }
+
+  /**
+   * Records job-level changes (status, claim, counters)
+   */
+  update(job, changes) {
+    this.journal(job, { op: 'job', changes });
+  }
+
+  /**
+   * Records a newly listed track
+   */
+  addTrack(job, track) {
+    this.journal(job, { op: 'add', track });
+  }
+
+  /**
+   * Records changes to one track
+   */
+  updateTrack(job, index, changes) {
+    this.journal(job, { op: 'track', index, changes });
+  }
+
+  /**
+   * Writes a fresh snapshot and empties the journal
+   */
+  compact(job) {
+    this.writeSnapshot(job);
+    fs.writeFileSync(this.journalPath(job.id), '');
+  }
+}
+
+module.exports = {
+  JobStore
+};
@@ -0,0 +1,215 @@
+// Default histogram buckets in seconds: from a cache hit to a long download
+const DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120];
+
+const escapeLabel = (value) => String(value).replace(/\\/g, '\\\\').replace(/\n/g, '\\n').replace(/"/g, '\\"');
+
+const formatLabels = (names, values, extra = '') => {
+  const pairs = names.map((name, i) => `${name}="${escapeLabel(values[i])}"`);
+  if (extra) {
+    pairs.push(extra);
+  }
+  return pairs.length ? `{${pairs.join(',')}}` : '';
+};
+
+/**
+ * Base for labelled metric families; one series per distinct label set
+ */
+class Metric {
+  constructor(name, help, labelNames = []) {
+    this.name = name;
+    this.help = help;
+    this.labelNames = labelNames;
+    this.series = new Map();
+  }
+
+  seriesFor(labels, create) {
+    const values = this.labelNames.map(name => (labels[name] === undefined ? '' : labels[name]));
+    const key = values.join('\u0000');
+    let series = this.series.get(key);
+    if (!series) {
+      series = create(values);
+      this.series.set(key, series);
+    }
+    return series;
+  }
+}
+
+class Counter extends Metric {
+  constructor(name, help, labelNames) {
+    super(name, help, labelNames);
+    this.type = 'counter';
+  }
+
+  /**
+   * @param {Object} labels - Label values by name
+   * @param {number} amount - Amount to add (default 1)
+   */
+  inc(labels = {}, amount = 1) {
+    this.seriesFor(labels, values => ({ values, value: 0 })).value += amount;
+  }
+
+  render() {
+    return [...this.series.values()].map(s => `${this.name}${formatLabels(this.labelNames, s.values)} ${s.value}`);
+  }
+}
+
+class Histogram extends Metric {
+  constructor(name, help, labelNames, buckets = DEFAULT_BUCKETS) {
+    super(name, help, labelNames);
+    this.type = 'histogram';
+    this.buckets = buckets;
+  }
+
+  /**
+   * @param {Object} labels - Label values by name
+   * @param {number} value - Observed value (seconds for durations)
+   */
+  observe(labels, value) {
+    const series = this.seriesFor(labels, values => ({
+      values,
+      counts: new Array(this.buckets.length).fill(0),
+      sum: 0,
+      count: 0
+    }));
+    // Counts are stored per bucket and made cumulative when rendered
+    const index = this.buckets.findIndex(bound => value <= bound);
+    if (index !== -1) {
+      series.counts[index]++;
+    }
+    series.sum += value;
+    series.count++;
+  }
+
+  render() {
+    const lines = [];
+    for (const s of this.series.values()) {
+      let cumulative = 0;
+      this.buckets.forEach((bound, i) => {
+        cumulative += s.counts[i];
+        lines.push(`${this.name}_bucket${formatLabels(this.labelNames, s.values, `le="${bound}"`)} ${cumulative}`);
+      });
+      lines.push(`${this.name}_bucket${formatLabels(this.labelNames, s.values, 'le="+Inf"')} ${s.count}`);
+      lines.push(`${this.name}_sum${formatLabels(this.labelNames, s.values)} ${s.sum}`);
+      lines.push(`${this.name}_count${formatLabels(this.labelNames, s.values)} ${s.count}`);
+    }
+    return lines;
+  }
+}
+
+/**
+ * Set of metric families rendered together in the Prometheus text format
+ */
+class Registry {
+  constructor() {
+    this.metrics = new Map();
+  }
+
+  register(metric) {
+    this.metrics.set(metric.name, metric);
+    return metric;
+  }
+
+  counter(name, help, labelNames) {
+    return this.metrics.get(name) || this.register(new Counter(name, help, labelNames));
+  }
+
+  histogram(name, help, labelNames, buckets) {
+    return this.metrics.get(name) || this.register(new Histogram(name, help, labelNames, buckets));
+  }
+
+  /**
+   * @returns {string} - Exposition text for every registered metric
+   */
+  render() {
+    const lines = [];
+    for (const metric of this.metrics.values()) {
+      lines.push(`# HELP ${metric.name} ${metric.help}`);
+      lines.push(`# TYPE ${metric.name} ${metric.type}`);
+      lines.push(...metric.render());
+    }
+    return lines.join('\n') + '\n';
+  }
+}
+
+const registry = new Registry();
+
+const pythonRuns = registry.counter(
+  'python_script_runs_total', 'Python script invocations', ['script', 'mode', 'status']);
+const pythonDuration = registry.histogram(
+  'python_script_duration_seconds', 'Wall time of a Python script run as seen from Node', ['script', 'mode']);
+const pythonStageDuration = registry.histogram(
+  'python_stage_duration_seconds',
+  'Time spent per stage of a Python script run; "startup" is interpreter start and imports, or queueing for a warm worker',
+  ['script', 'stage']);
+const pythonStageBytes = registry.counter(
+  'python_stage_bytes_total', 'Bytes produced per stage of a Python script run', ['script', 'stage']);
+const cacheLookups = registry.counter(
+  'response_cache_lookups_total', 'Response cache lookups by result (hit, stale, miss)', ['cache', 'result']);
+const httpDuration = registry.histogram(
+  'http_request_duration_seconds', 'HTTP request latency', ['method', 'route', 'status']);
+
+/**
+ * Records one Python script run
+ * @param {string} script - Script name without the .py extension
+ * @param {string} mode - 'spawn' or 'worker'
+ * @param {number} startedAt - Date.now() when Node started the run
+ * @param {Object|null} timings - The 'timings' object the script reported, if any
+ * @param {boolean} ok - Whether the run succeeded
+ * @returns {Object|null} - Per-stage milliseconds including startup, for logging
+ */
+const observePythonRun = (script, mode, startedAt, timings, ok) => {
+  const wallMs = Date.now() - startedAt;
+  pythonRuns.inc({ script, mode, status: ok ? 'ok' : 'error' });
+  pythonDuration.observe({ script, mode }, wallMs / 1000);
+
+  if (!timings || typeof timings !== 'object') {
+    return null;
+  }
+  const breakdown = {};
+  if (timings.started_at) {
+    // Both clocks are wall clocks on the same host
+    const startupMs = Math.max(0, timings.started_at - startedAt);
+    pythonStageDuration.observe({ script, stage: 'startup' }, startupMs / 1000);
+    breakdown.startup = Math.round(startupMs);
+  }
+  for (const [stage, entry] of Object.entries(timings.stages || {})) {
+    if (entry.calls > 0) {
+      pythonStageDuration.observe({ script, stage }, entry.ms / 1000);
+    }
+    if (entry.bytes > 0) {
+      pythonStageBytes.inc({ script, stage }, entry.bytes);
+    }
+    breakdown[stage] = Math.round(entry.ms);
+  }
+  return breakdown;
+};
+
+/**
+ * Records one HTTP request
+ * @param {string} method - HTTP method
+ * @param {string} route - Matched route pattern (not the raw URL, to bound cardinality)
+ * @param {number} status - Response status code
+ * @param {number} seconds - Request duration
+ */
+const observeHttpRequest = (method, route, status, seconds) => {
+  httpDuration.observe({ method, route, status }, seconds);
+};
+
+/**
+ * Records one response cache lookup
+ * @param {string} cache - Cache name
+ * @param {string} result - 'hit', 'stale' or 'miss'
+ */
+const observeCacheLookup = (cache, result) => {
+  cacheLookups.inc({ cache, result });
+};
+
+module.exports = {
+  Counter,
+  Histogram,
+  Registry,
+  registry,
+  observePythonRun,
+  observeHttpRequest,
+  observeCacheLookup
+};
@@ -0,0 +1,48 @@
+const { Transform } = require('stream');
+
+/**
+ * Transform stream that turns newline-delimited JSON text into parsed objects.
+ *
+ * Lines are parsed as soon as their newline arrives, so consumers see the first
+ * record long before the producer has finished writing the rest. Lines that are
+ * not valid JSON are emitted as 'invalid' events instead of failing the stream.
+ */
+class NdjsonParser extends Transform {
+  constructor() {
+    super({ readableObjectMode: true });
+    this.buffer = '';
+  }
+
+  _transform(chunk, encoding, callback) {
+    this.buffer += chunk.toString();
+    const lines = this.buffer.split('\n');
+    // The last piece is an incomplete line until its newline arrives
+    this.buffer = lines.pop();
+    for (const line of lines) {
+      this.parseLine(line);
+    }
+    callback();
+  }
+
+  _flush(callback) {
+    this.parseLine(this.buffer);
+    this.buffer = '';
+    callback();
+  }
+
+  parseLine(line) {
+    const trimmed = line.trim();
+    if (!trimmed) {
+      return;
+    }
+    try {
+      this.push(JSON.parse(trimmed));
+    } catch (e) {
+      this.emit('invalid', trimmed);
+    }
+  }
+}
+
+module.exports = {
+  NdjsonParser
+};
@@ -0,0 +1,206 @@
+const EventEmitter = require('events');
+
+const DONE = Symbol('done');
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+/**
+ * FIFO queue whose put() waits while the queue is full
+ */
+class BoundedQueue {
+  constructor(capacity) {
+    this.capacity = capacity;
+    this.items = [];
+    this.putters = [];
+    this.takers = [];
+    this.closed = false;
+  }
+
+  get length() {
+    return this.items.length;
+  }
+
+  async put(item) {
+    // Hand the item straight to a waiting consumer when there is one
+    if (this.takers.length > 0) {
+      this.takers.shift()(item);
+      return;
+    }
+    while (this.items.length >= this.capacity) {
+      await new Promise(resolve => this.putters.push(resolve));
+      if (this.takers.length > 0) {
+        this.takers.shift()(item);
+        return;
+      }
+    }
+    this.items.push(item);
+  }
+
+  take() {
+    if (this.items.length > 0) {
+      const item = this.items.shift();
+      if (this.putters.length > 0) {
+        this.putters.shift()();
+      }
+      return Promise.resolve(item);
+    }
+    if (this.closed) {
+      return Promise.resolve(DONE);
+    }
+    return new Promise(resolve => this.takers.push(resolve));
+  }
+
+  close() {
+    this.closed = true;
+    for (const resolve of this.takers) {
+      resolve(DONE);
+    }
+    this.takers = [];
+  }
+}
+
+/**
+ * Staged processing pipeline with per-stage concurrency limits.
+ *
+ * Every stage has its own bounded input queue and worker count, so a slow stage
+ * fills its queue and stalls the stage before it (backpressure) while the other
+ * stages keep working. Each item is retried per stage before it is marked failed.
+ *
+ * Emits:
+ *   'progress' ({ stage, status, item, attempt, error }) on every stage transition
+ *   'completed' (item) when an item clears the last stage
+ *   'failed' ({ item, stage, error }) when an item runs out of retries
+ */
+class Pipeline extends EventEmitter {
+  /**
+   * @param {Array} stages - [{ name, concurrency, handler: async (item) => void, retries }]
+   * @param {Object} options - { bufferSize, retries, retryDelay }
+   */
+  constructor(stages, options = {}) {
+    super();
+    this.options = { bufferSize: 8, retries: 2, retryDelay: 1000, ...options };
+    this.completed = [];
+    this.failed = [];
+    this.closed = false;
+
+    this.stages = stages.map(stage => ({
+      ...stage,
+      concurrency: Math.max(1, stage.concurrency || 1),
+      retries: stage.retries !== undefined ? stage.retries : this.options.retries,
+      queue: new BoundedQueue(this.options.bufferSize),
+      stats: { queued: 0, active: 0, done: 0, failed: 0, retried: 0 }
+    }));
+
+    this.finished = this.stages.reduce((previousStageDone, stage, index) => {
+      const workers = [];
+      for (let i = 0; i < stage.concurrency; i++) {
+        workers.push(this.runWorker(stage, this.stages[index + 1]));
+      }
+      const stageDone = Promise.all(workers);
+      // A stage's queue can only close once every stage before it has drained
+      Promise.all([previousStageDone, stageDone]).then(() => {
+        if (this.stages[index + 1]) {
+          this.stages[index + 1].queue.close();
+        }
+      });
+      return Promise.all([previousStageDone, stageDone]);
+    }, Promise.resolve());
+  }
+
+  async runWorker(stage, nextStage) {
+    for (;;) {
+      const item = await stage.queue.take();
+      if (item === DONE) {
+        return;
+      }
+      stage.stats.queued--;
+      stage.stats.active++;
+
+      const ok = await this.runStage(stage, item);
+
+      stage.stats.active--;
+      if (!ok) {
+        continue;
+      }
+      stage.stats.done++;
+
+      if (nextStage) {
+        nextStage.stats.queued++;
+        // Holding the slot until the next stage has room is what applies backpressure
+        await nextStage.queue.put(item);
+      } else {
+        this.completed.push(item);
+        this.emit('completed', item);
+      }
+    }
+  }
+
+  async runStage(stage, item) {
+    for (let attempt = 1; ; attempt++) {
+      this.emit('progress', { stage: stage.name, status: 'started', item, attempt });
+      try {
+        await stage.handler(item);
+        this.emit('progress', { stage: stage.name, status: 'done', item, attempt });
+        return true;
+      } catch (error) {
+        if (attempt > stage.retries) {
+          stage.stats.failed++;
+          this.failed.push({ item, stage: stage.name, error });
+          this.emit('progress', { stage: stage.name, status: 'failed', item, attempt, error });
+          this.emit('failed', { item, stage: stage.name, error });
+          return false;
+        }
+        stage.stats.retried++;
+        this.emit('progress', { stage: stage.name, status: 'retrying', item, attempt, error });
+        await sleep(this.options.retryDelay * attempt);
+      }
+    }
+  }
+
+  /**
+   * Feeds an item into the first stage
+   * @param {*} item - Item to process
+   * @returns {Promise} - Resolves once the first stage has accepted the item
+   */
+  push(item) {
+    if (this.closed) {
+      return Promise.reject(new Error('Cannot push to a closed pipeline'));
+    }
+    this.stages[0].stats.queued++;
+    return this.stages[0].queue.put(item);
+  }
+
+  /**
+   * Signals that no more items will be pushed
+   */
+  close() {
+    this.closed = true;
+    this.stages[0].queue.close();
+  }
+
+  /**
+   * Waits for every pushed item to complete or fail
+   * @returns {Promise} - Resolves with { completed, failed }
+   */
+  async drain() {
+    await this.finished;
+    return { completed: this.completed, failed: this.failed };
+  }
+
+  /**
+   * Snapshot of per-stage counters
+   * @returns {Object} - Stage name to { queued, active, done, failed, retried }
+   */
+  progress() {
+    const snapshot = {};
+    for (const stage of this.stages) {
+      snapshot[stage.name] = { ...stage.stats };
+    }
+    return snapshot;
+  }
+}
+
+module.exports = {
+  Pipeline,
+  BoundedQueue
+};
@@ -2,15 +2,99 @@ const { spawn } = require('child_process');
 const path = require('path');
 const config = require('../config/config');
 const logger = require('./logger');
+const { pool } = require('./pythonWorkerPool');
+const { NdjsonParser } = require('./ndjsonParser');
+const { observePythonRun } = require('./metrics');
+const { currentContext } = require('./requestContext');
+
+// Scripts the warm worker pool and the toolchain dispatcher know how to serve
+const WORKER_SCRIPTS = ['spotify_metadata', 'spotify_playlist', 'fetch_youtube_url', 'youtube_downloader'];
+
+// Dispatcher CLI (toolchain/cli.py); runs a script from its cached bytecode
+// instead of compiling the script file on every spawn
+const TOOLCHAIN_DIR = path.join(__dirname, '../../toolchain');
+
+/**
+ * Interpreter arguments that run a script in a fresh process
+ * @param {string} scriptPath - Path to the Python script
+ * @param {Array} args - Script arguments
+ * @returns {Array}
+ */
+const spawnArgs = (scriptPath, args) => {
+  const scriptName = path.basename(scriptPath, '.py');
+  if (WORKER_SCRIPTS.includes(scriptName)) {
+    return [TOOLCHAIN_DIR, scriptName, ...args];
+  }
+  return [path.resolve(scriptPath), ...args];
+};
+
+/**
+ * Adds --profile when the current request asked for a cProfile dump
+ * @param {Array} args - Script arguments
+ * @returns {Array}
+ */
+const withProfileFlag = (args) => (currentContext().profile ? [...args, '--profile'] : args);
+
+/**
+ * Feeds a finished run into the metrics and logs its stage breakdown
+ * @param {string} scriptName - Script name without the .py extension
+ * @param {string} mode - 'spawn' or 'worker'
+ * @param {number} startedAt - Date.now() when the run was started
+ * @param {Object} timings - The script's reported timings, if any
+ * @param {boolean} ok - Whether the run succeeded
+ */
+const recordRun = (scriptName, mode, startedAt, timings, ok) => {
+  const breakdown = observePythonRun(scriptName, mode, startedAt, timings, ok);
+  const stages = breakdown
+    ? ' (' + Object.entries(breakdown).map(([stage, ms]) => `${stage} ${ms}ms`).join(', ') + ')'
+    : '';
+  logger.debug(`Python ${scriptName} ${ok ? 'finished' : 'failed'} in ${Date.now() - startedAt}ms via ${mode}${stages}`);
+  if (timings && timings.profile) {
+    logger.info(`cProfile dump for ${scriptName}: ${timings.profile}`);
+  }
+};
 
 /**
  * Executes a Python script with given arguments
  * @param {string} scriptPath - Path to the Python script
  * @param {Array} args - Arguments to pass to the Python script
- * @param {Object} options - Additional options for execution
+ * @param {Object} options - Additional options for execution (timeout, input, and
+ *   workerPool to run in a dedicated PythonWorkerPool instead of the shared one)
  * @returns {Promise} - Resolves with the script output or rejects with error
  */
 const executePythonScript = (scriptPath, args = [], options = {}) => {
+  const scriptName = scriptPath ? path.basename(scriptPath, '.py') : null;
+  const runArgs = withProfileFlag(args);
+  const startedAt = Date.now();
+
+  // Dispatch to a preloaded interpreter instead of spawning when the pool is enabled
+  const pooled = config.pythonWorkers.enabled && WORKER_SCRIPTS.includes(scriptName);
+  const run = pooled
+    ? (options.workerPool || pool).run(scriptName, runArgs, options)
+    : spawnPythonScript(scriptPath, runArgs, options);
+
+  const mode = pooled ? 'worker' : 'spawn';
+  return run.then((result) => {
+    recordRun(scriptName, mode, startedAt, result && result.timings, true);
+    // Stage timings are for metrics and logs only; callers get the script's own result
+    if (result && typeof result === 'object') {
+      delete result.timings;
+    }
+    return result;
+  }, (error) => {
+    recordRun(scriptName, mode, startedAt, null, false);
+    throw error;
+  });
+};
+
+/**
+ * Executes a Python script in a fresh interpreter
+ * @param {string} scriptPath - Path to the Python script
+ * @param {Array} args - Arguments to pass to the Python script
+ * @param {Object} options - Additional options for execution
+ * @returns {Promise} - Resolves with the script output or rejects with error
+ */
+const spawnPythonScript = (scriptPath, args = [], options = {}) => {
   return new Promise((resolve, reject) => {
     // Set default timeout from config if not provided
     const timeout = options.timeout || config.timeout.pythonScript;
@@ -20,14 +104,14 @@ const executePythonScript = (scriptPath, args = [], options = {}) => {
       return reject(new Error('Python script path is required'));
     }
     
-    // Resolve the full path to the Python script
-    const fullScriptPath = path.resolve(scriptPath);
-    
-    // Prepare arguments, ensuring the script path is the first argument
-    const pythonArgs = [fullScriptPath, ...args];
-    
     // Spawn the Python process
-    const pythonProcess = spawn('python', pythonArgs);
+    const pythonProcess = spawn(config.pythonPath, spawnArgs(scriptPath, args));
+
+    // Feed optional input (e.g. a JSON track list) to the script's stdin
+    if (options.input !== undefined) {
+      pythonProcess.stdin.write(options.input);
+    }
+    pythonProcess.stdin.end();
     
     let stdout = '';
     let stderr = '';
@@ -92,6 +176,141 @@ const executePythonScript = (scriptPath, args = [], options = {}) => {
   });
 };
 
+/**
+ * Executes a Python script that writes newline-delimited JSON and hands each
+ * record to a callback as soon as its line arrives
+ * @param {string} scriptPath - Path to the Python script
+ * @param {Array} args - Arguments to pass to the Python script
+ * @param {Object} options - { onRecord, timeout, input }
+ * @returns {Promise} - Resolves with the number of records once the script exits
+ */
+const streamPythonScript = (scriptPath, args = [], options = {}) => {
+  const scriptName = scriptPath ? path.basename(scriptPath, '.py') : null;
+  const pooled = config.pythonWorkers.enabled && WORKER_SCRIPTS.includes(scriptName);
+  const startedAt = Date.now();
+  let timings = null;
+
+  // Streaming scripts report their timings on the final record
+  const onRecord = (record) => {
+    if (record && record.timings) {
+      timings = record.timings;
+      delete record.timings;
+    }
+    options.onRecord(record);
+  };
+
+  return runStream(scriptPath, scriptName, pooled, withProfileFlag(args), { ...options, onRecord })
+    .then((count) => {
+      recordRun(scriptName, pooled ? 'worker' : 'spawn', startedAt, timings, true);
+      return count;
+    }, (error) => {
+      recordRun(scriptName, pooled ? 'worker' : 'spawn', startedAt, timings, false);
+      throw error;
+    });
+};
+
+/**
+ * Runs a streaming script in a warm worker or a fresh interpreter
+ * @returns {Promise} - Resolves with the number of records once the script exits
+ */
+const runStream = (scriptPath, scriptName, pooled, args, options) => {
+  if (pooled) {
+    let count = 0;
+    return pool.stream(scriptName, args, {
+      ...options,
+      onLine: (line) => {
+        let record;
+        try {
+          record = JSON.parse(line);
+        } catch (e) {
+          logger.warn(`Skipping non-JSON line from ${scriptName}: ${line}`);
+          return;
+        }
+        count++;
+        options.onRecord(record);
+      }
+    }).then(() => count);
+  }
+
+  return new Promise((resolve, reject) => {
+    const timeout = options.timeout || config.timeout.pythonScript;
+
+    if (!scriptPath) {
+      return reject(new Error('Python script path is required'));
+    }
+
+    const pythonProcess = spawn(config.pythonPath, spawnArgs(scriptPath, args));
+
+    if (options.input !== undefined) {
+      pythonProcess.stdin.write(options.input);
+    }
+    pythonProcess.stdin.end();
+
+    const parser = new NdjsonParser();
+    let count = 0;
+    let stderr = '';
+    let callbackError = null;
+
+    parser.on('data', (record) => {
+      count++;
+      try {
+        options.onRecord(record);
+      } catch (error) {
+        // Stop the script rather than keep streaming into a broken consumer
+        callbackError = error;
+        pythonProcess.kill();
+      }
+    });
+
+    parser.on('invalid', (line) => {
+      logger.warn(`Skipping non-JSON line from ${scriptPath}: ${line}`);
+    });
+
+    pythonProcess.stdout.pipe(parser);
+
+    pythonProcess.stderr.on('data', (data) => {
+      stderr += data.toString();
+    });
+
+    const timeoutId = setTimeout(() => {
+      pythonProcess.kill();
+      const timeoutError = new Error(`Python script execution timed out after ${timeout}ms`);
+      timeoutError.code = 'TIMEOUT';
+      reject(timeoutError);
+    }, timeout);
+
+    pythonProcess.on('error', (error) => {
+      clearTimeout(timeoutId);
+      logger.error(`Failed to start Python process: ${error.message}`);
+      reject(error);
+    });
+
+    pythonProcess.on('close', (code) => {
+      clearTimeout(timeoutId);
+      const settle = () => {
+        if (callbackError) {
+          reject(callbackError);
+        } else if (code === 0) {
+          resolve(count);
+        } else {
+          const error = new Error(`Python script exited with code ${code}: ${stderr}`);
+          error.stderr = stderr;
+          error.code = code;
+          reject(error);
+        }
+      };
+      // Wait for the parser to flush any final unterminated line
+      if (parser.writableFinished) {
+        settle();
+      } else {
+        parser.once('finish', settle);
+      }
+    });
+  });
+};
+
 module.exports = {
-  executePythonScript
+  executePythonScript,
+  spawnPythonScript,
+  streamPythonScript
 };
\ No newline at end of file
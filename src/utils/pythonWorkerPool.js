@@ -0,0 +1,293 @@
+const { spawn } = require('child_process');
+const path = require('path');
+const config = require('../config/config');
+const logger = require('./logger');
+
+const WORKER_SCRIPT = path.join(__dirname, '../../workers/python_worker.py');
+
+/**
+ * A single long-lived Python interpreter speaking newline-delimited JSON
+ */
+class PythonWorker {
+  constructor(pool, id) {
+    this.pool = pool;
+    this.id = id;
+    this.nextRequestId = 1;
+    this.pending = new Map();
+    this.buffer = '';
+    this.busy = false;
+    this.isReady = false;
+    this.retiring = false;
+    this.exited = false;
+    this.ready = new Promise((resolve, reject) => {
+      this.resolveReady = resolve;
+      this.rejectReady = reject;
+    });
+
+    this.process = spawn(config.pythonPath, [
+      WORKER_SCRIPT,
+      '--max-requests', String(pool.options.maxRequestsPerWorker)
+    ], { cwd: path.join(__dirname, '../..') });
+
+    this.process.stdout.on('data', (data) => this.onData(data));
+
+    this.process.stderr.on('data', (data) => {
+      logger.debug(`Python worker ${this.id} stderr: ${data.toString().trim()}`);
+    });
+
+    this.process.on('error', (error) => {
+      logger.error(`Failed to start Python worker ${this.id}: ${error.message}`);
+      this.onExit(error);
+    });
+
+    this.process.on('close', (code) => {
+      this.onExit(new Error(`Python worker exited with code ${code}`));
+    });
+  }
+
+  onData(data) {
+    this.buffer += data.toString();
+    let newlineIndex;
+    while ((newlineIndex = this.buffer.indexOf('\n')) !== -1) {
+      const line = this.buffer.slice(0, newlineIndex).trim();
+      this.buffer = this.buffer.slice(newlineIndex + 1);
+      if (line) {
+        this.onMessage(line);
+      }
+    }
+  }
+
+  onMessage(line) {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (e) {
+      logger.error(`Python worker ${this.id} sent invalid JSON: ${line}`);
+      return;
+    }
+
+    if (message.ready) {
+      this.isReady = true;
+      this.resolveReady();
+      return;
+    }
+
+    if (message.recycle) {
+      // The worker exits after this response; stop handing it new work
+      this.retiring = true;
+    }
+
+    const request = this.pending.get(message.id);
+    if (!request) {
+      return;
+    }
+
+    // Streamed output arrives as line messages ahead of the final response
+    if (message.line !== undefined) {
+      if (request.onLine) {
+        request.onLine(message.line);
+      }
+      return;
+    }
+
+    this.pending.delete(message.id);
+    clearTimeout(request.timeoutId);
+    request.resolve(message);
+  }
+
+  onExit(error) {
+    if (this.exited) {
+      return;
+    }
+    this.exited = true;
+    this.rejectReady(error);
+    for (const request of this.pending.values()) {
+      clearTimeout(request.timeoutId);
+      request.reject(error);
+    }
+    this.pending.clear();
+    this.pool.onWorkerExit(this);
+  }
+
+  /**
+   * Sends a request and waits for the matching response
+   * @param {Object} payload - Request body (op, script, args)
+   * @param {number} timeout - Milliseconds before the worker is killed
+   * @param {Function} onLine - Receives streamed output lines for this request
+   * @returns {Promise} - Resolves with the raw response message
+   */
+  send(payload, timeout, onLine) {
+    return new Promise((resolve, reject) => {
+      const id = this.nextRequestId++;
+      const timeoutId = setTimeout(() => {
+        this.pending.delete(id);
+        // A stuck interpreter can't be trusted with the next request
+        this.kill();
+        const timeoutError = new Error(`Python worker request timed out after ${timeout}ms`);
+        timeoutError.code = 'TIMEOUT';
+        reject(timeoutError);
+      }, timeout);
+
+      this.pending.set(id, { resolve, reject, timeoutId, onLine });
+      this.process.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
+    });
+  }
+
+  kill() {
+    this.retiring = true;
+    this.process.kill();
+  }
+}
+
+/**
+ * Pool of preloaded Python interpreters that replaces per-request spawns
+ */
+class PythonWorkerPool {
+  constructor(options = {}) {
+    this.options = { ...config.pythonWorkers, ...options };
+    this.workers = [];
+    this.queue = [];
+    this.nextWorkerId = 1;
+    this.started = false;
+    this.stopped = false;
+    this.healthCheckTimer = null;
+  }
+
+  start() {
+    if (this.started) {
+      return;
+    }
+    this.started = true;
+    this.stopped = false;
+    for (let i = 0; i < this.options.poolSize; i++) {
+      this.spawnWorker();
+    }
+    this.healthCheckTimer = setInterval(() => this.healthCheck(), this.options.healthCheckInterval);
+    this.healthCheckTimer.unref();
+    logger.info(`Started Python worker pool with ${this.options.poolSize} workers`);
+  }
+
+  spawnWorker() {
+    const worker = new PythonWorker(this, this.nextWorkerId++);
+    // Startup failures are reported through onWorkerExit
+    worker.ready.then(() => this.dispatch(), () => {});
+    this.workers.push(worker);
+    return worker;
+  }
+
+  onWorkerExit(worker) {
+    this.workers = this.workers.filter(w => w !== worker);
+    if (this.stopped) {
+      return;
+    }
+    logger.info(`Python worker ${worker.id} exited, spawning a replacement`);
+    // Back off when the interpreter dies during startup so a broken install doesn't spin
+    const delay = worker.isReady ? 0 : this.options.respawnDelay;
+    setTimeout(() => {
+      if (!this.stopped) {
+        this.spawnWorker();
+      }
+    }, delay).unref();
+  }
+
+  /**
+   * Runs a script in a warm worker
+   * @param {string} script - Script name without the .py extension
+   * @param {Array} args - Arguments to pass to the script
+   * @param {Object} options - Additional options (timeout, input written to the script's stdin)
+   * @returns {Promise} - Resolves with the script result or rejects with error
+   */
+  run(script, args = [], options = {}) {
+    this.start();
+    const timeout = options.timeout || config.timeout.pythonScript;
+    const payload = { op: 'run', script, args };
+    if (options.input !== undefined) {
+      payload.stdin = options.input;
+    }
+    if (options.onLine) {
+      payload.stream = true;
+    }
+
+    return new Promise((resolve, reject) => {
+      this.queue.push({ payload, timeout, onLine: options.onLine, resolve, reject });
+      this.dispatch();
+    }).then((message) => {
+      if (!message.ok) {
+        throw new Error(`Python worker failed to run ${script}: ${message.error}`);
+      }
+      if (message.exit_code !== 0) {
+        const stdout = JSON.stringify(message.result);
+        const error = new Error(`Python script exited with code ${message.exit_code}: ${stdout}`);
+        error.stdout = stdout;
+        error.code = message.exit_code;
+        throw error;
+      }
+      return message.result;
+    });
+  }
+
+  /**
+   * Runs a script in a warm worker and forwards every line it prints as it is written
+   * @param {string} script - Script name without the .py extension
+   * @param {Array} args - Arguments to pass to the script
+   * @param {Object} options - { onLine, timeout, input }
+   * @returns {Promise} - Resolves once the script has finished
+   */
+  stream(script, args = [], options = {}) {
+    return this.run(script, args, options);
+  }
+
+  dispatch() {
+    while (this.queue.length > 0) {
+      const worker = this.workers.find(w => !w.busy && !w.retiring && !w.exited);
+      if (!worker) {
+        return;
+      }
+      const job = this.queue.shift();
+      worker.busy = true;
+      worker.ready
+        .then(() => worker.send(job.payload, job.timeout, job.onLine))
+        .then(job.resolve, job.reject)
+        .finally(() => {
+          worker.busy = false;
+          this.dispatch();
+        });
+    }
+  }
+
+  healthCheck() {
+    for (const worker of this.workers) {
+      if (!worker.isReady || worker.busy || worker.retiring || worker.exited) {
+        continue;
+      }
+      worker.busy = true;
+      worker.send({ op: 'ping' }, this.options.healthCheckTimeout)
+        .catch((error) => {
+          // send() already killed the worker on timeout; the exit handler replaces it
+          logger.error(`Python worker ${worker.id} failed health check: ${error.message}`);
+        })
+        .finally(() => {
+          worker.busy = false;
+          this.dispatch();
+        });
+    }
+  }
+
+  stop() {
+    this.stopped = true;
+    this.started = false;
+    clearInterval(this.healthCheckTimer);
+    for (const worker of this.workers) {
+      worker.kill();
+    }
+    this.workers = [];
+  }
+}
+
+const pool = new PythonWorkerPool();
+process.on('exit', () => pool.stop());
+
+module.exports = {
+  PythonWorkerPool,
+  pool
+};
@@ -0,0 +1,17 @@
+const { AsyncLocalStorage } = require('async_hooks');
+
+/**
+ * Per-request state that has to reach code deep below the controllers (the
+ * Python executor) without being passed through every service call
+ */
+const requestContext = new AsyncLocalStorage();
+
+/**
+ * @returns {Object} - The current request's context, or an empty object outside a request
+ */
+const currentContext = () => requestContext.getStore() || {};
+
+module.exports = {
+  requestContext,
+  currentContext
+};
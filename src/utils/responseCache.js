@@ -0,0 +1,235 @@
+const fs = require('fs');
+const path = require('path');
+const crypto = require('crypto');
+const config = require('../config/config');
+const logger = require('./logger');
+const { observeCacheLookup } = require('./metrics');
+const { requestContext } = require('./requestContext');
+const { parseSpotifyUrl } = require('./validation');
+
+const sha1 = (text) => crypto.createHash('sha1').update(text).digest('hex');
+
+/**
+ * Cache of serialized API responses.
+ *
+ * Entries are kept as the JSON text sent to the client plus its ETag, so a hit
+ * is answered without running Python or serializing again. An in-memory LRU
+ * (bounded by entry count and bytes) sits in front of an optional on-disk tier
+ * that survives restarts. An entry is fresh for `ttl` milliseconds; for
+ * `staleTtl` after that it is still served, while one background run of the
+ * loader refreshes it. Concurrent misses for the same key share one load.
+ */
+class ResponseCache {
+  /**
+   * @param {Object} options - { name, ttl, staleTtl, maxEntries, maxBytes, dir, enabled };
+   *   defaults come from config.responseCache
+   */
+  constructor(options = {}) {
+    const settings = { ...config.responseCache, ...options };
+    this.name = settings.name;
+    this.enabled = settings.enabled;
+    this.ttl = settings.ttl;
+    this.staleTtl = settings.staleTtl;
+    this.maxEntries = settings.maxEntries;
+    this.maxBytes = settings.maxBytes;
+    this.dir = settings.dir ? path.join(settings.dir, this.name) : null;
+    this.entries = new Map();
+    this.bytes = 0;
+    this.inflight = new Map();
+  }
+
+  /**
+   * Returns the cached response for a key, loading it on a miss
+   * @param {string|null} key - Cache key; null bypasses the cache
+   * @param {Function} loader - Produces the response body (a promise of a JSON-serializable value)
+   * @returns {Promise<Object>} - { entry: { json, etag, storedAt }, result: 'hit'|'stale'|'miss'|'bypass' }
+   */
+  async fetch(key, loader) {
+    if (!this.enabled || !key) {
+      return { entry: this.createEntry(await loader()), result: 'bypass' };
+    }
+
+    const entry = this.memoryGet(key) || await this.diskGet(key);
+    const age = entry ? Date.now() - entry.storedAt : Infinity;
+    let result = 'miss';
+    if (age < this.ttl) {
+      result = 'hit';
+    } else if (age < this.ttl + this.staleTtl) {
+      result = 'stale';
+      // Requests that arrive during the refresh keep getting the stale entry
+      requestContext.exit(() => this.load(key, loader)).catch((error) => {
+        logger.warn(`Background refresh of ${this.name} ${key} failed: ${error.message}`);
+      });
+    }
+    observeCacheLookup(this.name, result);
+    if (result !== 'miss') {
+      return { entry, result };
+    }
+    return { entry: await this.load(key, loader), result };
+  }
+
+  /**
+   * Runs the loader once per key at a time and stores what it returns
+   */
+  load(key, loader) {
+    if (this.inflight.has(key)) {
+      return this.inflight.get(key);
+    }
+    const promise = Promise.resolve()
+      .then(loader)
+      .then((body) => {
+        const entry = this.createEntry(body);
+        this.memorySet(key, entry);
+        this.diskSet(key, entry);
+        return entry;
+      })
+      .finally(() => {
+        this.inflight.delete(key);
+      });
+    this.inflight.set(key, promise);
+    return promise;
+  }
+
+  createEntry(body) {
+    const json = JSON.stringify(body);
+    return { json, etag: `"${sha1(json)}"`, storedAt: Date.now() };
+  }
+
+  memoryGet(key) {
+    const entry = this.entries.get(key);
+    if (entry) {
+      // Move to the most recently used end
+      this.entries.delete(key);
+      this.entries.set(key, entry);
+    }
+    return entry || null;
+  }
+
+  memorySet(key, entry) {
+    this.memoryDelete(key);
+    if (entry.json.length > this.maxBytes) {
+      // Too large to keep in memory; the disk tier may still hold it
+      return;
+    }
+    this.entries.set(key, entry);
+    this.bytes += entry.json.length;
+    for (const oldest of this.entries.keys()) {
+      if (this.entries.size <= this.maxEntries && this.bytes <= this.maxBytes) {
+        break;
+      }
+      this.memoryDelete(oldest);
+    }
+  }
+
+  memoryDelete(key) {
+    const entry = this.entries.get(key);
+    if (entry) {
+      this.bytes -= entry.json.length;
+      this.entries.delete(key);
+    }
+  }
+
+  diskPath(key) {
+    return path.join(this.dir, `${sha1(key)}.json`);
+  }
+
+  async diskGet(key) {
+    if (!this.dir) {
+      return null;
+    }
+    let stored;
+    try {
+      stored = JSON.parse(await fs.promises.readFile(this.diskPath(key), 'utf8'));
+    } catch (error) {
+      // Missing, or torn by a crash mid-write: a miss either way
+      return null;
+    }
+    if (stored.key !== key) {
+      return null;
+    }
+    if (Date.now() - stored.storedAt >= this.ttl + this.staleTtl) {
+      fs.promises.unlink(this.diskPath(key)).catch(() => {});
+      return null;
+    }
+    const entry = { json: stored.json, etag: stored.etag, storedAt: stored.storedAt };
+    this.memorySet(key, entry);
+    return entry;
+  }
+
+  diskSet(key, entry) {
+    if (!this.dir) {
+      return;
+    }
+    const target = this.diskPath(key);
+    const temp = `${target}.${process.pid}.${crypto.randomBytes(4).toString('hex')}.tmp`;
+    // Written in the background; rename is atomic, so readers see the old or the new entry
+    fs.promises.mkdir(this.dir, { recursive: true })
+      .then(() => fs.promises.writeFile(temp, JSON.stringify({ key, ...entry })))
+      .then(() => fs.promises.rename(temp, target))
+      .catch((error) => {
+        logger.warn(`Could not write ${this.name} cache entry to disk: ${error.message}`);
+        fs.promises.unlink(temp).catch(() => {});
+      });
+  }
+
+  /**
+   * @returns {Object} - Memory tier usage, for diagnostics
+   */
+  stats() {
+    return {
+      entries: this.entries.size,
+      bytes: this.bytes,
+      refreshing: this.inflight.size
+    };
+  }
+}
+
+/**
+ * Cache key for a Spotify URL: the page kind and id, without tracking
+ * parameters such as ?si=, so every share link of a page hits one entry
+ * @param {string} url - Spotify URL
+ * @param {string} variant - Distinguishes responses with different options (optional)
+ * @returns {string|null} - The key, or null if the URL has no recognizable id
+ */
+const spotifyCacheKey = (url, variant) => {
+  const parsed = parseSpotifyUrl(url);
+  if (!parsed) {
+    return null;
+  }
+  return variant ? `${parsed.kind}:${parsed.id}:${variant}` : `${parsed.kind}:${parsed.id}`;
+};
+
+/**
+ * The Spotify URL a cached response is loaded with: the same page without
+ * tracking parameters, so the body (which echoes the URL) and its ETag don't
+ * depend on which share link happened to miss or refresh the entry
+ * @param {string} url - Spotify URL
+ * @returns {string} - The canonical URL, or url itself if it has no recognizable id
+ */
+const canonicalSpotifyUrl = (url) => {
+  const parsed = parseSpotifyUrl(url);
+  return parsed ? `https://open.spotify.com/${parsed.kind}/${parsed.id}` : url;
+};
+
+/**
+ * Sends a cached response, or 304 Not Modified when the client's If-None-Match has its ETag
+ * @param {Object} req - Express request
+ * @param {Object} res - Express response
+ * @param {Object} cached - Result of ResponseCache.fetch
+ */
+const sendCached = (req, res, cached) => {
+  res.set('ETag', cached.entry.etag);
+  res.set('X-Cache', cached.result.toUpperCase());
+  // req.fresh compares If-None-Match with the ETag set above
+  if (req.fresh) {
+    return res.status(304).end();
+  }
+  return res.status(200).type('application/json').send(cached.entry.json);
+};
+
+module.exports = {
+  ResponseCache,
+  spotifyCacheKey,
+  canonicalSpotifyUrl,
+  sendCached
+};
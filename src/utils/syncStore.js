@@ -0,0 +1,131 @@
+const fs = require('fs');
+const path = require('path');
+const { parseSpotifyUrl } = require('./validation');
+
+/**
+ * Last-synced track set of every mirrored playlist.
+ *
+ * One JSON file per playlist id holds the Spotify snapshot id, the output
+ * directory and profile the playlist was synced to, and for every track that
+ * was delivered its added_at and output file. A sync job diffs the freshly
+ * listed tracks against it, so only tracks that are new (or whose file has gone
+ * missing) go through resolve, download and transcode.
+ *
+ * The state is written once, when a sync job finishes; while it runs, the
+ * job's own journal (JobStore) carries the per-track progress across restarts.
+ */
+class SyncStore {
+  /**
+   * @param {string} dir - Directory holding the sync state files
+   */
+  constructor(dir) {
+    this.dir = dir;
+  }
+
+  statePath(playlistId) {
+    return path.join(this.dir, `${playlistId}.json`);
+  }
+
+  /**
+   * @param {string} playlistId - Spotify playlist id
+   * @returns {Promise<Object|null>} - The stored state, or null if the playlist was never synced
+   */
+  async load(playlistId) {
+    try {
+      return JSON.parse(await fs.promises.readFile(this.statePath(playlistId), 'utf8'));
+    } catch (error) {
+      if (error.code === 'ENOENT' || error instanceof SyntaxError) {
+        // Never synced, or a state file we can't read: sync everything again
+        return null;
+      }
+      throw error;
+    }
+  }
+
+  /**
+   * Replaces the stored state of a playlist
+   * @param {Object} state - { playlistId, snapshotId, outputPath, profile, syncedAt, tracks }
+   */
+  save(state) {
+    fs.mkdirSync(this.dir, { recursive: true });
+    const target = this.statePath(state.playlistId);
+    const temp = `${target}.${process.pid}.tmp`;
+    fs.writeFileSync(temp, JSON.stringify(state));
+    // rename is atomic, so a crash leaves either the old or the new state
+    fs.renameSync(temp, target);
+  }
+}
+
+/**
+ * Extracts the playlist id a sync is keyed on
+ * @param {string} url - Spotify playlist URL
+ * @returns {string|null} - The id, or null for anything but a playlist URL
+ */
+const playlistIdFromUrl = (url) => {
+  const parsed = parseSpotifyUrl(url);
+  return parsed && parsed.kind === 'playlist' ? parsed.id : null;
+};
+
+/**
+ * Whether a listed track was already delivered by the previous sync
+ * @param {Object} state - Previous sync state (or null)
+ * @param {Object} track - Track metadata from the playlist script
+ * @returns {Object|null} - The stored entry if the track can be skipped
+ */
+const unchangedEntry = (state, track) => {
+  const entry = state && track.id ? state.tracks[track.id] : null;
+  if (!entry || !entry.outputFile || !fs.existsSync(entry.outputFile)) {
+    return null;
+  }
+  return entry;
+};
+
+/**
+ * Builds the next sync state from a finished sync job
+ *
+ * Tracks that were delivered (now or by an earlier sync) are kept; failed
+ * tracks are left out so the next sync tries them again. Tracks of the
+ * previous state that are no longer listed are returned as removed.
+ * @param {Object} job - The finished sync job
+ * @param {Object} previous - Previous sync state (or null)
+ * @returns {Object} - { state, removed: [{ id, outputFile }] }
+ */
+const nextState = (job, previous) => {
+  const tracks = {};
+  const listed = new Set();
+  for (const record of job.tracks) {
+    if (!record || !record.track.id) {
+      continue;
+    }
+    listed.add(record.track.id);
+    if (record.state === 'trimmed' && record.outputFile && !tracks[record.track.id]) {
+      tracks[record.track.id] = { addedAt: record.track.added_at || '', outputFile: record.outputFile };
+    }
+  }
+
+  const removed = [];
+  for (const [id, entry] of Object.entries(previous ? previous.tracks : {})) {
+    if (!listed.has(id)) {
+      removed.push({ id, outputFile: entry.outputFile });
+    }
+  }
+
+  return {
+    state: {
+      playlistId: job.playlistId,
+      snapshotId: job.snapshotId || null,
+      outputPath: job.outputPath,
+      profile: job.profile,
+      syncedAt: Date.now(),
+      tracks
+    },
+    removed
+  };
+};
+
+module.exports = {
+  SyncStore,
+  playlistIdFromUrl,
+  unchangedEntry,
+  nextState
+};
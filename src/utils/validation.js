@@ -13,12 +13,12 @@ const validateSpotifyUrl = (url) => {
       return { isValid: false, error: 'URL must be a valid Spotify URL' };
     }
 
-    // Check if it's a track, playlist, or album URL
-    const validPaths = ['/track/', '/playlist/', '/album/', '/episode/', '/show/'];
+    // Check if it's a track, playlist, album, or artist URL
+    const validPaths = ['/track/', '/playlist/', '/album/', '/artist/', '/episode/', '/show/'];
     const isValidPath = validPaths.some(path => parsedUrl.pathname.includes(path));
     
     if (!isValidPath) {
-      return { isValid: false, error: 'URL must point to a track, playlist, album, episode, or show' };
+      return { isValid: false, error: 'URL must point to a track, playlist, album, artist, episode, or show' };
     }
 
     return { isValid: true };
@@ -27,6 +27,13 @@ const validateSpotifyUrl = (url) => {
   }
 };
 
+// Extract the page kind and id from a Spotify URL, ignoring query parameters
+// such as ?si= and locale prefixes such as /intl-de/
+const parseSpotifyUrl = (url) => {
+  const match = /\/(track|playlist|album|artist|episode|show)\/([A-Za-z0-9]+)/.exec(url || '');
+  return match ? { kind: match[1], id: match[2] } : null;
+};
+
 // Validate YouTube URL format
 const validateYouTubeUrl = (url) => {
   if (!url || typeof url !== 'string') {
@@ -74,9 +81,32 @@ const validatePath = (path) => {
   return { isValid: true };
 };
 
+// Output profiles youtube_downloader.py understands (see youtube/transcode_profiles.py)
+const TRANSCODE_PROFILES = ['mp3-128', 'mp3-320', 'aac-192', 'opus-128', 'copy'];
+
+// Validate a transcode profile name
+const validateTranscodeProfile = (profile) => {
+  if (!TRANSCODE_PROFILES.includes(profile)) {
+    return { isValid: false, error: `Transcode profile must be one of: ${TRANSCODE_PROFILES.join(', ')}` };
+  }
+  return { isValid: true };
+};
+
+// Validate a URL for sync mode, which keys its state on the playlist id
+const validateSyncUrl = (url) => {
+  const parsed = parseSpotifyUrl(url);
+  if (!parsed || parsed.kind !== 'playlist') {
+    return { isValid: false, error: 'Sync is only supported for Spotify playlist URLs' };
+  }
+  return { isValid: true };
+};
+
 module.exports = {
   validateSpotifyUrl,
+  parseSpotifyUrl,
   validateYouTubeUrl,
   validateSearchQuery,
-  validatePath
+  validatePath,
+  validateTranscodeProfile,
+  validateSyncUrl
 };
\ No newline at end of file
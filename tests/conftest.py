@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Puts common/ on sys.path for the scripts the tests import
+import toolchain  # noqa: E402,F401
@@ -0,0 +1,60 @@
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class RangeServer:
+    """Serves a body as /track.m4a, honoring single byte ranges unless told not to"""
+
+    def __init__(self, body):
+        self.body = body
+        self.ranges = []
+        self.clients = set()
+        self.accept_ranges = True
+        self.fail_once = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/mp4")
+                self.send_header("Content-Length", str(len(stub.body)))
+                self.end_headers()
+
+            def do_GET(self):
+                stub.clients.add(self.client_address)
+                match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+                if not match or not stub.accept_ranges:
+                    self.reply(200, stub.body)
+                    return
+                start = int(match.group(1))
+                end = int(match.group(2)) if match.group(2) else len(stub.body) - 1
+                stub.ranges.append((start, end))
+                if (start, end) in stub.fail_once:
+                    stub.fail_once.discard((start, end))
+                    self.reply(500, b"try again")
+                    return
+                self.reply(206, stub.body[start:end + 1], f"bytes {start}-{end}/{len(stub.body)}")
+
+            def reply(self, status, body, content_range=None):
+                self.send_response(status)
+                self.send_header("Content-Type", "audio/mp4")
+                self.send_header("Content-Length", str(len(body)))
+                if content_range:
+                    self.send_header("Content-Range", content_range)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/track.m4a"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "youtube"))
+
+from audio_library import AudioLibrary, object_key
+
+
+def write(path, size):
+    path.write_bytes(b"\0" * size)
+    return str(path)
+
+
+def test_file_larger_than_the_store_is_left_in_place(tmp_path):
+    library = AudioLibrary(root=str(tmp_path / "library"), max_bytes=10)
+    try:
+        source = write(tmp_path / "song.mp3", 100)
+        stored = library.store(object_key("vid", "mp3", []), source, spotify_id="sp1")
+
+        assert stored == source
+        assert library.deliver(stored, source) == source
+        assert os.path.getsize(source) == 100
+        assert library.lookup_track(spotify_id="sp1") is None
+    finally:
+        library.close()
+
+
+def test_lookup_video_ignores_segments_but_not_settings(tmp_path):
+    library = AudioLibrary(root=str(tmp_path / "library"))
+    try:
+        key = object_key("vid", "mp3", [[0, 8]])
+        stored = library.store(key, write(tmp_path / "song.mp3", 100), video_id="vid", encode_settings="mp3")
+
+        assert library.lookup_video("vid", "mp3") == (stored, key)
+        assert library.lookup_video("vid", "opus") is None
+        assert library.lookup_video("other", "mp3") is None
+    finally:
+        library.close()
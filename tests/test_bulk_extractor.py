@@ -0,0 +1,145 @@
+import os
+import sys
+import json
+import time
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "spotify"))
+
+import bulk_extractor
+from metadata_service import MetadataService, spotify_url
+
+
+def track(track_id, name, isrc=None):
+    return {"id": track_id, "name": name, "artists": [{"name": "Artist"}], "duration_ms": 200000,
+            "external_ids": {"isrc": isrc} if isrc else {}}
+
+
+# What SpotifyClient.get_artist_info (spotifyscraper 2.x) returns for an
+# artist page; taken from the library's own artist extractor fixture
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "spotify_artist.json"),
+          "r", encoding="utf-8") as f:
+    ARTIST = json.load(f)
+
+SOUNDTRACK, OPERA = "6i6folBtxKV28WX3msQ4FE", "1GbtB4zTqAsyfZEsm1RZfx"
+
+ALBUMS = {
+    SOUNDTRACK: {"id": SOUNDTRACK, "name": "Bohemian Rhapsody (The Original Soundtrack)",
+                 "tracks": {"items": [track("t1", "Bohemian Rhapsody", "ISRC1"), track("t2", "Somebody To Love")]}},
+    # The remaster's track is the soundtrack recording under another id
+    OPERA: {"id": OPERA, "name": "A Night At The Opera (2011 Remaster)",
+            "tracks": [track("t9", "Bohemian Rhapsody", "ISRC1"), track("t3", "Love Of My Life")]},
+}
+
+
+class FakePool:
+    size = 4
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.calls = []
+
+    def call(self, method, url):
+        with self.lock:
+            self.calls.append(url)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        album_id = url.rsplit("/", 1)[-1]
+        if album_id not in ALBUMS:
+            raise RuntimeError(f"no album {album_id}")
+        return ALBUMS[album_id]
+
+    def close(self):
+        pass
+
+
+def collect(kind, data, service, discography):
+    seen = set() if kind == "artist" else None
+    pages = list(bulk_extractor.iter_pages(kind, data, "url", service.iter_many, discography))
+    return pages, [t for page in pages for t in bulk_extractor.page_tracks(page, seen=seen)]
+
+
+def test_release_urls_reads_popular_releases():
+    assert bulk_extractor.release_urls(ARTIST) == [spotify_url("album", SOUNDTRACK), spotify_url("album", OPERA)]
+
+
+def test_discography_fetches_album_pages_concurrently_and_dedupes():
+    pool = FakePool()
+    service = MetadataService(pool=pool)
+    try:
+        pages, tracks = collect("artist", ARTIST, service, discography=True)
+    finally:
+        service.close()
+
+    assert len(pool.calls) == 2
+    assert pool.peak > 1
+    assert [t.id for t in tracks] == ["t1", "t2", "t3"]
+    assert [t.album for t in tracks] == [ALBUMS[SOUNDTRACK]["name"]] * 2 + [ALBUMS[OPERA]["name"]]
+    assert not [page for page in pages if page.error]
+
+
+def test_artist_without_discography_lists_top_tracks():
+    pool = FakePool()
+    service = MetadataService(pool=pool)
+    try:
+        _, tracks = collect("artist", ARTIST, service, discography=False)
+    finally:
+        service.close()
+
+    assert pool.calls == []
+    assert [(t.id, t.album) for t in tracks] == [
+        ("4u7EnebtmKWzUH433cf5Qv", "A Night At The Opera (2011 Remaster)"),
+        ("7tFiyTwD0nx5a1eklYtX2J", "Bohemian Rhapsody (The Original Soundtrack)"),
+    ]
+
+
+def test_failed_release_is_reported_not_fatal():
+    pool = FakePool()
+    service = MetadataService(pool=pool)
+    artist = {**ARTIST, "popular_releases": ARTIST["popular_releases"] + [{"uri": "spotify:album:gone"}]}
+    try:
+        pages, tracks = collect("artist", artist, service, discography=True)
+    finally:
+        service.close()
+
+    assert [t.id for t in tracks] == ["t1", "t2", "t3"]
+    assert [page.url for page in pages if page.error] == [spotify_url("album", "gone")]
+
+
+def test_discography_without_releases_is_an_error():
+    artist = {key: value for key, value in ARTIST.items() if key != "popular_releases"}
+
+    with pytest.raises(ValueError, match="no releases"):
+        list(bulk_extractor.iter_pages("artist", artist, "url", None, discography=True))
+
+
+def test_album_header_uses_album_fields():
+    header = bulk_extractor.collection_header(
+        "album", {"id": "a1", "name": "First", "artists": [{"name": "A"}, {"name": "B"}], "total_tracks": 2},
+        "https://open.spotify.com/album/a1")
+
+    assert header["kind"] == "album"
+    assert header["owner"] == "A, B"
+    assert header["track_count"] == 2
+
+
+def test_fresh_fetch_skips_the_cached_page():
+    pool = FakePool()
+    service = MetadataService(pool=pool)
+    url = spotify_url("album", OPERA)
+    try:
+        service.fetch("album", url)
+        service.fetch("album", url)
+        assert len(pool.calls) == 1
+        service.fetch("album", url, fresh=True)
+    finally:
+        service.close()
+
+    assert len(pool.calls) == 2
@@ -0,0 +1,98 @@
+import os
+import sys
+import shutil
+import subprocess
+
+import pytest
+import yt_dlp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "youtube"))
+
+import youtube_downloader
+from range_server import RangeServer
+
+pytestmark = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not on PATH")
+
+# Process and directory-scan audit events that must not appear per track
+# beyond the single ffmpeg encode
+WATCHED_EVENTS = ("subprocess.Popen", "os.system", "os.posix_spawn", "os.listdir", "os.scandir")
+_events = None
+
+
+def _audit(event, args):
+    if _events is not None and event in WATCHED_EVENTS:
+        _events.append((event, args[0] if args else None))
+
+
+sys.addaudithook(_audit)
+
+
+@pytest.fixture(scope="module")
+def warm():
+    # Plugin discovery and lazy extractor imports happen once per process, not per track
+    youtube_downloader.video_id_from_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+    yt_dlp.YoutubeDL({"quiet": True}).close()
+
+
+@pytest.fixture
+def record_events(warm):
+    global _events
+    _events = []
+    yield _events
+    _events = None
+
+
+@pytest.fixture(scope="module")
+def audio(tmp_path_factory):
+    path = tmp_path_factory.mktemp("audio") / "tone.m4a"
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=440:duration=4",
+                    "-c:a", "aac", str(path)], check=True)
+    return path.read_bytes()
+
+
+@pytest.fixture
+def server(audio):
+    stub = RangeServer(audio)
+    yield stub
+    stub.close()
+
+
+def spawned(events):
+    return [os.path.basename(str(target[0] if isinstance(target, (list, tuple)) else target))
+            for event, target in events if event != "os.listdir" and event != "os.scandir"]
+
+
+def test_single_pass_download_spawns_only_ffmpeg(server, tmp_path, monkeypatch, record_events):
+    monkeypatch.setattr(youtube_downloader, "fetch_segment_times", lambda video_id: [(1.0, 2.0)])
+
+    ok, output = youtube_downloader.download_youtube_audio_single_pass(server.url, str(tmp_path / "song"))
+
+    assert ok, output
+    assert output == str(tmp_path / "song.mp3")
+    assert os.path.getsize(output) > 0
+    assert not os.path.exists(tmp_path / "song.m4a")
+    assert spawned(record_events) == ["ffmpeg"]
+    assert not [event for event, _ in record_events if event in ("os.listdir", "os.scandir")]
+
+
+def test_parallel_engine_download_spawns_only_ffmpeg(server, tmp_path, monkeypatch, record_events):
+    monkeypatch.setattr(youtube_downloader, "fetch_segment_times", lambda video_id: [])
+
+    ok, output = youtube_downloader.download_youtube_audio_single_pass(
+        server.url, str(tmp_path / "song"), transfer=youtube_downloader.transfer_options("parallel", 2))
+
+    assert ok, output
+    assert spawned(record_events) == ["ffmpeg"]
+    assert not [event for event, _ in record_events if event in ("os.listdir", "os.scandir")]
+
+
+def test_transcode_stage_trims_without_ffprobe(server, tmp_path, record_events):
+    container = tmp_path / "song.m4a"
+    container.write_bytes(server.body)
+
+    # The last segment reaches the known end, so the tail needs no range at all
+    result, exit_code = youtube_downloader.run_stage(
+        "transcode", [str(container), str(tmp_path / "song.mp3"), "[[0, 1], [3, 4]]", "--duration", "4"])
+
+    assert exit_code == 0 and result["success"], result
+    assert spawned(record_events) == ["ffmpeg"]
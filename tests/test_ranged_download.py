@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "youtube"))
+
+import ranged_download
+from youtube_downloader import download_audio_container, transfer_options
+from range_server import RangeServer
+
+AUDIO = os.urandom(3 * 1024 * 1024 + 123)
+
+
+@pytest.fixture
+def server():
+    stub = RangeServer(AUDIO)
+    yield stub
+    stub.close()
+
+
+def test_parallel_download_reassembles_file(server, tmp_path):
+    dest = str(tmp_path / "track.m4a")
+    written = ranged_download.download(server.url, dest, connections=4, chunk_size=256 * 1024)
+
+    assert written == len(AUDIO)
+    with open(dest, "rb") as f:
+        assert f.read() == AUDIO
+    # 13 chunks plus the probe, spread over several keep-alive connections
+    assert len(server.ranges) == 14
+    assert 1 < len(server.clients) <= 5
+    assert not os.path.exists(dest + ".part")
+
+
+def test_falls_back_to_single_stream_without_ranges(server, tmp_path):
+    server.accept_ranges = False
+    dest = str(tmp_path / "track.m4a")
+
+    assert ranged_download.download(server.url, dest, connections=4) == len(AUDIO)
+    with open(dest, "rb") as f:
+        assert f.read() == AUDIO
+
+
+def test_failed_range_is_retried(server, tmp_path):
+    chunk = 1024 * 1024
+    server.fail_once.add((chunk, 2 * chunk - 1))
+    dest = str(tmp_path / "track.m4a")
+    start = time.monotonic()
+
+    ranged_download.download(server.url, dest, connections=2, chunk_size=chunk)
+
+    assert server.ranges.count((chunk, 2 * chunk - 1)) == 2
+    # The retry waits out the backoff instead of hitting the server again at once
+    assert time.monotonic() - start >= ranged_download.RETRY_BACKOFF
+    with open(dest, "rb") as f:
+        assert f.read() == AUDIO
+
+
+def test_rate_limit_is_shared_across_connections(server, tmp_path):
+    dest = str(tmp_path / "track.m4a")
+    rate = 4 * 1024 * 1024
+    start = time.monotonic()
+    ranged_download.download(server.url, dest, connections=4, chunk_size=256 * 1024, rate_limit=rate)
+    elapsed = time.monotonic() - start
+
+    # A quarter second of burst is allowed on top of the steady rate
+    assert elapsed >= len(AUDIO) / rate - 0.3
+
+
+def test_download_stage_uses_parallel_engine(server, tmp_path):
+    ok, info = download_audio_container(server.url, str(tmp_path / "song"),
+                                        transfer=transfer_options("parallel", 3))
+
+    assert ok, info
+    assert info["container"] == str(tmp_path / "song.m4a")
+    with open(info["container"], "rb") as f:
+        assert f.read() == AUDIO
+    assert len(server.ranges) > 2
@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import asyncio
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "youtube"))
+
+from sponsorblock import SponsorBlockClient, SegmentCache, CircuitBreaker, hash_prefix
+
+SEGMENTS = {
+    "dQw4w9WgXcQ": [
+        {"category": "sponsor", "segment": [10.0, 20.0]},
+        {"category": "selfpromo", "segment": [30.0, 35.0]},
+    ],
+    "jNQXAC9IVRw": [
+        {"category": "intro", "segment": [0.0, 4.5]},
+    ],
+}
+
+
+class StubServer:
+    """Minimal stand-in for the SponsorBlock hash-prefix endpoint"""
+
+    def __init__(self):
+        self.requests = []
+        self.status = None
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = urllib.parse.urlsplit(self.path).path
+                stub.requests.append(path)
+                prefix = path.rsplit("/", 1)[-1]
+                entries = [
+                    {"videoID": video_id, "hash": "x", "segments": segments}
+                    for video_id, segments in SEGMENTS.items()
+                    if hash_prefix(video_id) == prefix
+                ]
+                status = stub.status or (200 if entries else 404)
+                body = json.dumps(entries).encode() if status == 200 else b"Not Found"
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def client(stub, tmp_path):
+    sb = SponsorBlockClient(base_url=stub.url, cache=SegmentCache(str(tmp_path / "sb.sqlite3")), timeout=2)
+    yield sb
+    sb.close()
+
+
+def test_filters_categories_and_uses_hash_prefix(client, stub):
+    segments = client.get_segments("dQw4w9WgXcQ")
+    assert [s["category"] for s in segments] == ["sponsor"]
+    assert stub.requests == [f"/api/skipSegments/{hash_prefix('dQw4w9WgXcQ')}"]
+
+
+def test_caches_positive_and_negative_results(client, stub):
+    first = client.get_many(["dQw4w9WgXcQ", "no-segments"])
+    second = client.get_many(["dQw4w9WgXcQ", "no-segments"])
+    assert first == second
+    assert first["no-segments"] == []
+    assert len(stub.requests) == 2
+
+
+def test_async_lookup_batches_by_prefix(client, stub):
+    ids = ["dQw4w9WgXcQ", "jNQXAC9IVRw", "dQw4w9WgXcQ"]
+    result = asyncio.run(client.get_many_async(ids))
+    assert result["jNQXAC9IVRw"][0]["segment"] == [0.0, 4.5]
+    assert len(stub.requests) == len({hash_prefix(v) for v in ids})
+
+
+def test_breaker_opens_and_failures_are_not_cached(stub, tmp_path):
+    stub.status = 500
+    sb = SponsorBlockClient(base_url=stub.url, cache=SegmentCache(str(tmp_path / "sb.sqlite3")),
+                            breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    try:
+        assert sb.get_segments("a") == []
+        assert sb.get_segments("b") == []
+        assert sb.breaker.is_open
+        assert sb.get_segments("c") == []
+        assert len(stub.requests) == 2
+        assert sb.cache.get("a") is None
+    finally:
+        sb.close()
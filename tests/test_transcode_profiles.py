@@ -0,0 +1,107 @@
+import os
+import sys
+import shutil
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "youtube"))
+
+import youtube_downloader
+import transcode_profiles
+from audio_library import AudioLibrary
+
+pytestmark = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg not on PATH")
+
+
+@pytest.fixture(scope="module")
+def source(tmp_path_factory):
+    path = tmp_path_factory.mktemp("source") / "tone.m4a"
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=440:duration=3",
+                    "-c:a", "aac", str(path)], check=True)
+    return path
+
+
+@pytest.fixture
+def container(source, tmp_path):
+    path = tmp_path / "song.m4a"
+    shutil.copyfile(source, path)
+    return path
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    recorded = []
+    run = subprocess.run
+
+    def record(cmd, *args, **kwargs):
+        recorded.append(cmd)
+        return run(cmd, *args, **kwargs)
+
+    monkeypatch.setattr(youtube_downloader.subprocess, "run", record)
+    return recorded
+
+
+def codec_args(cmd):
+    return cmd[cmd.index("-c:a"):cmd.index("-c:a") + 2]
+
+
+def test_default_profile_encodes_mp3(container, tmp_path, commands):
+    ok, output = youtube_downloader.transcode_audio(str(container), str(tmp_path / "song.mp3"), [])
+
+    assert ok, output
+    assert output == str(tmp_path / "song.mp3")
+    assert codec_args(commands[0]) == ["-c:a", "libmp3lame"]
+    assert not container.exists()
+
+
+def test_copy_profile_remuxes_without_reencoding(container, tmp_path, commands):
+    ok, output = youtube_downloader.transcode_audio(str(container), str(tmp_path / "song.mp3"), [], profile="copy")
+
+    assert ok, output
+    # Same name as the container: the remux replaces it in place
+    assert output == str(container)
+    assert os.path.getsize(output) > 0
+    assert codec_args(commands[0]) == ["-c:a", "copy"]
+    assert not os.path.exists(output + ".part.m4a")
+
+
+def test_copy_profile_reencodes_same_codec_when_trimming(container, tmp_path, commands):
+    ok, output = youtube_downloader.transcode_audio(str(container), str(tmp_path / "song.mp3"), [[0, 1]],
+                                                    duration=3, profile="copy")
+
+    assert ok, output
+    assert output == str(tmp_path / "song.m4a")
+    assert codec_args(commands[0]) == ["-c:a", "aac"]
+
+
+def test_opus_profile_changes_extension(container, tmp_path):
+    ok, output = youtube_downloader.transcode_audio(str(container), str(tmp_path / "song.mp3"), [],
+                                                    profile="opus-128")
+
+    assert ok, output
+    assert output == str(tmp_path / "song.opus")
+    assert not container.exists()
+
+
+def test_unknown_profile_is_rejected():
+    result, exit_code = youtube_downloader.main(["--transcode-profile", "flac", "--stage", "lookup", "x"])
+
+    assert exit_code == 1
+    assert "Unknown transcode profile" in result["error"]
+
+
+def test_library_keeps_profiles_apart(container, tmp_path):
+    library = AudioLibrary(root=str(tmp_path / "library"))
+    try:
+        ok, output = youtube_downloader.transcode_audio(str(container), str(tmp_path / "song.mp3"), [],
+                                                        profile="aac-192")
+        youtube_downloader.store_in_library(library, output, "vid", [], spotify_id="sp1", profile="aac-192")
+
+        out_dir = tmp_path / "out"
+        assert youtube_downloader.lookup_library_track(library, str(out_dir / "song.mp3"), spotify_id="sp1") is None
+        delivered = youtube_downloader.lookup_library_track(library, str(out_dir / "song.mp3"), spotify_id="sp1",
+                                                            profile="aac-192")
+        assert delivered == str(out_dir / "song.m4a")
+    finally:
+        library.close()
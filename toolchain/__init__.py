@@ -0,0 +1,48 @@
+"""
+Entry points of the Python toolchain.
+
+The scripts stay at their paths under spotify/ and youtube/, where the
+Node services and the tests address them; this package names them and
+loads them as modules, for the dispatcher CLI (python -m toolchain) and
+the warm worker pool. Importing it puts common/ on sys.path, where the
+scripts find the modules they share (timings, lazy_import).
+"""
+import os
+import sys
+import importlib.util
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMMON_DIR = os.path.join(ROOT_DIR, 'common')
+if COMMON_DIR not in sys.path:
+    sys.path.insert(0, COMMON_DIR)
+
+SCRIPTS = {
+    'spotify_metadata': os.path.join('spotify', 'spotify_metadata.py'),
+    'spotify_playlist': os.path.join('spotify', 'spotify_playlist.py'),
+    'fetch_youtube_url': os.path.join('spotify', 'fetch_youtube_url.py'),
+    'youtube_downloader': os.path.join('youtube', 'youtube_downloader.py'),
+}
+
+
+def load_script(name):
+    """
+    Import one of the entry point scripts as a module
+
+    Unlike `python script.py`, which compiles the script on every run, this
+    goes through the import system and reuses the script's cached bytecode.
+
+    Args:
+        name (str): Script name without the .py extension
+
+    Returns:
+        module: The imported script module
+    """
+    script_path = os.path.join(ROOT_DIR, SCRIPTS[name])
+    script_dir = os.path.dirname(script_path)
+    # Mirror `python script.py`, which puts the script directory on sys.path
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    spec = importlib.util.spec_from_file_location(name, script_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,12 @@
+"""python -m toolchain <script> [args...]; see toolchain/cli.py"""
+import os
+import sys
+
+if not __package__:
+    # Run as `python toolchain` (how the Node services spawn it): the directory
+    # itself is on sys.path, but the package is imported from the project root
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from toolchain.cli import main
+
+sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,62 @@
+"""
+Dispatcher CLI for the Python entry points.
+
+Usage:
+    python -m toolchain <script> [args...]
+    python -m toolchain precompile
+
+Runs one of the scripts in SCRIPTS exactly like `python <script path>`
+would: same arguments, same JSON on stdout, same exit code. Only the
+named script is imported, and through the import system, so its bytecode
+is cached between runs instead of being compiled on every spawn.
+
+precompile writes the bytecode of every toolchain module ahead of time,
+for installs where the first run can't write __pycache__ (read-only
+images) or shouldn't pay for compiling.
+"""
+import os
+import sys
+
+from toolchain import ROOT_DIR, SCRIPTS, load_script
+
+# Directories holding toolchain modules
+SOURCE_DIRS = ('common', 'spotify', 'youtube', 'toolchain', 'workers')
+
+
+def precompile():
+    import compileall
+    ok = True
+    for name in SOURCE_DIRS:
+        ok = compileall.compile_dir(os.path.join(ROOT_DIR, name), quiet=1) and ok
+    return 0 if ok else 1
+
+
+def run(name, argv):
+    import json
+    module = load_script(name)
+    result, exit_code = module.main(argv)
+    if result is not None:
+        print(json.dumps(result))
+    return exit_code
+
+
+def main(argv):
+    """
+    Args:
+        argv (list): Command line arguments (without the program name)
+
+    Returns:
+        int: Process exit code
+    """
+    if not argv or argv[0] in ('-h', '--help'):
+        print(__doc__.strip())
+        print('\nScripts: ' + ', '.join(SCRIPTS))
+        return 0 if argv else 1
+    command, args = argv[0], argv[1:]
+    if command == 'precompile':
+        return precompile()
+    if command not in SCRIPTS:
+        import json
+        print(json.dumps({'success': False, 'error': f"Unknown script: {command} (expected one of {', '.join(SCRIPTS)})"}))
+        return 1
+    return run(command, args)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Long-lived Python worker that serves script invocations over newline-delimited JSON.
+
+Each request is a single JSON line:
+    {"id": 1, "op": "run", "script": "spotify_metadata", "args": ["https://open.spotify.com/track/..."]}
+    {"id": 2, "op": "ping"}
+
+A run request may carry a "stdin" string that the script reads as its stdin.
+With "stream": true, every line the script prints is forwarded as it is
+written, before the final response:
+    {"id": 3, "line": "{\"type\": \"track\", ...}"}
+
+Each response is a single JSON line carrying the same id:
+    {"id": 1, "ok": true, "result": {...}, "exit_code": 0}
+    {"id": 2, "ok": true, "pong": true, "served": 1}
+
+The scripts are imported once at startup and their clients (SpotifyClient,
+YoutubeDL) are kept warm between requests. Requests are read from stdin by
+default, or from a Unix socket when --socket is given.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+from toolchain import SCRIPTS, load_script
+
+
+class LineForwarder(io.TextIOBase):
+    """
+    File-like stdout replacement that forwards each complete line to a callback
+    """
+
+    def __init__(self, on_line):
+        self.on_line = on_line
+        self.buffer = ''
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.buffer += text
+        while '\n' in self.buffer:
+            line, self.buffer = self.buffer.split('\n', 1)
+            if line:
+                self.on_line(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def close_line(self):
+        if self.buffer:
+            self.on_line(self.buffer)
+            self.buffer = ''
+
+
+class Worker:
+    def __init__(self, scripts, max_requests=0):
+        self.modules = {}
+        self.contexts = {}
+        self.max_requests = max_requests
+        self.served = 0
+        self.started_at = time.time()
+
+        for name in scripts:
+            try:
+                self.modules[name] = load_script(name)
+            except Exception as e:
+                # A missing dependency only disables the scripts that need it
+                print(f"Failed to preload {name}: {str(e)}", file=sys.stderr)
+
+    def context_for(self, name):
+        """Create the warm client context for a script on first use"""
+        if name not in self.contexts:
+            factory = getattr(self.modules[name], 'create_worker_context', None)
+            self.contexts[name] = factory() if factory else {}
+        return self.contexts[name]
+
+    def reset_context(self, name):
+        """Drop a script's warm clients so the next request rebuilds them"""
+        context = self.contexts.pop(name, None) or {}
+        for value in context.values():
+            close = getattr(value, 'close', None)
+            if close:
+                try:
+                    close()
+                except Exception:
+                    pass
+
+    @property
+    def exhausted(self):
+        return self.max_requests > 0 and self.served >= self.max_requests
+
+    def handle(self, request, send=None):
+        """
+        Handle one decoded request
+
+        Args:
+            request (dict): The request object
+            send (callable): Writes an intermediate protocol message (streamed lines)
+
+        Returns:
+            dict: The response object
+        """
+        request_id = request.get('id')
+        op = request.get('op', 'run')
+
+        if op == 'ping':
+            return {
+                'id': request_id,
+                'ok': True,
+                'pong': True,
+                'pid': os.getpid(),
+                'served': self.served,
+                'uptime': time.time() - self.started_at,
+                'scripts': sorted(self.modules)
+            }
+
+        if op != 'run':
+            return {'id': request_id, 'ok': False, 'error': f'Unknown op: {op}'}
+
+        name = request.get('script')
+        if name not in self.modules:
+            return {'id': request_id, 'ok': False, 'error': f'Script not available in worker: {name}'}
+
+        self.served += 1
+        real_stdin, real_stdout = sys.stdin, sys.stdout
+        sys.stdin = io.StringIO(request.get('stdin') or '')
+        forwarder = None
+        if request.get('stream') and send:
+            forwarder = LineForwarder(lambda line: send({'id': request_id, 'line': line}))
+            sys.stdout = forwarder
+        try:
+            result, exit_code = self.modules[name].main(request.get('args', []), **self.context_for(name))
+            response = {'id': request_id, 'ok': True, 'result': result, 'exit_code': exit_code}
+        except Exception as e:
+            # The warm clients may be in a bad state after an unexpected error
+            self.reset_context(name)
+            traceback.print_exc(file=sys.stderr)
+            response = {'id': request_id, 'ok': False, 'error': str(e)}
+        finally:
+            if forwarder:
+                forwarder.close_line()
+            sys.stdin, sys.stdout = real_stdin, real_stdout
+
+        if self.exhausted:
+            response['recycle'] = True
+        return response
+
+    def handle_line(self, line, send=None):
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return {'id': None, 'ok': False, 'error': f'Invalid request: {str(e)}'}
+        return self.handle(request, send)
+
+    def close(self):
+        for name in list(self.contexts):
+            self.reset_context(name)
+
+
+def serve_stdio(worker):
+    # Keep a private handle on the real stdout for protocol messages and point
+    # fd 1 at stderr, so prints from yt-dlp or ffmpeg can't corrupt the stream
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), 'w', buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    def send(message):
+        protocol.write(json.dumps(message) + '\n')
+
+    send({'id': None, 'ok': True, 'ready': True, 'pid': os.getpid()})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        response = worker.handle_line(line, send)
+        send(response)
+        if response.get('recycle'):
+            break
+
+
+def serve_socket(worker, socket_path):
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def send(self, message):
+            self.wfile.write((json.dumps(message) + '\n').encode('utf-8'))
+
+        def handle(self):
+            for raw in self.rfile:
+                line = raw.decode('utf-8').strip()
+                if not line:
+                    continue
+                response = worker.handle_line(line, self.send)
+                self.send(response)
+                if response.get('recycle'):
+                    self.server.recycle = True
+                    return
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    # Same fd redirection as stdio mode so stray prints end up in stderr
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    with socketserver.UnixStreamServer(socket_path, Handler) as server:
+        server.recycle = False
+        while not server.recycle:
+            server.handle_request()
+    os.remove(socket_path)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Warm Python worker for the Spotify Downloader backend')
+    parser.add_argument('--socket', help='Serve on this Unix socket path instead of stdin/stdout')
+    parser.add_argument('--max-requests', type=int, default=0,
+                        help='Exit after serving this many requests (0 = never)')
+    parser.add_argument('--scripts', default=','.join(SCRIPTS),
+                        help='Comma-separated list of scripts to preload')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    options = parse_args(sys.argv[1:])
+    scripts = [name for name in options.scripts.split(',') if name in SCRIPTS]
+    worker = Worker(scripts, max_requests=options.max_requests)
+    try:
+        if options.socket:
+            serve_socket(worker, options.socket)
+        else:
+            serve_stdio(worker)
+    finally:
+        worker.close()
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import errno
+import shutil
+import sqlite3
+import hashlib
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_LIBRARY_DIR = os.path.join(ROOT_DIR, "library")
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024 * 1024  # 5 GiB
+
+
+def segments_hash(segments):
+    """Stable hash of a list of [start, end] SponsorBlock segments"""
+    normalized = sorted([round(float(s), 2), round(float(e), 2)] for s, e in (segments or []))
+    return hashlib.sha256(json.dumps(normalized).encode("utf-8")).hexdigest()
+
+
+def object_key(video_id, encode_settings, segments):
+    """
+    Content address for a processed track
+
+    Args:
+        video_id (str): YouTube video id
+        encode_settings (str): Identifier of the codec/bitrate/sample rate used
+        segments (list): SponsorBlock [start, end] pairs that were removed
+
+    Returns:
+        str: Hex digest identifying the output file
+    """
+    material = f"{video_id}|{encode_settings}|{segments_hash(segments)}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def track_keys(spotify_id=None, isrc=None, variant=None):
+    # variant separates copies of one track made with different output profiles
+    suffix = f"@{variant}" if variant else ""
+    keys = []
+    if spotify_id:
+        keys.append(f"spotify:{spotify_id}{suffix}")
+    if isrc:
+        keys.append(f"isrc:{isrc.strip().upper()}{suffix}")
+    return keys
+
+
+class AudioLibrary:
+    """
+    Content-addressed store of finished audio files with an LRU size cap
+
+    Objects live under <root>/objects/<key[:2]>/<key><ext>. A SQLite index maps
+    object keys to files and Spotify track ids / ISRCs to object keys, so a
+    repeat request is answered by hardlinking the stored file to the requested
+    output path without touching the network or ffmpeg.
+    """
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = root or os.environ.get("AUDIO_LIBRARY_DIR") or DEFAULT_LIBRARY_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.environ.get("AUDIO_LIBRARY_MAX_BYTES") or DEFAULT_MAX_BYTES)
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(self.root, "index.sqlite3"), timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS objects ("
+            " key TEXT PRIMARY KEY,"
+            " path TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " video_id TEXT,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tracks ("
+            " track_key TEXT PRIMARY KEY,"
+            " object_key TEXT NOT NULL)"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(objects)")}
+        if "settings" not in columns:
+            # Libraries created before video lookups existed
+            self.conn.execute("ALTER TABLE objects ADD COLUMN settings TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS objects_last_access ON objects (last_access)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS objects_video ON objects (video_id, settings)")
+        self.conn.commit()
+
+    def lookup(self, key):
+        """Return the stored path for an object key and mark it recently used, or None"""
+        row = self.conn.execute("SELECT path FROM objects WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        if not os.path.exists(row[0]):
+            # The file was removed behind our back; forget it
+            self.remove(key)
+            return None
+        self.conn.execute("UPDATE objects SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        return row[0]
+
+    def lookup_video(self, video_id, encode_settings):
+        """
+        Find the newest stored object for a video encoded with the given settings
+
+        Unlike lookup(), this doesn't need the SponsorBlock segments, so it can
+        run before they are known.
+
+        Returns:
+            tuple: (stored path, object key), or None
+        """
+        rows = self.conn.execute(
+            "SELECT key FROM objects WHERE video_id = ? AND settings = ? ORDER BY created_at DESC",
+            (video_id, encode_settings)
+        ).fetchall()
+        for (key,) in rows:
+            path = self.lookup(key)
+            if path:
+                return path, key
+        return None
+
+    def lookup_track(self, spotify_id=None, isrc=None, variant=None):
+        """Return the stored path for a Spotify track id or ISRC, or None"""
+        for track_key in track_keys(spotify_id, isrc, variant):
+            row = self.conn.execute("SELECT object_key FROM tracks WHERE track_key = ?", (track_key,)).fetchone()
+            if row:
+                path = self.lookup(row[0])
+                if path:
+                    return path
+        return None
+
+    def store(self, key, source_path, video_id=None, spotify_id=None, isrc=None, variant=None, encode_settings=None):
+        """
+        Move a finished file into the store and index it
+
+        A file larger than the whole store is left where it is and not indexed.
+
+        Returns:
+            str: Path of the stored object, or source_path if it was not stored
+        """
+        if os.path.getsize(source_path) > self.max_bytes:
+            return source_path
+        ext = os.path.splitext(source_path)[1]
+        path = os.path.join(self.root, "objects", key[:2], key + ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(source_path, path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(source_path, path)
+
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO objects (key, path, size, video_id, settings, created_at, last_access)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, path, os.path.getsize(path), video_id, encode_settings, now, now)
+        )
+        self.link_track(key, spotify_id, isrc, variant, commit=False)
+        self.conn.commit()
+        self.evict(keep=key)
+        return path
+
+    def link_track(self, key, spotify_id=None, isrc=None, variant=None, commit=True):
+        for track_key in track_keys(spotify_id, isrc, variant):
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tracks (track_key, object_key) VALUES (?, ?)",
+                (track_key, key)
+            )
+        if commit:
+            self.conn.commit()
+
+    def deliver(self, stored_path, output_path):
+        """
+        Make a stored object available at output_path without copying when possible
+
+        Hardlinks share the data blocks, so delivery costs one metadata update.
+        Falls back to a copy when the output is on a different filesystem.
+        """
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        if os.path.exists(output_path):
+            if os.path.samefile(stored_path, output_path):
+                return output_path
+            os.remove(output_path)
+        try:
+            os.link(stored_path, output_path)
+        except OSError:
+            shutil.copyfile(stored_path, output_path)
+        return output_path
+
+    def total_bytes(self):
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def remove(self, key):
+        row = self.conn.execute("SELECT path FROM objects WHERE key = ?", (key,)).fetchone()
+        if row:
+            try:
+                os.remove(row[0])
+            except OSError:
+                pass
+        self.conn.execute("DELETE FROM objects WHERE key = ?", (key,))
+        self.conn.execute("DELETE FROM tracks WHERE object_key = ?", (key,))
+        self.conn.commit()
+
+    def evict(self, keep=None):
+        """
+        Drop least recently used objects until the store fits under max_bytes
+
+        Args:
+            keep (str): Object key that is never dropped, such as the one just stored
+        """
+        evicted = 0
+        total = self.total_bytes()
+        while total > self.max_bytes:
+            row = self.conn.execute(
+                "SELECT key, size FROM objects WHERE key != ? ORDER BY last_access ASC LIMIT 1",
+                (keep or "",)
+            ).fetchone()
+            if not row:
+                break
+            self.remove(row[0])
+            total -= row[1]
+            evicted += 1
+        return evicted
+
+    def close(self):
+        self.conn.close()
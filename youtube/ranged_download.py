@@ -0,0 +1,275 @@
+import os
+import time
+import queue
+import threading
+import http.client
+import urllib.parse
+
+DEFAULT_CONNECTIONS = 4
+# Small enough that a throttled or dropped range costs little to retry
+DEFAULT_CHUNK_SIZE = 1 << 20
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_RETRIES = 3
+# Seconds before the first retry of a chunk, doubled for every further attempt,
+# so a CDN throttling with 429/5xx gets time to recover
+RETRY_BACKOFF = 0.5
+MAX_REDIRECTS = 5
+READ_SIZE = 64 * 1024
+
+# yt-dlp protocols served as one plain file that accepts Range requests
+RANGED_PROTOCOLS = ("http", "https")
+
+
+class DownloadError(Exception):
+    pass
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every connection of one download
+
+    Args:
+        rate (int): Bytes per second; 0 or None means unlimited
+    """
+
+    def __init__(self, rate):
+        self.rate = rate or 0
+        self.lock = threading.Lock()
+        self.allowance = 0.0
+        self.updated = time.monotonic()
+
+    def consume(self, nbytes):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            # Allow at most a quarter second of burst
+            self.allowance = min(self.rate / 4, self.allowance + (now - self.updated) * self.rate)
+            self.updated = now
+            self.allowance -= nbytes
+            wait = -self.allowance / self.rate if self.allowance < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class Connection:
+    """
+    One keep-alive HTTP connection, reopened after errors
+
+    Each download thread owns one, so a file fetched over N connections keeps
+    N sockets open rather than reconnecting per range.
+    """
+
+    def __init__(self, url, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.conn = None
+        self.netloc = None
+        self.scheme = None
+        self.target(url)
+
+    def target(self, url):
+        parts = urllib.parse.urlsplit(url)
+        if (parts.scheme, parts.netloc) != (self.scheme, self.netloc):
+            self.close()
+            self.scheme, self.netloc = parts.scheme, parts.netloc
+        self.path = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+
+    def request(self, headers):
+        if self.conn is None:
+            factory = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self.conn = factory(self.netloc, timeout=self.timeout)
+        try:
+            self.conn.request("GET", self.path, headers=headers)
+            return self.conn.getresponse()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def probe(url, headers=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Find the final URL, the size and whether ranges are honored
+
+    A one-byte Range request is used instead of HEAD, which some CDNs answer
+    differently from GET.
+
+    Args:
+        url (str): Media URL
+        headers (dict): Request headers (yt-dlp's http_headers for the format)
+        timeout (float): Socket timeout in seconds
+
+    Returns:
+        tuple: (final url, size in bytes or None, accepts ranges)
+    """
+    connection = Connection(url, timeout)
+    try:
+        for _ in range(MAX_REDIRECTS + 1):
+            response = connection.request({**(headers or {}), "Range": "bytes=0-0"})
+            response.read()
+            if response.status in (301, 302, 303, 307, 308):
+                url = urllib.parse.urljoin(url, response.getheader("Location"))
+                connection.target(url)
+                continue
+            if response.status == 206:
+                content_range = response.getheader("Content-Range") or ""
+                total = content_range.rsplit("/", 1)[-1]
+                return url, int(total) if total.isdigit() else None, total.isdigit()
+            if response.status == 200:
+                length = response.getheader("Content-Length")
+                return url, int(length) if length and length.isdigit() else None, False
+            raise DownloadError(f"HTTP {response.status} probing {url}")
+        raise DownloadError(f"Too many redirects for {url}")
+    finally:
+        connection.close()
+
+
+def fetch_range(connection, headers, start, end, out, limiter):
+    """Fetch bytes [start, end] into out (positioned by the caller) and return the count"""
+    response = connection.request({**(headers or {}), "Range": f"bytes={start}-{end}"})
+    if response.status != 206:
+        response.read()
+        raise DownloadError(f"HTTP {response.status} for range {start}-{end}")
+    received = 0
+    while True:
+        data = response.read(READ_SIZE)
+        if not data:
+            break
+        limiter.consume(len(data))
+        out.write(data)
+        received += len(data)
+    if received != end - start + 1:
+        # The connection's state is unknown after a short read
+        connection.close()
+        raise DownloadError(f"Short read for range {start}-{end}: {received} bytes")
+    return received
+
+
+def stream(url, dest, headers=None, rate_limit=0, timeout=DEFAULT_TIMEOUT):
+    """
+    Single-connection fallback for servers that ignore Range
+
+    Returns:
+        int: Bytes written
+    """
+    limiter = RateLimiter(rate_limit)
+    connection = Connection(url, timeout)
+    try:
+        response = connection.request(headers or {})
+        if response.status != 200:
+            response.read()
+            raise DownloadError(f"HTTP {response.status} for {url}")
+        written = 0
+        with open(dest, "wb") as out:
+            while True:
+                data = response.read(READ_SIZE)
+                if not data:
+                    break
+                limiter.consume(len(data))
+                out.write(data)
+                written += len(data)
+        return written
+    finally:
+        connection.close()
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def download(url, dest, connections=DEFAULT_CONNECTIONS, chunk_size=None, rate_limit=0,
+             headers=None, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+    """
+    Download a file over several connections with Range requests
+
+    The file is split into fixed-size chunks that the connections pull from a
+    shared queue, so a slow connection simply takes fewer chunks. Every chunk
+    is written at its offset in a preallocated .part file, which is renamed
+    into place once all chunks are in. Servers that don't honor Range get a
+    single streamed request instead.
+
+    Args:
+        url (str): Media URL
+        dest (str): Target file path
+        connections (int): Concurrent connections for this file
+        chunk_size (int): Bytes per Range request (default DOWNLOAD_CHUNK_SIZE or 1 MiB)
+        rate_limit (int): Bytes per second across all connections; 0 = unlimited
+        headers (dict): Request headers (yt-dlp's http_headers for the format)
+        timeout (float): Socket timeout in seconds
+        retries (int): Attempts per chunk before the download fails, with
+            exponential backoff between them
+
+    Returns:
+        int: Bytes written
+    """
+    chunk_size = chunk_size or int(os.environ.get("DOWNLOAD_CHUNK_SIZE") or DEFAULT_CHUNK_SIZE)
+    part = dest + ".part"
+    url, size, ranged = probe(url, headers, timeout)
+    if not ranged or not size:
+        try:
+            written = stream(url, part, headers, rate_limit, timeout)
+        except Exception:
+            remove_quietly(part)
+            raise
+        os.replace(part, dest)
+        return written
+
+    chunks = queue.Queue()
+    for start in range(0, size, chunk_size):
+        chunks.put((start, min(start + chunk_size, size) - 1))
+
+    with open(part, "wb") as out:
+        out.truncate(size)
+
+    limiter = RateLimiter(rate_limit)
+    errors = []
+    failed = threading.Event()
+
+    def worker():
+        connection = Connection(url, timeout)
+        try:
+            with open(part, "r+b") as out:
+                while not failed.is_set():
+                    try:
+                        start, end = chunks.get_nowait()
+                    except queue.Empty:
+                        return
+                    for attempt in range(1, retries + 1):
+                        try:
+                            out.seek(start)
+                            fetch_range(connection, headers, start, end, out, limiter)
+                            break
+                        except (OSError, http.client.HTTPException, DownloadError) as e:
+                            if attempt == retries:
+                                errors.append(e)
+                                failed.set()
+                            # Returns early once another connection has given up
+                            elif failed.wait(RETRY_BACKOFF * 2 ** (attempt - 1)):
+                                break
+        finally:
+            connection.close()
+
+    count = max(1, min(connections or 1, chunks.qsize()))
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        remove_quietly(part)
+        raise DownloadError(f"Ranged download failed: {errors[0]}")
+    os.replace(part, dest)
+    return size
+
+
+def supports(info):
+    """Whether a resolved yt-dlp format can be fetched with ranged requests"""
+    return bool(info.get("url")) and info.get("protocol") in RANGED_PROTOCOLS and not info.get("requested_formats")
@@ -0,0 +1,306 @@
+import os
+import json
+import time
+import queue
+import hashlib
+import sqlite3
+import threading
+import http.client
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_API_URL = "https://sponsor.ajay.app"
+DEFAULT_CACHE_PATH = os.path.join(ROOT_DIR, "cache", "sponsorblock.sqlite3")
+DEFAULT_TTL = 24 * 60 * 60            # 1 day
+DEFAULT_NEGATIVE_TTL = 6 * 60 * 60    # 6 hours; new submissions show up for unlisted videos
+DEFAULT_TIMEOUT = 3.0
+DEFAULT_CATEGORIES = ["sponsor", "intro", "outro"]
+# 4 hex characters is what the SponsorBlock docs recommend: enough videos share
+# a prefix that the lookup stays private, few enough to keep responses small
+HASH_PREFIX_LENGTH = 4
+
+
+def hash_prefix(video_id, length=HASH_PREFIX_LENGTH):
+    return hashlib.sha256(video_id.encode("utf-8")).hexdigest()[:length]
+
+
+class SegmentCache:
+    """
+    On-disk cache of SponsorBlock results with TTL eviction
+
+    Videos without segments are stored as an empty list with a shorter TTL, so a
+    repeat lookup of an unlisted video doesn't go back to the API either.
+    """
+
+    def __init__(self, path=None, ttl=None, negative_ttl=None):
+        self.path = path or os.environ.get("SPONSORBLOCK_CACHE_PATH") or DEFAULT_CACHE_PATH
+        self.ttl = ttl if ttl is not None else int(os.environ.get("SPONSORBLOCK_CACHE_TTL") or DEFAULT_TTL)
+        self.negative_ttl = negative_ttl if negative_ttl is not None else int(os.environ.get("SPONSORBLOCK_NEGATIVE_TTL") or DEFAULT_NEGATIVE_TTL)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Lookups run on download threads, so share one connection behind a lock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS segments ("
+            " video_id TEXT PRIMARY KEY,"
+            " segments TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, video_id):
+        """Return the cached segment list for a video, or None on a miss or expiry"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT segments, created_at FROM segments WHERE video_id = ?", (video_id,)
+            ).fetchone()
+            if not row:
+                return None
+            segments = json.loads(row[0])
+            ttl = self.ttl if segments else self.negative_ttl
+            if time.time() - row[1] > ttl:
+                self.conn.execute("DELETE FROM segments WHERE video_id = ?", (video_id,))
+                self.conn.commit()
+                return None
+            return segments
+
+    def set_many(self, results):
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO segments (video_id, segments, created_at) VALUES (?, ?, ?)",
+                [(video_id, json.dumps(segments), now) for video_id, segments in results.items()]
+            )
+            self.conn.commit()
+
+    def evict_expired(self):
+        """Delete every expired entry and return how many were removed"""
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "DELETE FROM segments WHERE created_at < ? OR (segments = '[]' AND created_at < ?)",
+                (now - self.ttl, now - self.negative_ttl)
+            )
+            self.conn.commit()
+        return cursor.rowcount
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class CircuitBreaker:
+    """
+    Stops calling the API after repeated failures and retries after a cool-down
+
+    While the circuit is open, lookups fail fast, so a SponsorBlock outage costs
+    each track nothing instead of a full timeout.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            # Half-open: let a probe through once the cool-down has passed
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        return not self.allow()
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to a single host
+    """
+
+    def __init__(self, base_url, size=4, timeout=DEFAULT_TIMEOUT):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.base_path = parsed.path.rstrip("/")
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def get(self, path):
+        """
+        Perform a GET on a pooled connection
+
+        Returns:
+            tuple: (status code, response body bytes)
+        """
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            conn.request("GET", self.base_path + path, headers={"Accept": "application/json"})
+            response = conn.getresponse()
+            body = response.read()
+        except Exception:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            try:
+                self.idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+        return response.status, body
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SponsorBlockClient:
+    """
+    SponsorBlock client that batches lookups through the hash-prefix endpoint
+
+    Video ids are grouped by the first characters of their SHA-256 hash and each
+    group is fetched with one request to /api/skipSegments/<prefix>. Results,
+    including "no segments", are cached on disk. Network problems never raise:
+    the lookup returns no segments and the failure counts towards the breaker.
+    """
+
+    def __init__(self, base_url=None, cache=None, timeout=None, categories=None,
+                 max_connections=4, breaker=None):
+        self.base_url = base_url or os.environ.get("SPONSORBLOCK_API_URL") or DEFAULT_API_URL
+        self.timeout = timeout if timeout is not None else float(os.environ.get("SPONSORBLOCK_TIMEOUT") or DEFAULT_TIMEOUT)
+        self.categories = categories or DEFAULT_CATEGORIES
+        self.cache = cache if cache is not None else SegmentCache()
+        self.breaker = breaker or CircuitBreaker()
+        self.pool = ConnectionPool(self.base_url, size=max_connections, timeout=self.timeout)
+        self.executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="sponsorblock")
+
+    def _prefix_path(self, prefix):
+        query = urllib.parse.urlencode({"categories": json.dumps(self.categories)})
+        return f"/api/skipSegments/{prefix}?{query}"
+
+    def fetch_prefix(self, prefix, video_ids):
+        """
+        Fetch the segments of every requested video sharing one hash prefix
+
+        Returns:
+            dict: video id -> list of segment entries, or None if the request failed
+        """
+        if not self.breaker.allow():
+            return None
+        try:
+            status, body = self.pool.get(self._prefix_path(prefix))
+            if status == 404:
+                # No video with this prefix has segments in the requested categories
+                entries = []
+            elif status == 200:
+                entries = json.loads(body)
+            else:
+                raise http.client.HTTPException(f"SponsorBlock returned HTTP {status}")
+        except Exception:
+            self.breaker.record_failure()
+            return None
+
+        self.breaker.record_success()
+        by_video = {entry.get("videoID"): entry.get("segments") or [] for entry in entries}
+        return {
+            video_id: [seg for seg in by_video.get(video_id, []) if seg.get("category") in self.categories]
+            for video_id in video_ids
+        }
+
+    def _split_cached(self, video_ids):
+        results = {}
+        groups = {}
+        for video_id in dict.fromkeys(video_ids):
+            cached = self.cache.get(video_id)
+            if cached is not None:
+                results[video_id] = cached
+            else:
+                groups.setdefault(hash_prefix(video_id), []).append(video_id)
+        return results, groups
+
+    def _merge(self, results, groups, fetched):
+        fresh = {}
+        for (prefix, video_ids), found in zip(groups.items(), fetched):
+            for video_id in video_ids:
+                # Failed lookups fall back to "no segments" but are not cached
+                results[video_id] = found[video_id] if found is not None else []
+            if found is not None:
+                fresh.update(found)
+        if fresh:
+            self.cache.set_many(fresh)
+        return results
+
+    def get_many(self, video_ids):
+        """
+        Look up the segments of several videos
+
+        Args:
+            video_ids (list): YouTube video ids
+
+        Returns:
+            dict: video id -> list of SponsorBlock segment entries
+        """
+        results, groups = self._split_cached(video_ids)
+        fetched = list(self.executor.map(lambda group: self.fetch_prefix(*group), groups.items()))
+        return self._merge(results, groups, fetched)
+
+    async def get_many_async(self, video_ids):
+        """Asyncio variant of get_many; the requests run on the client's connection pool"""
+        # Only callers already inside an event loop get here, so asyncio is loaded by then
+        import asyncio
+        loop = asyncio.get_running_loop()
+        results, groups = self._split_cached(video_ids)
+        fetched = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, self.fetch_prefix, prefix, ids)
+            for prefix, ids in groups.items()
+        ])
+        return self._merge(results, groups, fetched)
+
+    def get_segments(self, video_id):
+        return self.get_many([video_id])[video_id]
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.pool.close()
+        self.cache.close()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def default_client():
+    """Process-wide client, so worker processes keep the pool and cache warm"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = SponsorBlockClient()
+        return _default_client
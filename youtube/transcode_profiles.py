@@ -0,0 +1,107 @@
+import os
+
+DEFAULT_PROFILE = "mp3-128"
+
+# Output profiles. "settings" is part of the audio library's content address,
+# so change it whenever a profile's encode parameters change. "ytdlp" is the
+# (preferredcodec, preferredquality) pair used by the two-pass path's
+# FFmpegExtractAudio postprocessor.
+PROFILES = {
+    "mp3-128": {
+        "ext": "mp3",
+        "args": ["-c:a", "libmp3lame", "-b:a", "128k", "-ar", "44100"],
+        "settings": "mp3-libmp3lame-128k-44100",
+        "ytdlp": ("mp3", "128"),
+    },
+    "mp3-320": {
+        "ext": "mp3",
+        "args": ["-c:a", "libmp3lame", "-b:a", "320k", "-ar", "44100"],
+        "settings": "mp3-libmp3lame-320k-44100",
+        "ytdlp": ("mp3", "320"),
+    },
+    "aac-192": {
+        "ext": "m4a",
+        "args": ["-c:a", "aac", "-b:a", "192k"],
+        "settings": "m4a-aac-192k",
+        "ytdlp": ("m4a", "192"),
+    },
+    "opus-128": {
+        "ext": "opus",
+        "args": ["-c:a", "libopus", "-b:a", "128k"],
+        "settings": "opus-libopus-128k",
+        "ytdlp": ("opus", "128"),
+    },
+    # Keeps YouTube's own AAC or Opus stream; see encode_plan
+    "copy": {
+        "ext": None,
+        "args": ["-c:a", "copy"],
+        "settings": "copy",
+        "ytdlp": ("best", None),
+    },
+}
+
+# Container extension -> extension of a stream-copy remux of its audio
+REMUX_TARGETS = {"m4a": "m4a", "mp4": "m4a", "webm": "opus", "opus": "opus"}
+
+# Profile used by "copy" when the audio has to be re-encoded anyway (segments
+# are cut, or the container isn't one we can remux)
+COPY_FALLBACKS = {"m4a": "aac-192", "opus": "opus-128"}
+
+
+def resolve(name=None):
+    """
+    Look up an output profile
+
+    Args:
+        name (str): Profile name (default TRANSCODE_PROFILE or mp3-128)
+
+    Returns:
+        tuple: (name, profile dict)
+
+    Raises:
+        ValueError: If the profile is unknown
+    """
+    name = name or os.environ.get("TRANSCODE_PROFILE") or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown transcode profile: {name} (expected one of {', '.join(PROFILES)})")
+    return name, PROFILES[name]
+
+
+def encode_plan(profile, container, trimming):
+    """
+    Decide how ffmpeg produces the output for one container
+
+    The copy profile remuxes the downloaded audio stream into m4a or opus without
+    decoding it, which only works when nothing is cut out. Otherwise it falls back
+    to encoding in the same codec family, and every other profile always encodes.
+
+    Args:
+        profile (dict): Entry of PROFILES
+        container (str): Downloaded container path
+        trimming (bool): Whether segments will be removed
+
+    Returns:
+        tuple: (output extension, ffmpeg audio codec arguments)
+    """
+    if profile["ext"] is not None:
+        return profile["ext"], profile["args"]
+    target = REMUX_TARGETS.get(os.path.splitext(container)[1].lstrip(".").lower())
+    if target and not trimming:
+        return target, profile["args"]
+    fallback = PROFILES[COPY_FALLBACKS.get(target, DEFAULT_PROFILE)]
+    return fallback["ext"], fallback["args"]
+
+
+def output_path(output_file, ext):
+    """output_file with its extension replaced by the profile's"""
+    return os.path.splitext(output_file)[0] + "." + ext
+
+
+def library_variant(name):
+    """
+    Suffix that keeps a track's library entries for different profiles apart
+
+    The default profile has none, so entries stored before profiles existed
+    still resolve.
+    """
+    return None if name == DEFAULT_PROFILE else name
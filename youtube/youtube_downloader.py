@@ -4,25 +4,116 @@ import sys
 import json
 import shutil
 import subprocess
-import yt_dlp
-import urllib.request
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from audio_library import AudioLibrary, object_key
+import transcode_profiles
+
+if __name__ == "__main__":
+    # Run by hand: the toolchain puts common/ on sys.path and runs this file as a module
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from toolchain.cli import run
+    sys.exit(run("youtube_downloader", sys.argv[1:]))
+
+import timings
+from lazy_import import lazy_module
+
+# Imported on first use, so runs that never reach yt-dlp (usage errors, library
+# hits, the transcode stage) don't pay for loading it; the HTTP clients likewise
+yt_dlp = lazy_module("yt_dlp")
+sponsorblock = lazy_module("sponsorblock")
+ranged_download = lazy_module("ranged_download")
 
 COOKIES_FILE = "./Cookies/music.youtube.com_cookies.txt"
-SPONSORBLOCK_API = "https://sponsor.ajay.app/api/skipSegments?videoID={vid}"
+SPONSORBLOCK_CATEGORIES = ["sponsor","intro","outro"]
+# "ytdlp" leaves fetching to yt-dlp; "parallel" fetches each file over several connections
+DOWNLOAD_ENGINES = ("ytdlp", "parallel")
+
+class ArtifactTracker:
+    """
+    Records the files yt-dlp writes for one download from its progress and
+    postprocessor hooks, so the caller knows the exact container and output
+    paths without guessing extensions or scanning the output directory
+    """
+
+    def __init__(self):
+        self.downloaded = None
+        self.outputs = []
+
+    def install(self, ydl_opts):
+        ydl_opts.setdefault("progress_hooks", []).append(self.on_progress)
+        ydl_opts.setdefault("postprocessor_hooks", []).append(self.on_postprocess)
+        return ydl_opts
+
+    def on_progress(self, status):
+        # Also reported when the file was already on disk from an earlier run
+        if status.get("status") == "finished":
+            self.downloaded = status.get("filename")
+
+    def on_postprocess(self, status):
+        if status.get("status") == "finished":
+            path = (status.get("info_dict") or {}).get("filepath")
+            if path and path not in self.outputs:
+                self.outputs.append(path)
+
+    def container(self, info=None):
+        """The downloaded media file, before any postprocessing"""
+        if self.downloaded:
+            return self.downloaded
+        downloads = (info or {}).get("requested_downloads") or []
+        return downloads[0].get("filepath") if downloads else None
+
+    def output(self, ext=None):
+        """The last postprocessor output, optionally with the given extension, e.g. ".mp3" """
+        for path in reversed(self.outputs):
+            if ext is None or path.lower().endswith(ext):
+                return path
+        return None
+
+@functools.lru_cache(maxsize=None)
+def ffmpeg_available():
+    # PATH only needs searching once per process
+    return shutil.which("ffmpeg") is not None
 
 def fetch_sponsor_segments(video_id, categories=None):
-    url = SPONSORBLOCK_API.format(vid=video_id)
+    # Cached, pooled hash-prefix lookup; returns [] when SponsorBlock is unavailable
+    with timings.stage("sponsorblock"):
+        data = sponsorblock.default_client().get_segments(video_id)
+    if categories:
+        data = [seg for seg in data if seg.get("category") in categories or seg.get("segmentType") in categories]
+    return data
+
+def parse_segment_times(segments_data):
+    # prepare list of [start,end] from SponsorBlock API entries
+    seg_times = []
+    for s in segments_data:
+        seg = s.get("segment") or s.get("segments") or s.get("segment_times") or s.get("segment_time")
+        # API returns "segment":[start,end]
+        if isinstance(seg, list) and len(seg) >= 2:
+            seg_times.append((seg[0], seg[1]))
+        else:
+            # fallback: some entries use "segment" key differently
+            if "segment" in s and isinstance(s["segment"], list):
+                seg_times.append((s["segment"][0], s["segment"][1]))
+    return seg_times
+
+def ffmpeg_encode(input_file, output_file, codec_args=None):
+    # codec_args: ffmpeg audio codec arguments from a transcode profile (default mp3-128)
+    cmd = ["ffmpeg","-y","-hide_banner","-loglevel","error",
+           "-i", input_file,
+           "-vn",
+           *(codec_args or transcode_profiles.PROFILES[transcode_profiles.DEFAULT_PROFILE]["args"]),
+           output_file]
     try:
-        with urllib.request.urlopen(url, timeout=10) as r:
-            data = json.load(r)
-        if categories:
-            data = [seg for seg in data if seg.get("category") in categories or seg.get("segmentType") in categories]
-        return data
-    except Exception:
-        return []
+        with timings.stage("ffmpeg"):
+            subprocess.run(cmd, check=True)
+        timings.add_bytes("ffmpeg", timings.file_size(output_file))
+        return True, output_file
+    except subprocess.CalledProcessError as e:
+        return False, str(e)
 
-def ffmpeg_remove_segments_from_container(input_file, output_file, segments):
-    # segments: list of [start, end] (floats)
+def ffmpeg_remove_segments_from_container(input_file, output_file, segments, duration=None, codec_args=None):
+    # segments: list of [start, end] (floats); duration: source length in seconds, if known
     if not segments:
         return False, "no segments"
     # compute keep ranges (complement)
@@ -33,52 +124,89 @@ def ffmpeg_remove_segments_from_container(input_file, output_file, segments):
         if s > cur:
             keep.append((cur, s))
         cur = max(cur, e)
-    # get duration
-    try:
-        p = subprocess.run(["ffprobe","-v","error","-show_entries","format=duration",
-                            "-of","default=noprint_wrappers=1:nokey=1", input_file],
-                           capture_output=True, text=True, check=True)
-        duration = float(p.stdout.strip())
-    except Exception:
-        duration = None
-    if duration and cur < duration:
-        keep.append((cur, duration))
-    elif not duration:
-        keep.append((cur, 9999999))
+    # The last kept range runs to the end of the stream, so no ffprobe is needed;
+    # a known duration only tells us when the final segment covers the tail
+    if not duration or cur < float(duration):
+        keep.append((cur, None))
     # if nothing to keep (segment covers entire file) produce a short silent mp3 or fail
     if not keep:
         return False, "no audio left after removal"
     # build filter_complex
     parts = []
     for i, (s, e) in enumerate(keep):
-        parts.append(f"[0:a]atrim=start={s}:end={e},asetpts=PTS-STARTPTS[a{i}]")
+        trim = f"atrim=start={s}:end={e}" if e is not None else f"atrim=start={s}"
+        parts.append(f"[0:a]{trim},asetpts=PTS-STARTPTS[a{i}]")
     concat_inputs = "".join(f"[a{i}]" for i in range(len(keep)))
     filter_complex = ";".join(parts) + ";" + concat_inputs + f"concat=n={len(keep)}:v=0:a=1[outa]"
     cmd = ["ffmpeg","-y","-hide_banner","-loglevel","info",
            "-i", input_file,
            "-filter_complex", filter_complex,
            "-map", "[outa]",
-           "-c:a", "libmp3lame","-b:a","128k",
+           *(codec_args or transcode_profiles.PROFILES[transcode_profiles.DEFAULT_PROFILE]["args"]),
            output_file]
     try:
-        subprocess.run(cmd, check=True)
+        with timings.stage("ffmpeg"):
+            subprocess.run(cmd, check=True)
+        timings.add_bytes("ffmpeg", timings.file_size(output_file))
         return True, output_file
     except subprocess.CalledProcessError as e:
         return False, str(e)
 
-def download_youtube_audio(youtube_url, output_path):
-    try:
-        if os.path.isdir(output_path):
-            output_dir = output_path
-            base_name = "output_audio"
-        else:
-            output_dir = os.path.dirname(output_path) or "."
-            base_name = os.path.splitext(os.path.basename(output_path))[0] or "output_audio"
+def split_output_path(output_path):
+    if os.path.isdir(output_path):
+        return output_path, "output_audio"
+    output_dir = os.path.dirname(output_path) or "."
+    base_name = os.path.splitext(os.path.basename(output_path))[0] or "output_audio"
+    return output_dir, base_name
+
+def download_youtube_audio(youtube_url, output_path, single_pass=True, library=None, spotify_id=None, isrc=None, transfer=None, profile=None):
+    if single_pass:
+        return download_youtube_audio_single_pass(youtube_url, output_path, library=library, spotify_id=spotify_id, isrc=isrc, transfer=transfer, profile=profile)
+    return download_youtube_audio_two_pass(youtube_url, output_path, transfer=transfer, profile=profile)
+
+def transfer_options(engine=None, connections=None, rate_limit=None):
+    """
+    Normalize the download engine settings passed on the command line
 
+    Args:
+        engine (str): "ytdlp" or "parallel" (default DOWNLOAD_ENGINE or "ytdlp")
+        connections (int): Connections per file in parallel mode
+        rate_limit (int): Bytes per second for this download; 0 = unlimited
+
+    Returns:
+        dict: engine, connections and rate_limit
+    """
+    engine = engine or os.environ.get("DOWNLOAD_ENGINE") or "ytdlp"
+    if engine not in DOWNLOAD_ENGINES:
+        raise ValueError(f"Unknown download engine: {engine}")
+    if not connections:
+        # Only the parallel engine opens several connections per file
+        connections = ranged_download.DEFAULT_CONNECTIONS if engine == "parallel" else 1
+    return {
+        "engine": engine,
+        "connections": max(1, int(connections)),
+        "rate_limit": max(0, int(rate_limit or 0)),
+    }
+
+def apply_transfer_options(ydl_opts, transfer):
+    # Rate and fragment concurrency for the downloads yt-dlp performs itself
+    if transfer and transfer["rate_limit"]:
+        ydl_opts["ratelimit"] = transfer["rate_limit"]
+    if transfer and transfer["engine"] == "parallel":
+        ydl_opts["concurrent_fragment_downloads"] = transfer["connections"]
+    return ydl_opts
+
+def download_youtube_audio_two_pass(youtube_url, output_path, transfer=None, profile=None):
+    # Legacy path: FFmpegExtractAudio encodes the output, then segments are trimmed
+    # from the kept container with a second full decode/encode.
+    try:
+        _, settings = transcode_profiles.resolve(profile)
+        preferred_codec, preferred_quality = settings["ytdlp"]
+        output_dir, base_name = split_output_path(output_path)
         os.makedirs(output_dir, exist_ok=True)
         outtmpl = os.path.join(output_dir, base_name + ".%(ext)s")
 
-        if not shutil.which("ffmpeg"):
+        if not ffmpeg_available():
             return False, "ffmpeg not found on PATH"
 
         ydl_opts = {
@@ -94,92 +222,369 @@ def download_youtube_audio(youtube_url, output_path):
             "sponsorblock_categories": ["sponsor","intro","outro"],
             "postprocessors": [
                 {"key": "SponsorBlock"},
-                {"key": "FFmpegExtractAudio", "preferredcodec": "mp3", "preferredquality": "128"}
+                {"key": "FFmpegExtractAudio", "preferredcodec": preferred_codec, "preferredquality": preferred_quality}
             ],
-            "postprocessor_args": ["-ar","44100"],
         }
+        if preferred_codec == "mp3":
+            ydl_opts["postprocessor_args"] = ["-ar","44100"]
 
         if ydl_opts.get("cookiefile") is None:
             ydl_opts.pop("cookiefile")
+        apply_transfer_options(ydl_opts, transfer)
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        tracker = ArtifactTracker()
+        tracker.install(ydl_opts)
+
+        # Includes the FFmpegExtractAudio encode, which yt-dlp runs as a postprocessor
+        with timings.stage("download"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(youtube_url, download=True)
-            video_id = info.get("id")
 
-        container = None
-        for ext in ("webm","m4a","mp4","mkv","mka"):
-            p = os.path.join(output_dir, base_name + f".{ext}")
-            if os.path.exists(p):
-                container = p
-                break
-
-        mp3_path = os.path.join(output_dir, base_name + ".mp3")
-        # If SponsorBlockPP didn't trim, segments will still be in the container/mp3.
-        segments_data = fetch_sponsor_segments(video_id, categories=["sponsor","intro","outro"])
-        if segments_data:
-            # prepare list of [start,end]
-            seg_times = []
-            for s in segments_data:
-                seg = s.get("segment") or s.get("segments") or s.get("segment_times") or s.get("segment_time")
-                # API returns "segment":[start,end]
-                if isinstance(seg, list) and len(seg) >= 2:
-                    seg_times.append((seg[0], seg[1]))
-                else:
-                    # fallback: some entries use "segment" key differently
-                    if "segment" in s and isinstance(s["segment"], list):
-                        seg_times.append((s["segment"][0], s["segment"][1]))
-            if not seg_times:
-                # nothing parseable
-                if os.path.exists(mp3_path):
-                    return True, mp3_path
-                return False, "Found SponsorBlock entries but could not parse segments"
-            # If SponsorBlock postprocessor trimmed, check mp3 duration vs original to infer action
-            # Otherwise perform manual trimming from container
-            trimmed_mp3 = os.path.join(output_dir, base_name + "_trimmed.mp3")
-            if container and os.path.exists(container):
-                ok, info_or_err = ffmpeg_remove_segments_from_container(container, trimmed_mp3, seg_times)
-                if ok:
-                    # optionally cleanup originals
-                    try:
-                        if os.path.exists(mp3_path):
-                            os.remove(mp3_path)
-                        os.remove(container)
-                    except Exception:
-                        pass
-                    return True, trimmed_mp3
-                else:
-                    return False, "Manual trimming failed: " + info_or_err
-            else:
-                return False, "Container not found for manual trimming"
+        container = tracker.container(info)
+        audio_path = tracker.output()
+
+        # SponsorBlockPP already looked the video up; only ask again if it didn't run
+        chapters = info.get("sponsorblock_chapters")
+        if chapters is not None:
+            seg_times = [(c["start_time"], c["end_time"]) for c in chapters
+                         if c.get("category") in SPONSORBLOCK_CATEGORIES]
         else:
-            # no segments in SponsorBlock DB — return produced mp3
-            if os.path.exists(mp3_path):
-                # cleanup container if you want
+            seg_times = fetch_segment_times(info.get("id"))
+
+        if seg_times:
+            # SponsorBlockPP only marks segments, so trim them from the kept container
+            if not container:
+                return False, "Container not found for manual trimming"
+            ext, codec_args = transcode_profiles.encode_plan(settings, container, trimming=True)
+            trimmed = os.path.join(output_dir, base_name + "_trimmed." + ext)
+            ok, info_or_err = ffmpeg_remove_segments_from_container(container, trimmed, seg_times,
+                                                                    duration=info.get("duration"),
+                                                                    codec_args=codec_args)
+            if not ok:
+                return False, "Manual trimming failed: " + info_or_err
+            for path in (audio_path, container):
                 try:
-                    if os.path.exists(container):
-                        os.remove(container)
-                except Exception:
+                    if path:
+                        os.remove(path)
+                except OSError:
                     pass
-                return True, mp3_path
-            # try to find any mp3
-            for f in os.listdir(output_dir):
-                if f.lower().endswith(".mp3"):
-                    return True, os.path.join(output_dir, f)
-            return False, "No output mp3 found and no SponsorBlock segments."
+            return True, trimmed
+
+        if not audio_path:
+            return False, "No audio output produced and no SponsorBlock segments."
+        if container and container != audio_path:
+            try:
+                os.remove(container)
+            except OSError:
+                pass
+        return True, audio_path
 
     except Exception as e:
         return False, str(e)
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print(json.dumps({"success": False, "error": "Usage: python youtube_downloader.py <youtube_url> <output_dir_or_basename>"}))
-        sys.exit(1)
-    youtube_url = sys.argv[1]
-    output_path = sys.argv[2]
-    success, info = download_youtube_audio(youtube_url, output_path)
-    result = {"success": success}
-    if success:
-        result["output_file"] = info
+def download_audio_container(youtube_url, output_path, transfer=None):
+    """
+    Pipeline stage: download the bestaudio container without any postprocessing
+
+    With the parallel engine, a plain HTTP(S) format is fetched over several
+    ranged connections (ranged_download); fragmented formats (DASH, HLS) are
+    handed back to yt-dlp with concurrent fragment downloads instead.
+
+    Returns:
+        tuple: (success, dict with container/video_id/duration or error message)
+    """
+    try:
+        output_dir, base_name = split_output_path(output_path)
+        os.makedirs(output_dir, exist_ok=True)
+
+        ydl_opts = {
+            "format": "bestaudio[protocol!=m3u8_native][protocol!=m3u8][vcodec=none]/bestaudio/best",
+            "outtmpl": os.path.join(output_dir, base_name + ".%(ext)s"),
+            "noplaylist": True,
+            "quiet": True,
+            "noprogress": True,
+            "no_warnings": True,
+        }
+        if os.path.exists(COOKIES_FILE):
+            ydl_opts["cookiefile"] = COOKIES_FILE
+        apply_transfer_options(ydl_opts, transfer)
+        tracker = ArtifactTracker()
+        tracker.install(ydl_opts)
+
+        container = None
+        with timings.stage("download"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            if transfer and transfer["engine"] == "parallel":
+                info = ydl.extract_info(youtube_url, download=False)
+                if ranged_download.supports(info):
+                    container = os.path.join(output_dir, base_name + "." + info["ext"])
+                    ranged_download.download(info["url"], container,
+                                             connections=transfer["connections"],
+                                             rate_limit=transfer["rate_limit"],
+                                             headers=info.get("http_headers"))
+                else:
+                    ydl.process_info(info)
+            else:
+                info = ydl.extract_info(youtube_url, download=True)
+
+        container = container or tracker.container(info)
+        if not container:
+            return False, "Container not found after download"
+        timings.add_bytes("download", timings.file_size(container))
+
+        return True, {"container": container, "video_id": info.get("id"), "duration": info.get("duration")}
+    except Exception as e:
+        return False, str(e)
+
+def transcode_audio(container, output_file, segments, duration=None, profile=None):
+    """
+    Pipeline stage: trim SponsorBlock segments (if any) and encode the container
+
+    The output extension comes from the profile, so output_file's own extension
+    is replaced (e.g. song.mp3 becomes song.m4a with the aac-192 profile).
+
+    Args:
+        duration (float): Source length from the download's info, if known
+        profile (str): Transcode profile name (see transcode_profiles.PROFILES)
+
+    Returns:
+        tuple: (success, output file or error message)
+    """
+    if not ffmpeg_available():
+        return False, "ffmpeg not found on PATH"
+    if not os.path.exists(container):
+        return False, "Container not found for transcoding"
+
+    _, settings = transcode_profiles.resolve(profile)
+    ext, codec_args = transcode_profiles.encode_plan(settings, container, trimming=bool(segments))
+    output_file = transcode_profiles.output_path(output_file, ext)
+    # A remux into the container's own format (copy of an m4a) is written beside it first
+    target = output_file if output_file != container else output_file + ".part." + ext
+    if segments:
+        ok, info_or_err = ffmpeg_remove_segments_from_container(container, target, segments,
+                                                                duration=duration, codec_args=codec_args)
     else:
-        result["error"] = info
-    print(json.dumps(result))
+        ok, info_or_err = ffmpeg_encode(container, target, codec_args)
+    if not ok:
+        return False, "Transcoding failed: " + info_or_err
+
+    if target != output_file:
+        os.replace(target, output_file)
+        return True, output_file
+    try:
+        os.remove(container)
+    except Exception:
+        pass
+    return True, output_file
+
+def video_id_from_url(youtube_url):
+    # Resolve the id offline so SponsorBlock can be queried before the download starts
+    from yt_dlp.extractor.youtube import YoutubeIE
+    try:
+        return YoutubeIE.get_temp_id(youtube_url)
+    except Exception:
+        return None
+
+def fetch_segment_times(video_id):
+    return parse_segment_times(fetch_sponsor_segments(video_id, categories=SPONSORBLOCK_CATEGORIES))
+
+def library_key(video_id, segments, profile=None):
+    _, settings = transcode_profiles.resolve(profile)
+    # Part of the content address, so every profile gets its own objects
+    return object_key(video_id, settings["settings"], segments)
+
+def deliver_path(output_path, stored):
+    # The stored object's extension is the one its profile produced
+    output_dir, base_name = split_output_path(output_path)
+    return os.path.join(output_dir, base_name + os.path.splitext(stored)[1])
+
+def store_in_library(library, output_file, video_id, segments, spotify_id=None, isrc=None, profile=None):
+    # Move the finished file into the library and hardlink it back into place
+    name, settings = transcode_profiles.resolve(profile)
+    key = library_key(video_id, segments, name)
+    with timings.stage("library_store"):
+        stored = library.store(key, output_file, video_id=video_id, spotify_id=spotify_id, isrc=isrc,
+                               variant=transcode_profiles.library_variant(name), encode_settings=settings["settings"])
+    return library.deliver(stored, output_file)
+
+def lookup_library_track(library, output_path, spotify_id=None, isrc=None, profile=None):
+    # Deliver a previously processed copy of a Spotify track, or return None
+    name, _ = transcode_profiles.resolve(profile)
+    with timings.stage("library_lookup"):
+        stored = library.lookup_track(spotify_id=spotify_id, isrc=isrc,
+                                      variant=transcode_profiles.library_variant(name))
+    if not stored:
+        return None
+    return library.deliver(stored, deliver_path(output_path, stored))
+
+def download_youtube_audio_single_pass(youtube_url, output_path, library=None, spotify_id=None, isrc=None, transfer=None, profile=None):
+    """
+    Download the bestaudio container and produce the final file with at most one ffmpeg run
+
+    SponsorBlock segments are fetched while the container downloads, so the trim
+    and the encode happen in the same ffmpeg invocation instead of encoding
+    the whole file twice. With a library, a track processed before is delivered
+    from the store without downloading or encoding it again.
+
+    Returns:
+        tuple: (success, output file or error message)
+    """
+    output_dir, base_name = split_output_path(output_path)
+    # transcode_audio swaps in the profile's extension
+    audio_path = os.path.join(output_dir, base_name + ".mp3")
+    name, settings = transcode_profiles.resolve(profile)
+
+    if library:
+        delivered = lookup_library_track(library, output_path, spotify_id=spotify_id, isrc=isrc, profile=profile)
+        if delivered:
+            return True, delivered
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        video_id = video_id_from_url(youtube_url)
+        segments_future = executor.submit(fetch_segment_times, video_id) if video_id else None
+
+        if library and video_id:
+            # Keyed on the video alone, so the segments keep loading behind the download
+            with timings.stage("library_lookup"):
+                found = library.lookup_video(video_id, settings["settings"])
+            if found:
+                stored, key = found
+                library.link_track(key, spotify_id, isrc, transcode_profiles.library_variant(name))
+                return True, library.deliver(stored, deliver_path(output_path, stored))
+
+        if not ffmpeg_available():
+            return False, "ffmpeg not found on PATH"
+
+        ok, download = download_audio_container(youtube_url, output_path, transfer=transfer)
+        if not ok:
+            return False, download
+
+        if segments_future is None or video_id != download.get("video_id"):
+            segments_future = executor.submit(fetch_segment_times, download.get("video_id"))
+        segments = segments_future.result()
+
+    ok, output_file = transcode_audio(download["container"], audio_path, segments, duration=download.get("duration"),
+                                      profile=profile)
+    if ok and library:
+        output_file = store_in_library(library, output_file, download.get("video_id"), segments, spotify_id, isrc,
+                                       profile=profile)
+    return ok, output_file
+
+def pop_option(argv, name):
+    # Remove "--name value" from argv and return (value, remaining argv)
+    if name not in argv:
+        return None, argv
+    i = argv.index(name)
+    value = argv[i + 1] if i + 1 < len(argv) else None
+    return value, argv[:i] + argv[i + 2:]
+
+def run_stage(stage, argv, library=None, spotify_id=None, isrc=None, transfer=None, profile=None):
+    if stage == "lookup":
+        if len(argv) < 1:
+            return {"success": False, "error": "Usage: python youtube_downloader.py --stage lookup <output_path> [--spotify-id ID] [--isrc ISRC] [--transcode-profile NAME]"}, 1
+        delivered = lookup_library_track(library, argv[0], spotify_id=spotify_id, isrc=isrc, profile=profile) if library else None
+        return {"success": True, "hit": delivered is not None, "output_file": delivered}, 0
+
+    if stage == "download":
+        if len(argv) < 2:
+            return {"success": False, "error": "Usage: python youtube_downloader.py --stage download <youtube_url> <output_path> [--engine ytdlp|parallel] [--connections N] [--rate-limit BYTES_PER_SEC]"}, 1
+        success, info = download_audio_container(argv[0], argv[1], transfer=transfer)
+        if success:
+            return {"success": True, **info}, 0
+        return {"success": False, "error": info}, 0
+
+    if stage == "segments":
+        if len(argv) < 1:
+            return {"success": False, "error": "Usage: python youtube_downloader.py --stage segments <video_id> [<video_id> ...]"}, 1
+        if len(argv) == 1:
+            segments_data = fetch_sponsor_segments(argv[0], categories=SPONSORBLOCK_CATEGORIES)
+            return {"success": True, "video_id": argv[0], "segments": parse_segment_times(segments_data)}, 0
+        # Several ids are looked up together, one request per shared hash prefix
+        found = sponsorblock.default_client().get_many(argv)
+        return {"success": True, "segments": {
+            video_id: parse_segment_times([seg for seg in data if seg.get("category") in SPONSORBLOCK_CATEGORIES])
+            for video_id, data in found.items()
+        }}, 0
+
+    if stage == "transcode":
+        if len(argv) < 2:
+            return {"success": False, "error": "Usage: python youtube_downloader.py --stage transcode <container> <output_file> [segments_json] [--video-id ID] [--duration SECONDS] [--transcode-profile NAME]"}, 1
+        video_id, argv = pop_option(argv, "--video-id")
+        duration, argv = pop_option(argv, "--duration")
+        segments = json.loads(argv[2]) if len(argv) > 2 else []
+        success, info = transcode_audio(argv[0], argv[1], segments, duration=float(duration) if duration else None,
+                                        profile=profile)
+        if success:
+            if library and video_id:
+                info = store_in_library(library, info, video_id, segments, spotify_id, isrc, profile=profile)
+            return {"success": True, "output_file": info}, 0
+        return {"success": False, "error": info}, 0
+
+    return {"success": False, "error": f"Unknown stage: {stage}"}, 1
+
+def create_worker_context():
+    """
+    Build the long-lived objects a worker process keeps between requests
+
+    Returns:
+        dict: Keyword arguments passed to main() on every worker request
+    """
+    if os.environ.get("AUDIO_LIBRARY") == "off":
+        return {}
+    return {"library": AudioLibrary()}
+
+@timings.instrument
+def main(argv, library=None):
+    """
+    Run the downloader against an argument list
+
+    Any invocation accepts --profile (see timings.instrument) and
+    --transcode-profile NAME to pick the output format (see transcode_profiles).
+
+    Args:
+        argv (list): Command line arguments (without the script name)
+        library (AudioLibrary): Optional warm audio library to reuse
+
+    Returns:
+        tuple: (result dict, process exit code)
+    """
+    spotify_id, argv = pop_option(argv, "--spotify-id")
+    isrc, argv = pop_option(argv, "--isrc")
+    engine, argv = pop_option(argv, "--engine")
+    connections, argv = pop_option(argv, "--connections")
+    rate_limit, argv = pop_option(argv, "--rate-limit")
+    profile, argv = pop_option(argv, "--transcode-profile")
+    try:
+        transfer = transfer_options(engine, connections, rate_limit)
+        profile, _ = transcode_profiles.resolve(profile)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}, 1
+    use_library = "--no-library" not in argv and os.environ.get("AUDIO_LIBRARY") != "off"
+    argv = [a for a in argv if a != "--no-library"]
+
+    owns_library = library is None and use_library
+    if owns_library:
+        library = AudioLibrary()
+    if not use_library:
+        library = None
+
+    try:
+        if len(argv) >= 2 and argv[0] == "--stage":
+            return run_stage(argv[1], argv[2:], library=library, spotify_id=spotify_id, isrc=isrc, transfer=transfer,
+                             profile=profile)
+        single_pass = "--two-pass" not in argv
+        argv = [a for a in argv if a != "--two-pass"]
+        if len(argv) < 2:
+            return {"success": False, "error": "Usage: python youtube_downloader.py [--two-pass] [--no-library] [--spotify-id ID] [--isrc ISRC] [--engine ytdlp|parallel] [--connections N] [--rate-limit BYTES_PER_SEC] [--transcode-profile NAME] <youtube_url> <output_dir_or_basename>"}, 1
+        youtube_url = argv[0]
+        output_path = argv[1]
+        success, info = download_youtube_audio(youtube_url, output_path, single_pass=single_pass,
+                                               library=library, spotify_id=spotify_id, isrc=isrc, transfer=transfer,
+                                               profile=profile)
+        result = {"success": success}
+        if success:
+            result["output_file"] = info
+        else:
+            result["error"] = info
+        return result, 0
+    finally:
+        if owns_library:
+            library.close()